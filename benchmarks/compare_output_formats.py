@@ -0,0 +1,82 @@
+# benchmarks/compare_output_formats.py
+"""
+Compara tamanho em disco e tempo de leitura do formato atual da saída com o
+formato compacto (categóricos + float32 + tabela de dimensão), para várias
+opções de compressão.
+
+Uso:
+    python -m benchmarks.compare_output_formats [caminho_do_parquet]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from rail_predictor.config import Config
+from rail_predictor.data_io import split_compact_output, sort_for_output
+
+COMPRESSIONS = [('snappy', None), ('zstd', 3), ('zstd', 9)]
+
+
+def _file_size(path: str) -> int:
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+def _median_read_seconds(paths, repeats: int = 5) -> float:
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for path in paths:
+            pd.read_parquet(path)
+        timings.append(time.perf_counter() - started)
+    return sorted(timings)[len(timings) // 2]
+
+
+def compare_output_formats(df: pd.DataFrame, workdir: str, repeats: int = 5) -> pd.DataFrame:
+    """Grava `df` em cada variante de formato e mede tamanho e leitura."""
+    df = sort_for_output(df)
+    fact_df, dimension_df = split_compact_output(df)
+    rows = []
+
+    for compression, level in COMPRESSIONS:
+        options = {'compression': compression}
+        if level is not None:
+            options['compression_level'] = level
+        label = compression if level is None else f"{compression}-{level}"
+
+        current_path = os.path.join(workdir, f"current-{label}.parquet")
+        df.to_parquet(current_path, index=False, engine='pyarrow', **options)
+        rows.append({
+            'formato': 'atual', 'compressao': label,
+            'bytes': _file_size(current_path),
+            'leitura_s': _median_read_seconds([current_path], repeats),
+        })
+
+        fact_path = os.path.join(workdir, f"compact-{label}.parquet")
+        dimension_path = os.path.join(workdir, f"dimension-{label}.parquet")
+        fact_df.to_parquet(fact_path, index=False, engine='pyarrow', **options)
+        dimension_df.to_parquet(dimension_path, index=False, engine='pyarrow', **options)
+        rows.append({
+            'formato': 'compacto', 'compressao': label,
+            'bytes': _file_size(fact_path) + _file_size(dimension_path),
+            'leitura_s': _median_read_seconds([fact_path, dimension_path], repeats),
+        })
+
+    report = pd.DataFrame(rows)
+    baseline = report.loc[0, 'bytes']
+    report['relativo'] = (report['bytes'] / baseline).round(3)
+    return report
+
+
+def main(filepath: str = Config.OUTPUT_FILE):
+    df = pd.read_parquet(filepath)
+    print(f"Arquivo: {filepath} ({len(df)} linhas, {_file_size(filepath)} bytes)")
+    with tempfile.TemporaryDirectory() as workdir:
+        report = compare_output_formats(df, workdir)
+    print(report.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
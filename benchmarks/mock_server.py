@@ -0,0 +1,89 @@
+# benchmarks/mock_server.py
+"""
+Servidor HTTP local que imita a API Open-Meteo para medir o caminho de
+coleta sem depender da rede nem consumir a cota da API.
+
+Responde a qualquer lista de coordenadas com dados de D-past_days até
+D+forecast_days-1 (D = hoje) para as variáveis pedidas em `hourly` (ou em
+`minutely_15`, a cada 15 min), com uma latência artificial opcional por
+requisição.
+"""
+import json
+import threading
+import time
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+import pandas as pd
+
+from .synthetic import hourly_times
+
+
+# Bloco temporal da Open-Meteo -> frequência das linhas.
+BLOCK_FREQUENCIES = {'hourly': 'h', 'minutely_15': '15min'}
+
+
+@lru_cache(maxsize=16)
+def _encoded_block(variables: str, start_date: str, days: int, block: str = 'hourly') -> bytes:
+    """Bloco JSON de um ponto (igual para todos, já serializado)."""
+    times = hourly_times(start_date, days, BLOCK_FREQUENCIES[block])
+    hourly = {'time': times.strftime('%Y-%m-%dT%H:%M').tolist()}
+    phase = 2 * np.pi * (times.hour.to_numpy() + times.minute.to_numpy() / 60) / 24
+    for i, var in enumerate(variables.split(',')):
+        hourly[var] = np.round(10 + 5 * np.sin(phase + i), 2).tolist()
+    return json.dumps({block: hourly}).encode('utf-8')
+
+
+class MockOpenMeteoHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        n_points = len(query['latitude'][0].split(','))
+        past_days = int(query.get('past_days', ['0'])[0])
+        days = past_days + int(query.get('forecast_days', ['7'])[0])
+        start_date = (pd.Timestamp.now().normalize() - pd.Timedelta(days=past_days)).strftime('%Y-%m-%d')
+        block_name = 'minutely_15' if 'minutely_15' in query else 'hourly'
+        block = _encoded_block(query.get(block_name, ['temperature_2m'])[0], start_date, days, block_name)
+        body = block if n_points == 1 else b'[' + b','.join([block] * n_points) + b']'
+
+        if self.latency:
+            time.sleep(self.latency)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class MockOpenMeteoServer:
+    """
+    Context manager que sobe o servidor falso em uma porta livre.
+
+    Uso:
+        with MockOpenMeteoServer(latency=0.05) as server:
+            Config.API_BASE_URL = server.url
+    """
+
+    def __init__(self, latency: float = 0.0):
+        handler = type('Handler', (MockOpenMeteoHandler,), {'latency': latency})
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}/v1/forecast"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,363 @@
+# benchmarks/run_etl.py
+"""
+Benchmark das etapas do ETL com dados sintéticos (10 mil a 100 mil SBs).
+
+Mede, para cada quantidade de SBs, o tempo (mediana de N repetições), a
+vazão (linhas/s) e o pico de memória (tracemalloc, em uma passada separada
+para não distorcer os tempos) de:
+
+    equilibrium     calculate_equilibrium_temperature_vectorized
+    inertia         apply_thermal_inertia_vectorized
+    pipeline        run_processing_pipeline (inclui as duas acima)
+    pipeline_sharded  run_processing_pipeline_sharded (pool de processos)
+    rolling_window  apply_rolling_window
+    save_output     save_output (parquet único)
+    load_history    load_history (com os filtros da janela)
+    fetch           fetch_weather_data_parallel contra um servidor local
+    end_to_end      coleta + processamento + gravação, em lote e em streaming
+    *_15min         inércia, pipeline, gravação e ponta a ponta com a
+                    resolução de 15 min (TEMPORAL_RESOLUTION = "15min", 4x
+                    linhas), para comparar com as etapas horárias
+
+Uso:
+    python -m benchmarks.run_etl [--sbs 10000 100000] [--days 7]
+        [--output resultados.json] [--compare baseline.json]
+
+Com --compare, termina com código 1 se alguma etapa ficar mais lenta ou
+consumir mais memória que o baseline além da tolerância (--tolerance).
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from rail_predictor.config import Config
+from rail_predictor.api_client import RESOLUTION_TIME_BLOCKS, expected_rows_per_location, fetch_weather_data_parallel
+from rail_predictor.data_io import load_history, save_output
+from rail_predictor.processing import (
+    apply_rolling_window,
+    apply_thermal_inertia_vectorized,
+    calculate_equilibrium_temperature_vectorized,
+    run_processing_pipeline,
+    timestep,
+)
+from rail_predictor.sharding import run_processing_pipeline_sharded
+from rail_predictor.streaming import run_streaming_pipeline
+
+from .mock_server import MockOpenMeteoServer
+from .synthetic import make_locations, make_raw_weather
+
+DEFAULT_SB_COUNTS = [10_000, 100_000]
+DEFAULT_FETCH_SBS = 2_000
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+@contextlib.contextmanager
+def quiet():
+    """Silencia os prints e barras de progresso das etapas medidas."""
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        yield
+
+
+@contextlib.contextmanager
+def config_overrides(**overrides):
+    """Altera atributos da Config temporariamente."""
+    previous = {name: getattr(Config, name) for name in overrides}
+    for name, value in overrides.items():
+        setattr(Config, name, value)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            setattr(Config, name, value)
+
+
+def measure(
+    stage: str,
+    func: Callable,
+    rows: int,
+    setup: Optional[Callable[[], tuple]] = None,
+    repeats: int = 3
+) -> Dict[str, float]:
+    """
+    Executa `func(*setup())` `repeats` vezes para medir o tempo e mais uma
+    vez sob tracemalloc para medir o pico de memória. O `setup` (ex.: cópia
+    da entrada, para etapas que a modificam) fica fora da medição.
+    """
+    timings = []
+    for _ in range(repeats):
+        args = setup() if setup is not None else ()
+        with quiet():
+            started = time.perf_counter()
+            func(*args)
+            timings.append(time.perf_counter() - started)
+
+    args = setup() if setup is not None else ()
+    tracemalloc.start()
+    try:
+        with quiet():
+            func(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    seconds = float(np.median(timings))
+    return {
+        'stage': stage,
+        'rows': rows,
+        'seconds': round(seconds, 4),
+        'rows_per_second': round(rows / seconds, 1) if seconds > 0 else None,
+        'peak_memory_mb': round(peak / 2**20, 2),
+    }
+
+
+def benchmark_processing(n_sbs: int, days: int, workdir: str, repeats: int = 3) -> List[Dict[str, float]]:
+    """Mede as etapas de transformação e de I/O para `n_sbs` SBs."""
+    reference_date = pd.Timestamp('2026-01-10')
+    start_date = reference_date - pd.Timedelta(days=Config.ROLLING_WINDOW_DAYS_PAST)
+    locations_df = make_locations(n_sbs)
+    raw_df = make_raw_weather(locations_df, start_date, days)
+    rows = len(raw_df)
+
+    with quiet():
+        processed_df = run_processing_pipeline(raw_df.copy())
+    model_input = processed_df.assign(equilibrium_temp=calculate_equilibrium_temperature_vectorized(processed_df))
+    output_path = os.path.join(workdir, f"history-{n_sbs}.parquet")
+    window_start, window_end = start_date.date(), (start_date + pd.Timedelta(days=days - 1)).date()
+
+    results = [
+        measure('equilibrium', calculate_equilibrium_temperature_vectorized, rows,
+                lambda: (processed_df,), repeats),
+        measure('inertia', apply_thermal_inertia_vectorized, rows, lambda: (model_input,), repeats),
+        # O pipeline renomeia colunas no próprio DataFrame: cada execução recebe uma cópia.
+        measure('pipeline', run_processing_pipeline, rows, lambda: (raw_df.copy(),), repeats),
+        # O pico de memória medido é só o do processo pai (os workers ficam de fora).
+        measure('pipeline_sharded', run_processing_pipeline_sharded, rows,
+                lambda: (raw_df.copy(), None, locations_df), repeats),
+        measure('rolling_window', apply_rolling_window, rows,
+                lambda: (processed_df, reference_date), repeats),
+        measure('save_output', save_output, rows,
+                lambda: (processed_df, output_path, False), repeats),
+        measure('load_history', load_history, rows,
+                lambda: (output_path, None, window_start, window_end), repeats),
+    ]
+    for result in results:
+        result['n_sbs'] = n_sbs
+    return results
+
+
+def benchmark_resolution(n_sbs: int, days: int, workdir: str, repeats: int = 3,
+                         resolution: str = "15min") -> List[Dict[str, float]]:
+    """
+    Mede inércia, pipeline e gravação com dados em outra resolução temporal
+    (estágios com sufixo `_<resolution>`), para comparar com os horários.
+    """
+    step = timestep(resolution)
+    start_date = pd.Timestamp('2026-01-10') - pd.Timedelta(days=Config.ROLLING_WINDOW_DAYS_PAST)
+    raw_df = make_raw_weather(make_locations(n_sbs), start_date, days, freq=step)
+    rows = len(raw_df)
+
+    with quiet():
+        processed_df = run_processing_pipeline(raw_df.copy(), step=step)
+    model_input = processed_df.assign(equilibrium_temp=calculate_equilibrium_temperature_vectorized(processed_df))
+    output_path = os.path.join(workdir, f"history-{n_sbs}-{resolution}.parquet")
+
+    results = [
+        measure(f'inertia_{resolution}', apply_thermal_inertia_vectorized, rows,
+                lambda: (model_input, None, step), repeats),
+        measure(f'pipeline_{resolution}', run_processing_pipeline, rows,
+                lambda: (raw_df.copy(), None, step), repeats),
+        measure(f'save_output_{resolution}', save_output, rows,
+                lambda: (processed_df, output_path, False), repeats),
+    ]
+    for result in results:
+        result['n_sbs'] = n_sbs
+    return results
+
+
+def benchmark_fetch(n_sbs: int, days: int, repeats: int = 3, latency: float = 0.0,
+                    engine: str = "threads") -> Dict[str, float]:
+    """
+    Mede `fetch_weather_data_parallel` contra o servidor local. O limite de
+    taxa é fixado bem acima do que o servidor local atende, para medir o
+    caminho de coleta (HTTP, parsing, ingestão) e não a espera do limitador.
+    """
+    locations_df = make_locations(n_sbs)
+    api_params = _api_params(days)
+    rows = n_sbs * (api_params['past_days'] + api_params['forecast_days']) * 24
+    with MockOpenMeteoServer(latency=latency) as server, config_overrides(**_fast_fetch_overrides(server, engine)):
+        result = measure(f'fetch_{engine}', fetch_weather_data_parallel, rows,
+                         lambda: (locations_df, api_params), repeats)
+    result['n_sbs'] = n_sbs
+    return result
+
+
+def _api_params(days: int, resolution: str = "hourly") -> Dict:
+    return {
+        RESOLUTION_TIME_BLOCKS[resolution]: Config.API_HOURLY_VARS,
+        'timezone': Config.API_TIMEZONE,
+        'past_days': Config.ROLLING_WINDOW_DAYS_PAST,
+        'forecast_days': max(1, days - Config.ROLLING_WINDOW_DAYS_PAST),
+    }
+
+
+def _fast_fetch_overrides(server: MockOpenMeteoServer, engine: str = "threads") -> Dict:
+    """Config para medir a coleta contra o servidor local sem a espera do limitador."""
+    return dict(
+        API_BASE_URL=server.url,
+        API_FETCH_ENGINE=engine,
+        API_CACHE_ENABLED=False,
+        FETCH_CHECKPOINT_ENABLED=False,
+        API_RATE_CONTROL="adaptive",
+        API_RATE_LIMIT_CALLS=10_000,
+        API_ADAPTIVE_MIN_RATE=10_000.0,
+        API_ADAPTIVE_MAX_RATE=10_000.0,
+    )
+
+
+def benchmark_end_to_end(n_sbs: int, days: int, workdir: str, repeats: int = 3,
+                         latency: float = 0.0, resolution: str = "hourly") -> List[Dict[str, float]]:
+    """
+    Coleta + processamento + gravação do parquet: em lote (uma fase após a
+    outra) e em streaming (fases sobrepostas, memória limitada pela fila).
+    Fora da resolução horária, os estágios recebem o sufixo `_<resolution>`.
+    """
+    locations_df = make_locations(n_sbs)
+    api_params = _api_params(days, resolution)
+    output_path = os.path.join(workdir, f"end-to-end-{n_sbs}-{resolution}.parquet")
+    rows = n_sbs * expected_rows_per_location(api_params)
+    suffix = "" if resolution == "hourly" else f"_{resolution}"
+
+    def batch():
+        raw_df = fetch_weather_data_parallel(locations_df, api_params)
+        processed_df = apply_rolling_window(run_processing_pipeline(raw_df))
+        save_output(processed_df, output_path, False)
+
+    def stream():
+        run_streaming_pipeline(locations_df, api_params, output_filepath=output_path, compact=False)
+
+    with MockOpenMeteoServer(latency=latency) as server, \
+            config_overrides(**_fast_fetch_overrides(server), TEMPORAL_RESOLUTION=resolution):
+        results = [
+            measure(f'end_to_end_batch{suffix}', batch, rows, None, repeats),
+            measure(f'end_to_end_stream{suffix}', stream, rows, None, repeats),
+        ]
+    for result in results:
+        result['n_sbs'] = n_sbs
+    return results
+
+
+def compare_results(current: List[Dict], baseline: List[Dict], tolerance: float = 0.2) -> List[str]:
+    """Lista as etapas que pioraram mais que `tolerance` em tempo ou memória."""
+    baseline_by_key = {(row['stage'], row['n_sbs']): row for row in baseline}
+    regressions = []
+    for row in current:
+        previous = baseline_by_key.get((row['stage'], row['n_sbs']))
+        if previous is None:
+            continue
+        for metric in ('seconds', 'peak_memory_mb'):
+            if previous[metric] and row[metric] > previous[metric] * (1 + tolerance):
+                regressions.append(
+                    f"{row['stage']} ({row['n_sbs']} SBs): {metric} "
+                    f"{previous[metric]} -> {row[metric]} (+{row[metric] / previous[metric] - 1:.0%})"
+                )
+    return regressions
+
+
+def run_benchmarks(
+    sb_counts: List[int] = DEFAULT_SB_COUNTS,
+    days: int = Config.ROLLING_WINDOW_DAYS_PAST + Config.ROLLING_WINDOW_DAYS_FUTURE + 1,
+    fetch_sbs: int = DEFAULT_FETCH_SBS,
+    repeats: int = 3,
+    latency: float = 0.0
+) -> Dict:
+    """Executa todas as etapas e devolve o relatório (serializável em JSON)."""
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for n_sbs in sb_counts:
+            print(f"⏱️ Etapas de processamento/I-O com {n_sbs} SBs x {days} dias...")
+            results.extend(benchmark_processing(n_sbs, days, workdir, repeats))
+            print(f"⏱️ Etapas com resolução de 15 min ({n_sbs} SBs x {days} dias)...")
+            results.extend(benchmark_resolution(n_sbs, days, workdir, repeats, "15min"))
+    if fetch_sbs:
+        for engine in ("threads", "async"):
+            print(f"⏱️ Coleta ({engine}) de {fetch_sbs} SBs contra o servidor local...")
+            results.append(benchmark_fetch(fetch_sbs, days, repeats, latency, engine))
+        for resolution in ("hourly", "15min"):
+            print(f"⏱️ Ponta a ponta (lote x streaming, {resolution}) com {fetch_sbs} SBs...")
+            with tempfile.TemporaryDirectory() as workdir:
+                results.extend(benchmark_end_to_end(fetch_sbs, days, workdir, repeats, latency, resolution))
+
+    report = {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'days': days,
+        'repeats': repeats,
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'pyarrow': pa.__version__,
+            'cpu_count': os.cpu_count(),
+        },
+        'results': results,
+    }
+    if resource is not None:
+        # ru_maxrss: KiB no Linux (pico de RSS de todo o processo).
+        report['process_max_rss_mb'] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark das etapas do ETL com dados sintéticos.")
+    parser.add_argument('--sbs', type=int, nargs='+', default=DEFAULT_SB_COUNTS, help="Quantidades de SBs.")
+    parser.add_argument('--days', type=int,
+                        default=Config.ROLLING_WINDOW_DAYS_PAST + Config.ROLLING_WINDOW_DAYS_FUTURE + 1,
+                        help="Dias por série (padrão: a janela D-3..D+3).")
+    parser.add_argument('--fetch-sbs', type=int, default=DEFAULT_FETCH_SBS,
+                        help="SBs na medição da coleta (0 desativa).")
+    parser.add_argument('--latency', type=float, default=0.0, help="Latência artificial do servidor local (s).")
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--output', help="Grava o relatório JSON neste caminho.")
+    parser.add_argument('--compare', help="Relatório JSON de referência (baseline).")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Piora tolerada (0.2 = 20%%).")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.sbs, args.days, args.fetch_sbs, args.repeats, args.latency)
+    print(pd.DataFrame(report['results']).to_string(index=False))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Relatório salvo em {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_results(report['results'], baseline['results'], args.tolerance)
+        if regressions:
+            print("❌ Regressões em relação ao baseline:")
+            for line in regressions:
+                print(f"   {line}")
+            return 1
+        print("✅ Nenhuma regressão em relação ao baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
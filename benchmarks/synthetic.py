@@ -0,0 +1,67 @@
+# benchmarks/synthetic.py
+"""
+Geradores de dados sintéticos para os benchmarks: locais no formato do
+`coordenadas.json` e séries horárias no formato devolvido pela coleta
+(`fetch_weather_data_parallel`), para qualquer quantidade de SBs.
+"""
+import numpy as np
+import pandas as pd
+
+from rail_predictor.config import Config
+
+# Quantos SBs consecutivos compartilham a mesma Sub (trecho).
+SBS_PER_SUB = 50
+
+
+def make_locations(n_sbs: int, seed: int = 0) -> pd.DataFrame:
+    """Gera `n_sbs` locais ao longo de uma linha, como o retorno de `load_locations`."""
+    rng = np.random.default_rng(seed)
+    # Os SBs seguem a via: coordenadas com deriva aleatória a partir de um ponto.
+    steps = rng.normal(0.0, 0.002, size=(n_sbs, 2)).cumsum(axis=0)
+    return pd.DataFrame({
+        Config.ID_COLUMN: [f"SB{i:06d}" for i in range(n_sbs)],
+        Config.LAT_COLUMN: -23.28 + steps[:, 0],
+        Config.LON_COLUMN: -51.21 + steps[:, 1],
+        'Sub': (np.arange(n_sbs) // SBS_PER_SUB + 1).astype(str),
+    })
+
+
+def hourly_times(start_date, days: int, freq: str = 'h') -> pd.DatetimeIndex:
+    """Horários locais (sem fuso) de `days` dias a partir de `start_date`, como na API."""
+    start = pd.Timestamp(start_date).normalize()
+    return pd.date_range(start, start + pd.Timedelta(days=days), freq=freq, inclusive='left')
+
+
+def make_raw_weather(locations_df: pd.DataFrame, start_date, days: int, seed: int = 0, freq: str = 'h') -> pd.DataFrame:
+    """
+    Gera a saída bruta da coleta (colunas da API + SB/lat/lon) para todos os
+    locais, com ciclos diários plausíveis de temperatura e radiação. `freq`
+    '15min' imita o bloco 'minutely_15'.
+    """
+    rng = np.random.default_rng(seed)
+    times = hourly_times(start_date, days, freq)
+    n_sbs, n_steps = len(locations_df), len(times)
+    shape = (n_sbs, n_steps)
+
+    hour_of_day = times.hour.to_numpy() + times.minute.to_numpy() / 60
+    hour_angle = 2 * np.pi * (hour_of_day - 15) / 24
+    daylight = np.clip(np.sin(2 * np.pi * (hour_of_day - 6) / 24), 0, None)
+
+    temperature = 22 + 6 * np.cos(hour_angle) + rng.normal(0, 1.5, size=shape)
+    radiation = 900 * daylight * rng.uniform(0.4, 1.0, size=shape)
+    wind = rng.gamma(2.0, 5.0, size=shape)
+    rain = rng.random(shape) < 0.08
+    precipitation = np.where(rain, rng.gamma(1.5, 1.2, size=shape), 0.0)
+    weather_code = np.where(rain, 61, rng.choice([0, 1, 2, 3], size=shape))
+
+    return pd.DataFrame({
+        'time': np.tile(times.to_numpy(), n_sbs),
+        'temperature_2m': temperature.ravel(),
+        'precipitation': precipitation.ravel(),
+        'weather_code': weather_code.ravel().astype(float),
+        'wind_speed_10m': wind.ravel(),
+        'shortwave_radiation': radiation.ravel(),
+        Config.ID_COLUMN: pd.Categorical(np.repeat(locations_df[Config.ID_COLUMN].to_numpy(), n_steps)),
+        Config.LAT_COLUMN: np.repeat(locations_df[Config.LAT_COLUMN].to_numpy(), n_steps),
+        Config.LON_COLUMN: np.repeat(locations_df[Config.LON_COLUMN].to_numpy(), n_steps),
+    })
@@ -0,0 +1,7 @@
+# rail_predictor/__main__.py
+"""Permite executar `python -m rail_predictor <comando>` (ver `cli`)."""
+import sys
+
+from .cli import main
+
+sys.exit(main())
@@ -4,21 +4,64 @@
 Módulo de Cliente de API.
 """
 
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
-from typing import Dict, Any, Optional
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Any, List, Optional, Tuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from tqdm import tqdm
 from ratelimit import limits, sleep_and_retry
 
 from .config import Config
+from .location_registry import POINT_ID_COLUMN
+from .response_cache import CachingHTTPAdapter, ResponseCache, create_response_cache
+from .rate_control import (
+    AdaptiveRateLimiter, THROTTLE_STATUS_CODES, create_rate_controller, parse_retry_after
+)
+from . import instrumentation
+
+logger = logging.getLogger(__name__)
+
+# Blocos de variáveis temporais da Open-Meteo, com as linhas por hora de
+# cada um, e o bloco usado por cada Config.TEMPORAL_RESOLUTION.
+TIME_BLOCKS = {'minutely_15': 4, 'hourly': 1}
+RESOLUTION_TIME_BLOCKS = {"hourly": 'hourly', "15min": 'minutely_15'}
+
+
+def time_block(api_params: Dict[str, Any]) -> str:
+    """Bloco temporal pedido nos parâmetros da API ('hourly', por padrão)."""
+    return next((block for block in TIME_BLOCKS if api_params.get(block)), 'hourly')
+
+
+def requested_variables(api_params: Dict[str, Any]) -> List[str]:
+    """Variáveis pedidas no bloco temporal dos parâmetros da API."""
+    return [var for var in str(api_params.get(time_block(api_params), '')).split(',') if var]
+
+
+def response_time_block(result: Dict[str, Any]) -> Dict[str, list]:
+    """Bloco temporal ('minutely_15' ou 'hourly') da resposta de um ponto, ou {}."""
+    return next((result[block] for block in TIME_BLOCKS if result.get(block)), {})
 
 def create_session_with_retries(
     retries=3,
     backoff_factor=0.5,
-    status_forcelist=(429, 500, 502, 503, 504)
+    status_forcelist=(429, 500, 502, 503, 504),
+    cache: Optional[ResponseCache] = None,
+    respect_retry_after=True
 ):
     session = requests.Session()
     retry = Retry(
@@ -27,67 +70,696 @@ def create_session_with_retries(
         connect=retries,
         backoff_factor=backoff_factor,
         status_forcelist=status_forcelist,
+        respect_retry_after_header=respect_retry_after,
     )
-    adapter = HTTPAdapter(max_retries=retry)
+    # Com cache, os pontos já válidos localmente nem chegam à rede.
+    adapter = CachingHTTPAdapter(cache, max_retries=retry) if cache is not None else HTTPAdapter(max_retries=retry)
     session.mount('http://', adapter)
     session.mount('https://', adapter)
     return session
 
 
 @sleep_and_retry  
-@limits(calls=10, period=1) # Limite: 10 chamadas por 1 segundo (600/min)
+@limits(calls=Config.API_RATE_LIMIT_CALLS, period=Config.API_RATE_LIMIT_PERIOD) # Padrão: 10 requisições por 1 segundo (1 local cada)
 # -------------------------------------
-def fetch_single_location(location_data: Dict[str, Any], base_params: Dict[str, Any], session: requests.Session) -> Optional[pd.DataFrame]:
-    """Busca dados meteorológicos para uma única localização geográfica."""
-    
-    location_id = str(location_data[Config.ID_COLUMN])
+def fetch_single_point(latitude: float, longitude: float, base_params: Dict[str, Any], session: requests.Session, label: str = "") -> Optional[pd.DataFrame]:
+    """Busca as séries brutas ('hourly' ou 'minutely_15') de um único ponto geográfico (sem colunas de SB)."""
     params = base_params.copy()
     params.update({
-        'latitude': location_data[Config.LAT_COLUMN],
-        'longitude': location_data[Config.LON_COLUMN]
+        'latitude': latitude,
+        'longitude': longitude
     })
-    
+    label = label or f"({latitude}, {longitude})"
+
     try:
-        response = session.get(Config.API_BASE_URL, params=params)
+        response = session.get(Config.API_BASE_URL, params=params, timeout=Config.API_REQUEST_TIMEOUT)
         response.raise_for_status()
         
-        weather_df = pd.DataFrame(response.json().get('hourly', {}))
+        weather_df = pd.DataFrame(response_time_block(response.json()))
         if weather_df.empty:
-            print(f"⚠️ Aviso: Nenhum dado 'hourly' retornado para {location_id}.")
+            logger.warning(f"⚠️ Aviso: Nenhum dado 'hourly' retornado para {label}.")
             return None
-            
-        weather_df[Config.ID_COLUMN] = location_id
-        weather_df[Config.LAT_COLUMN] = location_data[Config.LAT_COLUMN]
-        weather_df[Config.LON_COLUMN] = location_data[Config.LON_COLUMN]
         return weather_df
         
     except requests.exceptions.RequestException as e:
-        print(f"❌ ERRO API: Falha na chamada para {location_id}: {e}")
+        logger.error(f"❌ ERRO API: Falha na chamada para {label}: {e}")
+        return None
+
+
+def fan_out_to_locations(weather_df: pd.DataFrame, members: List[Dict[str, Any]]) -> pd.DataFrame:
+    """Replica o frame 'hourly' de um ponto para cada SB que compartilha esse ponto."""
+    n_rows = len(weather_df)
+    fanned_df = pd.concat([weather_df] * len(members), ignore_index=True)
+    fanned_df[Config.ID_COLUMN] = np.repeat([str(m[Config.ID_COLUMN]) for m in members], n_rows)
+    fanned_df[Config.LAT_COLUMN] = np.repeat([m[Config.LAT_COLUMN] for m in members], n_rows)
+    fanned_df[Config.LON_COLUMN] = np.repeat([m[Config.LON_COLUMN] for m in members], n_rows)
+    return fanned_df
+
+
+def fetch_single_location(location_data: Dict[str, Any], base_params: Dict[str, Any], session: requests.Session) -> Optional[pd.DataFrame]:
+    """Busca dados meteorológicos para uma única localização geográfica."""
+    location_id = str(location_data[Config.ID_COLUMN])
+    weather_df = fetch_single_point(
+        location_data[Config.LAT_COLUMN], location_data[Config.LON_COLUMN],
+        base_params, session, label=location_id
+    )
+    if weather_df is None:
         return None
+    return fan_out_to_locations(weather_df, [location_data])
+
+
+def group_locations_by_coordinate(
+    locations_df: pd.DataFrame,
+    decimals: Optional[int] = Config.COORDINATE_ROUNDING_DECIMALS
+) -> List[Dict[str, Any]]:
+    """
+    Agrupa os SBs por coordenada para que cada ponto distinto seja buscado
+    uma única vez na API.
+
+    Args:
+        locations_df: DataFrame com as colunas de ID, latitude e longitude.
+        decimals: Casas decimais para arredondar as coordenadas antes do
+            agrupamento. None agrupa apenas coordenadas idênticas.
+
+    Returns:
+        Lista de pontos, cada um com 'latitude', 'longitude' (a coordenada
+        consultada) e 'members' (os registros dos SBs daquele ponto).
+    """
+    if locations_df.empty:
+        return []
+
+    points = []
+    records = locations_df.to_dict('records')
+    if POINT_ID_COLUMN in locations_df.columns and decimals == Config.COORDINATE_ROUNDING_DECIMALS:
+        # Agrupamento já calculado no registro de locais (com o mesmo arredondamento).
+        point_codes, _ = pd.factorize(locations_df[POINT_ID_COLUMN].to_numpy())
+        order = np.argsort(point_codes, kind='stable')
+        bounds = np.flatnonzero(np.diff(point_codes[order])) + 1
+        latitudes = locations_df[Config.LAT_COLUMN].to_numpy(dtype=float)
+        longitudes = locations_df[Config.LON_COLUMN].to_numpy(dtype=float)
+        for positions in np.split(order, bounds):
+            latitude, longitude = latitudes[positions[0]], longitudes[positions[0]]
+            if decimals is not None:
+                latitude, longitude = round(latitude, decimals), round(longitude, decimals)
+            points.append({
+                'latitude': float(latitude),
+                'longitude': float(longitude),
+                'members': [records[i] for i in positions],
+            })
+        return points
+
+    keys = locations_df[[Config.LAT_COLUMN, Config.LON_COLUMN]]
+    if decimals is not None:
+        keys = keys.round(decimals)
+
+    grouped = pd.Series(range(len(records))).groupby(
+        [keys[Config.LAT_COLUMN].to_numpy(), keys[Config.LON_COLUMN].to_numpy()], sort=False
+    )
+    for (latitude, longitude), positions in grouped:
+        points.append({
+            'latitude': float(latitude),
+            'longitude': float(longitude),
+            'members': [records[i] for i in positions],
+        })
+    return points
+
+
+def build_batch_params(points: List[Dict[str, Any]], base_params: Dict[str, Any]) -> Dict[str, Any]:
+    """Monta os parâmetros de uma requisição multi-coordenada."""
+    params = base_params.copy()
+    params.update({
+        'latitude': ','.join(str(p['latitude']) for p in points),
+        'longitude': ','.join(str(p['longitude']) for p in points)
+    })
+    return params
+
+
+class BatchPayloadMismatchError(ValueError):
+    """A resposta JSON de um lote não tem um resultado por ponto pedido."""
+
+
+def check_batch_size(results: list, n_points: int):
+    """Levanta BatchPayloadMismatchError se `results` não tiver `n_points` itens."""
+    if len(results) != n_points:
+        raise BatchPayloadMismatchError(f"Resposta com {len(results)} locais para um lote de {n_points} pontos.")
+
+
+def parse_batch_payload(payload: Any, n_points: int) -> List[Optional[Dict[str, list]]]:
+    """
+    Separa a resposta JSON de um lote no bloco 'hourly' de cada ponto (None
+    para pontos sem dados). Levanta BatchPayloadMismatchError se a resposta
+    não tiver um resultado por ponto.
+    """
+    # Com uma única coordenada a API devolve um objeto; com várias, uma lista.
+    results = payload if isinstance(payload, list) else [payload]
+    check_batch_size(results, n_points)
+
+    hourly_blocks = []
+    for result in results:
+        hourly = response_time_block(result)
+        hourly_blocks.append(hourly if hourly.get('time') else None)
+    return hourly_blocks
+
+
+def collect_batch_results(points: List[Dict[str, Any]], hourly_blocks: List[Optional[Dict[str, list]]]) -> List[Tuple[Dict[str, Any], Dict[str, list]]]:
+    """Pareia pontos e blocos 'hourly' de um lote, avisando sobre os pontos sem dados."""
+    fetched = []
+    for point, hourly in zip(points, hourly_blocks):
+        if hourly is None:
+            label = str(point['members'][0][Config.ID_COLUMN])
+            logger.warning(f"⚠️ Aviso: Nenhum dado 'hourly' retornado para {label}.")
+            continue
+        fetched.append((point, hourly))
+    return fetched
+
+
+class APIUnavailableError(requests.exceptions.RequestException):
+    """
+    A API não atendeu o lote inteiro (429/5xx depois das repetições, timeout,
+    falha de conexão). Nenhum ponto é o culpado: dividir o lote só
+    multiplicaria as requisições enquanto a API limita ou está fora do ar.
+    """
+
+
+@sleep_and_retry
+# Conta requisições: com até API_BATCH_SIZE coordenadas cada, a cota da
+# Open-Meteo (por local) é consumida até API_BATCH_SIZE vezes mais rápido.
+@limits(calls=Config.API_RATE_LIMIT_CALLS, period=Config.API_RATE_LIMIT_PERIOD)
+def fetch_point_batch(points: List[Dict[str, Any]], base_params: Dict[str, Any], session: requests.Session) -> List[Optional[Dict[str, list]]]:
+    """
+    Busca vários pontos em uma única requisição multi-coordenada.
+
+    Retorna o bloco 'hourly' de cada ponto, na mesma ordem de `points` (None
+    para pontos sem dados). Erros de rede/HTTP ou respostas inconsistentes são
+    propagados para que o chamador possa dividir o lote.
+    """
+    params = build_batch_params(points, base_params)
+    started = time.monotonic()
+    try:
+        response = session.get(Config.API_BASE_URL, params=params, timeout=Config.API_REQUEST_TIMEOUT)
+    except requests.exceptions.RequestException:
+        instrumentation.record_request(time.monotonic() - started, None)
+        raise
+    instrumentation.record_response(response, time.monotonic() - started)
+    response.raise_for_status()
+    return parse_batch_payload(response.json(), len(points))
+
+
+def fetch_point_batch_adaptive(
+    points: List[Dict[str, Any]],
+    base_params: Dict[str, Any],
+    session: requests.Session,
+    limiter: AdaptiveRateLimiter,
+    retries: int = 3
+) -> List[Optional[Dict[str, list]]]:
+    """
+    Versão de `fetch_point_batch` para o controle de taxa adaptativo: cada
+    resposta (status, latência, Retry-After) alimenta o controlador AIMD, e
+    429/5xx são repetidos aqui, no ritmo do limitador, em vez de pelo
+    `Retry` do urllib3. Esgotadas as repetições, levanta
+    `APIUnavailableError`, que não divide o lote.
+    """
+    params = build_batch_params(points, base_params)
+    controller = limiter.controller
+    for attempt in range(retries + 1):
+        limiter.acquire()
+        started = time.monotonic()
+        try:
+            response = session.get(Config.API_BASE_URL, params=params, timeout=Config.API_REQUEST_TIMEOUT)
+        except requests.exceptions.RequestException as e:
+            instrumentation.record_request(time.monotonic() - started, None)
+            controller.on_error()
+            if attempt == retries:
+                raise APIUnavailableError(f"Falha de rede após {retries} repetições: {e}") from e
+            instrumentation.increment('api_retries')
+            continue
+
+        instrumentation.record_response(response, time.monotonic() - started)
+
+        # Respostas servidas pelo cache local não dizem nada sobre a API.
+        if response.headers.get('X-Cache') != 'HIT':
+            controller.on_response(
+                response.status_code, time.monotonic() - started,
+                parse_retry_after(response.headers.get('Retry-After'))
+            )
+        if response.status_code in THROTTLE_STATUS_CODES:
+            if attempt < retries:
+                instrumentation.increment('api_retries')
+                continue
+            # Repetições esgotadas com a API limitando: o controlador já
+            # reduziu a taxa, e dividir o lote só geraria mais requisições.
+            instrumentation.increment('api_throttled_batches')
+            raise APIUnavailableError(
+                f"HTTP {response.status_code} após {retries} repetições.", response=response
+            )
+        response.raise_for_status()
+        return parse_batch_payload(response.json(), len(points))
+
+
+def is_point_error(error: Exception) -> bool:
+    """
+    Falhas que podem ser atribuídas a um ponto do lote e justificam dividi-lo:
+    HTTP 400 (coordenada inválida) ou um resultado por ponto faltando
+    (BatchPayloadMismatchError). Um corpo que não é JSON (página de proxy ou
+    de manutenção) não é culpa de nenhum ponto.
+    """
+    if isinstance(error, requests.exceptions.HTTPError):
+        return error.response is not None and error.response.status_code == 400
+    return isinstance(error, BatchPayloadMismatchError)
+
+
+def _fetch_batch_splitting(
+    points: List[Dict[str, Any]],
+    base_params: Dict[str, Any],
+    session: requests.Session,
+    limiter: Optional[AdaptiveRateLimiter]
+) -> List[Tuple[Dict[str, Any], Dict[str, list]]]:
+    try:
+        if limiter is not None:
+            hourly_blocks = fetch_point_batch_adaptive(points, base_params, session, limiter)
+        else:
+            hourly_blocks = fetch_point_batch(points, base_params, session)
+    except APIUnavailableError:
+        raise
+    except (requests.exceptions.RequestException, ValueError) as e:
+        if not is_point_error(e):
+            raise APIUnavailableError(str(e)) from e
+        if len(points) == 1:
+            label = str(points[0]['members'][0][Config.ID_COLUMN])
+            logger.error(f"❌ ERRO API: Falha na chamada para {label}: {e}")
+            instrumentation.increment('api_failed_points')
+            return []
+        instrumentation.increment('api_batch_splits')
+        middle = len(points) // 2
+        return (_fetch_batch_splitting(points[:middle], base_params, session, limiter) +
+                _fetch_batch_splitting(points[middle:], base_params, session, limiter))
+
+    return collect_batch_results(points, hourly_blocks)
+
+
+def fetch_batch_with_bisection(
+    points: List[Dict[str, Any]],
+    base_params: Dict[str, Any],
+    session: requests.Session,
+    limiter: Optional[AdaptiveRateLimiter] = None
+) -> List[Tuple[Dict[str, Any], Dict[str, list]]]:
+    """
+    Busca um lote de pontos; se a API rejeitar o lote por causa de um ponto
+    (HTTP 400 ou número de resultados diferente do de pontos), divide o lote ao meio e tenta cada
+    metade, até isolar o(s) ponto(s) problemático(s).
+
+    Limitação (429), erros 5xx, falhas de rede depois das repetições e
+    respostas que não são JSON não dividem o lote: o lote inteiro falha (`APIUnavailableError`), com uma
+    única requisição em vez de uma por nó da bisseção.
+
+    Com `limiter` (controle adaptativo), usa `fetch_point_batch_adaptive`;
+    caso contrário, o limite fixo de `fetch_point_batch`.
 
+    Returns:
+        Lista de pares (ponto, bloco 'hourly') apenas para os pontos obtidos.
+    """
+    try:
+        return _fetch_batch_splitting(points, base_params, session, limiter)
+    except APIUnavailableError as e:
+        logger.error(f"❌ ERRO API: API indisponível para um lote de {len(points)} pontos: {e}")
+        instrumentation.increment('api_unavailable_batches')
+        instrumentation.increment('api_failed_points', len(points))
+        return []
+
+
+def chunk_points(points: List[Dict[str, Any]], batch_size: int = Config.API_BATCH_SIZE) -> List[List[Dict[str, Any]]]:
+    """Divide a lista de pontos em lotes de até `batch_size` coordenadas."""
+    batch_size = max(1, int(batch_size))
+    return [points[i:i + batch_size] for i in range(0, len(points), batch_size)]
+
+
+def expected_rows_per_location(api_params: Dict[str, Any]) -> int:
+    """Número de linhas (horas ou passos de 15 min) que a API devolve por local."""
+    # Padrões da Open-Meteo: past_days=0, forecast_days=7.
+    days = int(api_params.get('past_days', 0)) + int(api_params.get('forecast_days', 7))
+    return days * 24 * TIME_BLOCKS[time_block(api_params)]
+
+
+class WeatherCollector(ABC):
+    """
+    Interface dos acumuladores de resultados da coleta: recebem o bloco
+    'hourly' de cada ponto (`add`) e produzem o DataFrame final (`result`).
+    Uma subclasse sem algum dos métodos abstratos falha ao ser instanciada,
+    não no meio da coleta.
+    """
+
+    def pending_locations(self, locations_df: pd.DataFrame) -> pd.DataFrame:
+        """Locais que ainda precisam ser buscados (todos, por padrão)."""
+        return locations_df
+
+    @abstractmethod
+    def add(self, point: Dict[str, Any], hourly: Dict[str, list]):
+        """Acumula o bloco 'hourly' de um ponto para todos os seus SBs."""
+
+    @abstractmethod
+    def reset(self):
+        """Descarta as linhas acumuladas (após gravá-las em outro lugar)."""
+
+    @abstractmethod
+    def result(self) -> pd.DataFrame:
+        """DataFrame com todas as linhas acumuladas."""
+
+
+class FrameCollector(WeatherCollector):
+    """Acumula um DataFrame por ponto e os concatena no final (modo "frames")."""
+
+    def __init__(self):
+        self.frames = []
+
+    def add(self, point: Dict[str, Any], hourly: Dict[str, list]):
+        self.frames.append(fan_out_to_locations(pd.DataFrame(hourly), point['members']))
+
+    def reset(self):
+        self.frames = []
+
+    def result(self) -> pd.DataFrame:
+        if not self.frames:
+            return pd.DataFrame()
+        return pd.concat(self.frames, ignore_index=True)
+
+
+class HourlyColumnBuffer(WeatherCollector):
+    """
+    Acumula os blocos 'hourly' de todos os locais diretamente em colunas
+    NumPy pré-alocadas (modo "arrow"), sem criar um DataFrame por local.
+
+    O SB e as coordenadas são guardados como um código inteiro por linha e
+    emitidos como colunas dicionário (Arrow) / categóricas (pandas).
+    """
+
+    def __init__(self, locations_df: pd.DataFrame, variables: List[str], rows_per_location: int):
+        self.variables = list(variables)
+        location_ids = locations_df[Config.ID_COLUMN].astype(str).to_numpy()
+        # Categorias em ordem alfabética: ordenar pelo código = ordenar pelo SB.
+        order = np.argsort(location_ids, kind='stable')
+        self.location_ids = location_ids[order]
+        self.latitudes = locations_df[Config.LAT_COLUMN].to_numpy(dtype=float)[order]
+        self.longitudes = locations_df[Config.LON_COLUMN].to_numpy(dtype=float)[order]
+        self._code_by_id = {sb: code for code, sb in enumerate(self.location_ids)}
+
+        capacity = max(1, len(self.location_ids) * rows_per_location)
+        self._size = 0
+        self._codes = np.empty(capacity, dtype=np.int32)
+        self._time = np.empty(capacity, dtype='datetime64[s]')
+        self._values = {var: np.empty(capacity, dtype=np.float64) for var in self.variables}
+
+    def __len__(self):
+        return self._size
+
+    def _ensure_capacity(self, extra_rows: int):
+        required = self._size + extra_rows
+        if required <= len(self._codes):
+            return
+        # Resposta maior que o previsto: cresce por duplicação.
+        new_capacity = max(required, 2 * len(self._codes))
+        self._codes = np.resize(self._codes, new_capacity)
+        self._time = np.resize(self._time, new_capacity)
+        self._values = {var: np.resize(col, new_capacity) for var, col in self._values.items()}
+
+    def add(self, point: Dict[str, Any], hourly: Dict[str, list]):
+        times = np.asarray(hourly['time'], dtype='datetime64[s]')
+        n_rows = len(times)
+        values = {
+            var: np.asarray(hourly[var], dtype=np.float64) if var in hourly else np.full(n_rows, np.nan)
+            for var in self.variables
+        }
+
+        self._ensure_capacity(n_rows * len(point['members']))
+        for member in point['members']:
+            start, stop = self._size, self._size + n_rows
+            self._codes[start:stop] = self._code_by_id[str(member[Config.ID_COLUMN])]
+            self._time[start:stop] = times
+            for var, column in values.items():
+                self._values[var][start:stop] = column
+            self._size = stop
+
+    def reset(self):
+        # Mantém os buffers já alocados para as próximas linhas.
+        self._size = 0
+
+    def to_arrow(self) -> pa.Table:
+        """Emite as linhas acumuladas como uma única tabela Arrow."""
+        codes = self._codes[:self._size]
+        columns = {
+            'time': pa.array(self._time[:self._size]),
+            **{var: pa.array(self._values[var][:self._size]) for var in self.variables},
+            Config.ID_COLUMN: pa.DictionaryArray.from_arrays(
+                pa.array(codes, type=pa.int32()), pa.array(self.location_ids, type=pa.string())
+            ),
+            Config.LAT_COLUMN: _dictionary_from_location_codes(codes, self.latitudes),
+            Config.LON_COLUMN: _dictionary_from_location_codes(codes, self.longitudes),
+        }
+        return pa.table(columns)
+
+    def result(self) -> pd.DataFrame:
+        if self._size == 0:
+            return pd.DataFrame()
+        return self.to_arrow().to_pandas()
+
+
+def _dictionary_from_location_codes(codes: np.ndarray, values_by_location: np.ndarray) -> pa.DictionaryArray:
+    """Codifica um atributo por local como dicionário de valores únicos."""
+    # SBs que compartilham a coordenada devem apontar para a mesma entrada.
+    unique_values, inverse = np.unique(values_by_location, return_inverse=True)
+    return pa.DictionaryArray.from_arrays(
+        pa.array(inverse[codes].astype(np.int32), type=pa.int32()), pa.array(unique_values)
+    )
+
+
+def locations_fingerprint(locations_df: pd.DataFrame) -> str:
+    """Hash curto do conjunto de locais (ID e coordenadas), independente da ordem."""
+    keys = pd.DataFrame({
+        Config.ID_COLUMN: locations_df[Config.ID_COLUMN].astype(str).to_numpy(),
+        Config.LAT_COLUMN: locations_df[Config.LAT_COLUMN].to_numpy(dtype=float),
+        Config.LON_COLUMN: locations_df[Config.LON_COLUMN].to_numpy(dtype=float),
+    }).sort_values(by=[Config.ID_COLUMN, Config.LAT_COLUMN, Config.LON_COLUMN])
+    hashes = pd.util.hash_pandas_object(keys, index=False).to_numpy()
+    return hashlib.sha256(hashes.tobytes()).hexdigest()[:8]
 
-def fetch_weather_data_parallel(locations_df: pd.DataFrame, api_params: Dict[str, Any]) -> pd.DataFrame:
-    all_weather_data = []
-    locations_list = locations_df.to_dict('records')
+
+def fetch_run_key(api_params: Dict[str, Any], locations_df: Optional[pd.DataFrame] = None, run_date=None) -> str:
+    """
+    Identifica uma coleta: data da execução + hash dos parâmetros da API, do
+    modo de ingestão e do modo espacial + hash dos locais buscados (SBs ou
+    nós da grade). Checkpoints só são reaproveitados para a mesma chave.
+    Sem `locations_df`, devolve o prefixo comum às coletas desses parâmetros.
+    """
+    run_date = pd.Timestamp(run_date if run_date is not None else datetime.now()).strftime('%Y-%m-%d')
+    raw = json.dumps([
+        sorted((k, str(v)) for k, v in api_params.items()), Config.API_INGESTION, Config.API_SPATIAL_MODE
+    ])
+    key = f"fetch-{run_date}-{hashlib.sha256(raw.encode('utf-8')).hexdigest()[:8]}"
+    if locations_df is not None:
+        key = f"{key}-{locations_fingerprint(locations_df)}"
+    return key
+
+
+class FetchCheckpoint:
+    """
+    Área de staging de uma coleta: cada lote concluído é gravado como um
+    arquivo Parquet (`part-NNNNN.parquet`) em `staging_root/<chave da coleta>`.
+    Diretórios de coletas anteriores (outra data/parâmetros) são apagados.
+    """
+
+    def __init__(self, staging_root: str, run_key: str):
+        self.directory = os.path.join(staging_root, run_key)
+        if os.path.isdir(staging_root):
+            for name in os.listdir(staging_root):
+                if name != run_key and name.startswith('fetch-'):
+                    shutil.rmtree(os.path.join(staging_root, name), ignore_errors=True)
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _part_files(self) -> List[str]:
+        return sorted(
+            os.path.join(self.directory, name) for name in os.listdir(self.directory)
+            if name.startswith('part-') and name.endswith('.parquet')
+        )
+
+    def staged_ids(self) -> set:
+        """SBs que já têm dados na área de staging."""
+        staged = set()
+        for path in self._part_files():
+            ids = pq.read_table(path, columns=[Config.ID_COLUMN]).column(0)
+            staged.update(str(sb) for sb in pc.unique(ids.cast(pa.string())).to_pylist())
+        return staged
+
+    def write(self, df: pd.DataFrame):
+        """Grava um lote concluído (renomeação atômica do arquivo temporário)."""
+        if df.empty:
+            return
+        part_path = os.path.join(self.directory, f"part-{len(self._part_files()):05d}.parquet")
+        tmp_path = part_path + '.tmp'
+        df.to_parquet(tmp_path, index=False, engine='pyarrow')
+        os.replace(tmp_path, part_path)
+
+    def read(self) -> pd.DataFrame:
+        """Lê todos os lotes gravados como um único DataFrame."""
+        tables = [pq.read_table(path) for path in self._part_files()]
+        if not tables:
+            return pd.DataFrame()
+        return pa.concat_tables(tables).to_pandas()
+
+    def clear(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class CheckpointCollector(WeatherCollector):
+    """
+    Envolve outro acumulador e descarrega as linhas na área de staging a
+    cada `flush_every` pontos, para que uma falha no meio da coleta não
+    perca o que já foi buscado. O resultado final é lido do staging.
+    """
+
+    def __init__(self, inner: WeatherCollector, checkpoint: FetchCheckpoint, flush_every: int):
+        self.inner = inner
+        self.checkpoint = checkpoint
+        self.flush_every = max(1, int(flush_every))
+        self._points_since_flush = 0
+
+    def pending_locations(self, locations_df: pd.DataFrame) -> pd.DataFrame:
+        staged = self.checkpoint.staged_ids()
+        if not staged:
+            return locations_df
+        pending_df = locations_df[~locations_df[Config.ID_COLUMN].astype(str).isin(staged)]
+        logger.info(f"⏯️ Retomando coleta: {len(locations_df) - len(pending_df)} SBs já estavam no staging.")
+        return pending_df
+
+    def add(self, point: Dict[str, Any], hourly: Dict[str, list]):
+        self.inner.add(point, hourly)
+        self._points_since_flush += 1
+        if self._points_since_flush >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        self.checkpoint.write(self.inner.result())
+        self.inner.reset()
+        self._points_since_flush = 0
+
+    def reset(self):
+        self.inner.reset()
+        self._points_since_flush = 0
+
+    def result(self) -> pd.DataFrame:
+        self.flush()
+        return self.checkpoint.read()
+
+
+def open_fetch_checkpoint(api_params: Dict[str, Any], locations_df: pd.DataFrame, run_date=None) -> FetchCheckpoint:
+    """Abre (ou cria) a área de staging da coleta de hoje para estes parâmetros e locais."""
+    return FetchCheckpoint(Config.FETCH_STAGING_DIR, fetch_run_key(api_params, locations_df, run_date))
+
+
+def clear_fetch_checkpoint(api_params: Dict[str, Any], run_date=None):
+    """
+    Apaga o staging da coleta depois que a execução terminou com sucesso
+    (qualquer conjunto de locais: no modo "grid" a coleta busca os nós).
+    """
+    staging_root = Config.FETCH_STAGING_DIR
+    if not Config.FETCH_CHECKPOINT_ENABLED or not os.path.isdir(staging_root):
+        return
+    prefix = fetch_run_key(api_params, run_date=run_date)
+    for name in os.listdir(staging_root):
+        if name == prefix or name.startswith(f"{prefix}-"):
+            shutil.rmtree(os.path.join(staging_root, name), ignore_errors=True)
+
+
+def make_collector(locations_df: pd.DataFrame, api_params: Dict[str, Any]) -> WeatherCollector:
+    """
+    Cria o acumulador de resultados conforme Config.API_INGESTION, envolvido
+    pelo checkpoint em disco se Config.FETCH_CHECKPOINT_ENABLED.
+    """
+    if Config.API_INGESTION == "arrow":
+        variables = requested_variables(api_params)
+        collector = HourlyColumnBuffer(locations_df, variables, expected_rows_per_location(api_params))
+    else:
+        collector = FrameCollector()
+
+    if Config.FETCH_CHECKPOINT_ENABLED:
+        collector = CheckpointCollector(
+            collector, open_fetch_checkpoint(api_params, locations_df), Config.FETCH_CHECKPOINT_EVERY_POINTS
+        )
+    return collector
+
+
+def fetch_weather_data_parallel(
+    locations_df: pd.DataFrame,
+    api_params: Dict[str, Any],
+    collector: Optional[WeatherCollector] = None
+) -> pd.DataFrame:
+    """
+    Busca os dados de todos os locais e devolve `collector.result()`.
+
+    Args:
+        collector: Acumulador dos resultados (padrão: `make_collector`). O
+            modo streaming passa um coletor que processa e grava os lotes à
+            medida que chegam; se `add` bloquear, a coleta espera. Com
+            Config.API_SPATIAL_MODE = "grid" e sem coletor, busca os nós da
+            grade e interpola para os SBs (ver `spatial`).
+    """
+    if Config.API_SPATIAL_MODE == "grid" and collector is None:
+        # Importação tardia: o módulo espacial usa as funções deste módulo.
+        from .spatial import fetch_weather_data_interpolated
+        return fetch_weather_data_interpolated(locations_df, api_params)
+
+    if Config.API_FETCH_ENGINE == "async":
+        # Importação tardia: o motor assíncrono depende de httpx.
+        from .async_client import fetch_weather_data_async
+        return fetch_weather_data_async(locations_df, api_params, collector)
+
+    if collector is None:
+        collector = make_collector(locations_df, api_params)
+    pending_df = collector.pending_locations(locations_df)
+    points = group_locations_by_coordinate(pending_df, Config.COORDINATE_ROUNDING_DECIMALS)
+    if len(points) < len(pending_df):
+        logger.info(f"🔁 {len(pending_df)} SBs agrupados em {len(points)} pontos distintos.")
+    batches = chunk_points(points, Config.API_BATCH_SIZE)
     
-    session = create_session_with_retries()
+    cache = create_response_cache()
+    controller = create_rate_controller()
+    limiter = AdaptiveRateLimiter(controller) if controller is not None else None
+    # No modo adaptativo os 429/5xx precisam chegar ao controlador, então o
+    # urllib3 só repete falhas de conexão.
+    if limiter is not None:
+        session = create_session_with_retries(status_forcelist=(), cache=cache, respect_retry_after=False)
+    else:
+        session = create_session_with_retries(cache=cache)
     
-    with tqdm(total=len(locations_list), desc="Coletando dados da API", unit="local") as pbar:
+    with tqdm(total=len(points), desc="Coletando dados da API", unit="ponto") as pbar:
         with ThreadPoolExecutor(max_workers=Config.MAX_API_WORKERS) as executor: 
-            futures = {
-                executor.submit(fetch_single_location, loc, api_params, session): loc
-                for loc in locations_list
-            }
-            
-            for future in as_completed(futures):
-                result_df = future.result()
-                if result_df is not None:
-                    all_weather_data.append(result_df)
-                pbar.update(1)
+            # Mantém no máximo 2 lotes por worker em andamento: os lotes são
+            # submetidos conforme os anteriores são entregues ao coletor, de
+            # modo que um coletor lento (streaming) segura a coleta em vez de
+            # acumular respostas em memória.
+            remaining = iter(batches)
+            futures = {}
+
+            def submit_next():
+                batch = next(remaining, None)
+                if batch is not None:
+                    futures[executor.submit(fetch_batch_with_bisection, batch, api_params, session, limiter)] = batch
+
+            for _ in range(2 * Config.MAX_API_WORKERS):
+                submit_next()
+
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    batch = futures.pop(future)
+                    for point, hourly in future.result():
+                        collector.add(point, hourly)
+                    pbar.update(len(batch))
+                    submit_next()
 
     session.close() 
+    if controller is not None:
+        logger.info(controller.summary())
+    if cache is not None:
+        logger.info(cache.summary())
+        cache.close()
 
-    if not all_weather_data:
-        return pd.DataFrame()
-        
-    return pd.concat(all_weather_data, ignore_index=True)
\ No newline at end of file
+    return collector.result()
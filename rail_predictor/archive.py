@@ -0,0 +1,293 @@
+# rail_predictor/archive.py
+"""
+Módulo do Arquivo Histórico de Previsões.
+
+A janela móvel descarta tudo fora de D-3..D+3; com ARCHIVE_ENABLED, cada
+execução também acrescenta a previsão que emitiu a um arquivo de longo
+prazo, para avaliar a qualidade da previsão e rever eventos de calor.
+
+Layout (append-only, uma partição por data de emissão):
+
+    ARCHIVE_DIR/issue_date=AAAA-MM-DD/part-<execução>-<n>.parquet
+    ARCHIVE_DIR/_index.parquet
+
+Cada parte é ordenada por SB e datetime (hora prevista) e gravada em row
+groups de ARCHIVE_ROW_GROUP_SIZE linhas. O índice guarda, por row group, o
+arquivo, o intervalo de SBs e o intervalo de horas; `query_archive` o
+consulta para ler só os row groups que podem conter as linhas pedidas.
+"""
+import logging
+import os
+import shutil
+import uuid
+from datetime import date, datetime
+from typing import Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from .config import Config
+from .data_io import MEASURE_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+ISSUE_PARTITION = 'issue_date'
+INDEX_FILE = '_index.parquet'
+INDEX_COLUMNS = [ISSUE_PARTITION, 'file', 'row_group', 'sb_min', 'sb_max', 'time_min', 'time_max', 'rows']
+# Colunas arquivadas (lat/lon ficam no registro de locais / dimensão).
+ARCHIVE_COLUMNS = [
+    Config.ID_COLUMN, 'datetime', 'estimated_rail_temp', 'sky_condition', 'temperature_celsius',
+    'precipitation_mm', 'wind_speed_kmh', 'solar_radiation_wm2'
+]
+
+
+def _issue_label(issue_date=None) -> str:
+    return pd.Timestamp(datetime.now() if issue_date is None else issue_date).strftime('%Y-%m-%d')
+
+
+def _as_list(values) -> list:
+    """Aceita um valor único (SB, data, date, Timestamp) ou uma lista deles."""
+    return list(values) if pd.api.types.is_list_like(values) else [values]
+
+
+def _end_bound(end) -> Tuple[pd.Timestamp, bool]:
+    """
+    Limite superior das horas previstas e se ele é inclusivo. Uma data sem
+    hora ('AAAA-MM-DD' ou `date`) cobre o dia inteiro: vira o início do dia
+    seguinte, exclusivo. Um horário é inclusivo.
+    """
+    if isinstance(end, str):
+        try:
+            end = date.fromisoformat(end.strip())
+        except ValueError:
+            pass
+    if isinstance(end, date) and not isinstance(end, datetime):
+        return pd.Timestamp(end) + pd.Timedelta(days=1), False
+    return pd.Timestamp(end), True
+
+
+def _partition_dir(root: str, issue_label: str) -> str:
+    return os.path.join(root, f"{ISSUE_PARTITION}={issue_label}")
+
+
+def load_archive_index(root: str = Config.ARCHIVE_DIR) -> pd.DataFrame:
+    """Carrega o índice do arquivo (uma linha por row group), ou um índice vazio."""
+    try:
+        return pd.read_parquet(os.path.join(root, INDEX_FILE))
+    except FileNotFoundError:
+        return pd.DataFrame(columns=INDEX_COLUMNS)
+
+
+def _save_archive_index(index_df: pd.DataFrame, root: str):
+    """Grava o índice de forma atômica (arquivo temporário + os.replace)."""
+    index_path = os.path.join(root, INDEX_FILE)
+    tmp_path = f"{index_path}.tmp-{uuid.uuid4().hex}"
+    index_df.to_parquet(tmp_path, index=False, engine='pyarrow')
+    os.replace(tmp_path, index_path)
+
+
+def _to_archive_table(df: pd.DataFrame) -> pa.Table:
+    """Ordena por SB e datetime e converte para o esquema do arquivo (medidas em float32)."""
+    columns = [col for col in ARCHIVE_COLUMNS if col in df.columns]
+    df = pd.DataFrame({col: df[col] for col in columns}, copy=False)
+    df[Config.ID_COLUMN] = df[Config.ID_COLUMN].astype(str)
+    df['datetime'] = pd.to_datetime(df['datetime']).astype('datetime64[ms]')
+    if 'sky_condition' in df.columns:
+        df['sky_condition'] = df['sky_condition'].astype(str)
+    for col in MEASURE_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('float32')
+    df = df.sort_values(by=[Config.ID_COLUMN, 'datetime'], kind='stable')
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def _row_group_index(table: pa.Table, row_group_size: int) -> pd.DataFrame:
+    """Intervalos de SB e de hora de cada row group de uma tabela já ordenada."""
+    starts = np.arange(0, table.num_rows, row_group_size)
+    stops = np.minimum(starts + row_group_size, table.num_rows)
+    sbs = table.column(Config.ID_COLUMN).to_numpy(zero_copy_only=False)
+    times = table.column('datetime').to_numpy()
+    return pd.DataFrame({
+        'row_group': np.arange(len(starts)),
+        # Ordenado por SB: o primeiro e o último SB de cada grupo são os extremos.
+        'sb_min': sbs[starts],
+        'sb_max': sbs[stops - 1],
+        'time_min': np.minimum.reduceat(times, starts),
+        'time_max': np.maximum.reduceat(times, starts),
+        'rows': stops - starts,
+    })
+
+
+class ArchiveWriter:
+    """
+    Grava a previsão de uma execução na partição da sua data de emissão.
+
+    Cada `write` grava uma parte (as execuções em streaming gravam um bloco
+    de SBs por vez) em um diretório temporário. Em `close()` as partes vão
+    para a partição e o índice é trocado de forma atômica: reexecuções no
+    mesmo dia substituem a emissão do dia inteira e uma falha no meio da
+    execução não deixa o arquivo pela metade.
+    """
+
+    def __init__(
+        self,
+        root: str = Config.ARCHIVE_DIR,
+        issue_date=None,
+        row_group_size: int = Config.ARCHIVE_ROW_GROUP_SIZE,
+        compression: str = Config.ARCHIVE_COMPRESSION
+    ):
+        self.root = root
+        self.issue_label = _issue_label(issue_date)
+        self.row_group_size = max(1, int(row_group_size))
+        self.compression = compression
+        self.rows_written = 0
+        # Nomes únicos por execução: as partes novas convivem com as de uma
+        # execução anterior do mesmo dia até o índice ser trocado.
+        self._run_id = uuid.uuid4().hex[:12]
+        self._staging_dir = os.path.join(root, f".staging-{self._run_id}")
+        self._index_parts: List[pd.DataFrame] = []
+
+    def write(self, df: pd.DataFrame):
+        if df.empty:
+            return
+        table = _to_archive_table(df)
+        os.makedirs(self._staging_dir, exist_ok=True)
+        file_name = f"part-{self._run_id}-{len(self._index_parts)}.parquet"
+        pq.write_table(
+            table, os.path.join(self._staging_dir, file_name),
+            row_group_size=self.row_group_size, compression=self.compression
+        )
+        index_df = _row_group_index(table, self.row_group_size)
+        index_df.insert(0, 'file', f"{ISSUE_PARTITION}={self.issue_label}/{file_name}")
+        index_df.insert(0, ISSUE_PARTITION, self.issue_label)
+        self._index_parts.append(index_df)
+        self.rows_written += table.num_rows
+
+    def close(self):
+        """Publica a partição e atualiza o índice (nada muda se não houve linhas)."""
+        if not self._index_parts:
+            self.abort()
+            return
+        target_dir = _partition_dir(self.root, self.issue_label)
+        os.makedirs(target_dir, exist_ok=True)
+        new_files = sorted(os.listdir(self._staging_dir))
+        for file_name in new_files:
+            os.replace(os.path.join(self._staging_dir, file_name), os.path.join(target_dir, file_name))
+        self.abort()
+
+        # A gravação do índice é o ponto de confirmação: até ela, as consultas
+        # seguem lendo as partes anteriores da mesma data de emissão.
+        previous_index = load_archive_index(self.root)
+        is_replaced = (previous_index[ISSUE_PARTITION] == self.issue_label).to_numpy()
+        index_df = pd.concat([previous_index[~is_replaced]] + self._index_parts, ignore_index=True)
+        try:
+            _save_archive_index(index_df.sort_values(by=[ISSUE_PARTITION, 'file', 'row_group']), self.root)
+        except BaseException:
+            for file_name in new_files:
+                os.remove(os.path.join(target_dir, file_name))
+            raise
+        for file_name in set(previous_index.loc[is_replaced, 'file']):
+            try:
+                os.remove(os.path.join(self.root, file_name))
+            except FileNotFoundError:
+                pass
+        logger.info(
+            f"🗄️ Previsão de {self.issue_label} arquivada em '{self.root}': "
+            f"{self.rows_written} linhas em {sum(len(part) for part in self._index_parts)} row groups."
+        )
+
+    def abort(self):
+        shutil.rmtree(self._staging_dir, ignore_errors=True)
+
+
+def archive_forecast(df: pd.DataFrame, root: str = Config.ARCHIVE_DIR, issue_date=None):
+    """Arquiva a previsão de uma execução (uma única parte)."""
+    writer = ArchiveWriter(root, issue_date, Config.ARCHIVE_ROW_GROUP_SIZE, Config.ARCHIVE_COMPRESSION)
+    try:
+        writer.write(df)
+        writer.close()
+    except Exception as e:
+        writer.abort()
+        logger.error(f"❌ ERRO: Falha ao arquivar a previsão. Detalhes: {e}")
+
+
+def select_row_groups(
+    index_df: pd.DataFrame,
+    sbs: Optional[Union[str, Iterable[str]]] = None,
+    start=None,
+    end=None,
+    issue_date=None
+) -> pd.DataFrame:
+    """Linhas do índice cujos row groups podem conter as linhas pedidas."""
+    mask = np.ones(len(index_df), dtype=bool)
+    if issue_date is not None:
+        mask &= index_df[ISSUE_PARTITION].isin({_issue_label(day) for day in _as_list(issue_date)}).to_numpy()
+    if start is not None:
+        mask &= (pd.to_datetime(index_df['time_max']) >= pd.Timestamp(start)).to_numpy()
+    if end is not None:
+        end, inclusive = _end_bound(end)
+        time_min = pd.to_datetime(index_df['time_min'])
+        mask &= (time_min <= end if inclusive else time_min < end).to_numpy()
+    if sbs is not None:
+        # Algum SB pedido cai em [sb_min, sb_max]: busca binária na lista ordenada.
+        wanted = np.sort(np.asarray([str(sb) for sb in _as_list(sbs)], dtype=object))
+        low = np.searchsorted(wanted, index_df['sb_min'].to_numpy(dtype=object), side='left')
+        high = np.searchsorted(wanted, index_df['sb_max'].to_numpy(dtype=object), side='right')
+        mask &= high > low
+    return index_df[mask]
+
+
+def query_archive(
+    sbs: Optional[Union[str, Iterable[str]]] = None,
+    start=None,
+    end=None,
+    issue_date: Optional[Union[str, Iterable]] = None,
+    root: str = Config.ARCHIVE_DIR,
+    columns: Optional[List[str]] = None
+) -> pd.DataFrame:
+    """
+    Consulta o arquivo de previsões.
+
+    Args:
+        sbs: SB ou lista de SBs desejados (None = todos).
+        start / end: Intervalo de horas previstas ('datetime'), inclusivo. Um
+            `end` só com a data ('AAAA-MM-DD' ou date) inclui o dia inteiro.
+        issue_date: Data de emissão (str, date, datetime), ou lista de datas (None = todas).
+        columns: Colunas a ler além de SB e datetime (None = todas).
+
+    Returns:
+        DataFrame com 'issue_date' e as colunas do arquivo, ordenado por
+        emissão, SB e datetime (vazio se nada for encontrado).
+    """
+    selected = select_row_groups(load_archive_index(root), sbs, start, end, issue_date)
+    if selected.empty:
+        return pd.DataFrame()
+    read_columns = None
+    if columns is not None:
+        read_columns = [Config.ID_COLUMN, 'datetime'] + [col for col in columns if col not in (Config.ID_COLUMN, 'datetime')]
+
+    tables = []
+    for (issue_label, file_name), groups in selected.groupby([ISSUE_PARTITION, 'file'], sort=True):
+        table = pq.ParquetFile(os.path.join(root, file_name)).read_row_groups(
+            groups['row_group'].astype(int).tolist(), columns=read_columns
+        )
+        # Os row groups podem ter outras linhas: filtra as exatas.
+        mask = pa.array(np.ones(table.num_rows, dtype=bool))
+        if sbs is not None:
+            mask = pc.and_(mask, pc.is_in(table.column(Config.ID_COLUMN), pa.array([str(sb) for sb in _as_list(sbs)])))
+        if start is not None:
+            mask = pc.and_(mask, pc.greater_equal(table.column('datetime'), pa.scalar(pd.Timestamp(start), table.schema.field('datetime').type)))
+        if end is not None:
+            end_bound, inclusive = _end_bound(end)
+            compare = pc.less_equal if inclusive else pc.less
+            mask = pc.and_(mask, compare(table.column('datetime'), pa.scalar(end_bound, table.schema.field('datetime').type)))
+        table = table.filter(mask)
+        tables.append(table.append_column(ISSUE_PARTITION, pa.array([issue_label] * table.num_rows, pa.string())))
+
+    result = pa.concat_tables(tables).to_pandas()
+    result[ISSUE_PARTITION] = pd.to_datetime(result[ISSUE_PARTITION])
+    ordered = [ISSUE_PARTITION] + [col for col in result.columns if col != ISSUE_PARTITION]
+    return result[ordered].sort_values(by=[ISSUE_PARTITION, Config.ID_COLUMN, 'datetime']).reset_index(drop=True)
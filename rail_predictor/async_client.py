@@ -0,0 +1,271 @@
+# rail_predictor/async_client.py
+"""
+Módulo de Cliente de API Assíncrono (asyncio + httpx).
+
+Alternativa ao motor de threads de `api_client`: todas as requisições
+compartilham um único pool de conexões limitado e um token bucket
+assíncrono, de modo que a espera pelo limite de taxa não ocupa threads.
+"""
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+
+import httpx
+import pandas as pd
+from tqdm import tqdm
+
+from .config import Config
+from .response_cache import ResponseCache, create_response_cache
+from .rate_control import (
+    AimdRateController, THROTTLE_STATUS_CODES, create_rate_controller, parse_retry_after
+)
+from .api_client import (
+    APIUnavailableError,
+    BatchPayloadMismatchError,
+    build_batch_params,
+    check_batch_size,
+    chunk_points,
+    collect_batch_results,
+    group_locations_by_coordinate,
+    make_collector,
+    parse_batch_payload,
+)
+from . import instrumentation
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncTokenBucket:
+    """
+    Token bucket assíncrono: libera até `rate` requisições por segundo, com
+    rajadas de até `capacity` requisições. Compartilhado por todas as tarefas.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None, controller: Optional[AimdRateController] = None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(rate, 1.0))
+        # Com um controlador AIMD, a taxa acompanha `controller.rate` e as
+        # pausas pedidas via Retry-After são respeitadas.
+        self.controller = controller
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Aguarda até que haja um token disponível e o consome."""
+        async with self._lock:
+            while True:
+                if self.controller is not None:
+                    self.rate = self.controller.rate
+                    pause = self.controller.wait_time()
+                    if pause > 0:
+                        await asyncio.sleep(pause)
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+async def fetch_point_batch_async(
+    points: List[Dict[str, Any]],
+    base_params: Dict[str, Any],
+    client: httpx.AsyncClient,
+    bucket: AsyncTokenBucket,
+    cache: Optional[ResponseCache] = None,
+    retries: int = 3,
+    backoff_factor: float = 0.5
+) -> List[Optional[Dict[str, list]]]:
+    """
+    Versão assíncrona de `api_client.fetch_point_batch`. Repete a requisição
+    (com backoff exponencial) para os códigos em THROTTLE_STATUS_CODES e para
+    falhas de transporte, como o `Retry` do urllib3 faz no motor de threads;
+    esgotadas as repetições, levanta `APIUnavailableError`.
+    Com `cache`, apenas os pontos ausentes ou vencidos são pedidos à API.
+    """
+    results: List[Any] = [None] * len(points)
+    keys = []
+    if cache is not None:
+        keys = [ResponseCache.make_key(Config.API_BASE_URL, base_params, p['latitude'], p['longitude']) for p in points]
+        for i, key in enumerate(keys):
+            entry = cache.lookup(key)
+            if entry is not None and entry['fresh']:
+                results[i] = entry['result']
+    missing = [i for i, result in enumerate(results) if result is None]
+    if cache is not None:
+        cache.record(hits=len(points) - len(missing), misses=len(missing))
+    if not missing:
+        return parse_batch_payload(results, len(points))
+
+    params = build_batch_params([points[i] for i in missing], base_params)
+    controller = bucket.controller
+    for attempt in range(retries + 1):
+        await bucket.acquire()
+        started = time.monotonic()
+        try:
+            response = await client.get(Config.API_BASE_URL, params=params)
+        except httpx.TransportError as e:
+            instrumentation.record_request(time.monotonic() - started, None)
+            if controller is not None:
+                controller.on_error()
+            if attempt == retries:
+                raise APIUnavailableError(f"Falha de rede após {retries} repetições: {e!r}") from e
+        else:
+            instrumentation.record_request(time.monotonic() - started, response.status_code)
+            if controller is not None:
+                controller.on_response(
+                    response.status_code, time.monotonic() - started,
+                    parse_retry_after(response.headers.get('Retry-After'))
+                )
+            if response.status_code in THROTTLE_STATUS_CODES and attempt == retries:
+                instrumentation.increment('api_throttled_batches')
+                raise APIUnavailableError(f"HTTP {response.status_code} após {retries} repetições.")
+            if response.status_code not in THROTTLE_STATUS_CODES:
+                response.raise_for_status()
+                payload = response.json()
+                fetched = payload if isinstance(payload, list) else [payload]
+                check_batch_size(fetched, len(missing))
+                for i, result in zip(missing, fetched):
+                    results[i] = result
+                    if cache is not None:
+                        cache.store(keys[i], result)
+                return parse_batch_payload(results, len(points))
+        instrumentation.increment('api_retries')
+        if controller is None:
+            # No modo adaptativo o próprio controlador já reduziu a taxa.
+            await asyncio.sleep(backoff_factor * (2 ** attempt))
+
+
+def _is_point_error(error: Exception) -> bool:
+    """Como `api_client.is_point_error`: só HTTP 400 ou resultados faltando dividem o lote."""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code == 400
+    return isinstance(error, BatchPayloadMismatchError)
+
+
+async def _fetch_batch_splitting_async(
+    points: List[Dict[str, Any]],
+    base_params: Dict[str, Any],
+    client: httpx.AsyncClient,
+    bucket: AsyncTokenBucket,
+    cache: Optional[ResponseCache]
+) -> List[Tuple[Dict[str, Any], Dict[str, list]]]:
+    try:
+        hourly_blocks = await fetch_point_batch_async(points, base_params, client, bucket, cache)
+    except APIUnavailableError:
+        raise
+    except (httpx.HTTPError, ValueError) as e:
+        if not _is_point_error(e):
+            raise APIUnavailableError(repr(e)) from e
+        if len(points) == 1:
+            label = str(points[0]['members'][0][Config.ID_COLUMN])
+            logger.error(f"❌ ERRO API: Falha na chamada para {label}: {e!r}")
+            instrumentation.increment('api_failed_points')
+            return []
+        instrumentation.increment('api_batch_splits')
+        middle = len(points) // 2
+        halves = await asyncio.gather(
+            _fetch_batch_splitting_async(points[:middle], base_params, client, bucket, cache),
+            _fetch_batch_splitting_async(points[middle:], base_params, client, bucket, cache),
+        )
+        return halves[0] + halves[1]
+
+    return collect_batch_results(points, hourly_blocks)
+
+
+async def fetch_batch_with_bisection_async(
+    points: List[Dict[str, Any]],
+    base_params: Dict[str, Any],
+    client: httpx.AsyncClient,
+    bucket: AsyncTokenBucket,
+    cache: Optional[ResponseCache] = None
+) -> List[Tuple[Dict[str, Any], Dict[str, list]]]:
+    """
+    Versão assíncrona de `api_client.fetch_batch_with_bisection`: divide o
+    lote só em HTTP 400 ou resultados faltando; com a API limitando ou
+    fora do ar, o lote inteiro falha sem novas requisições.
+    """
+    try:
+        return await _fetch_batch_splitting_async(points, base_params, client, bucket, cache)
+    except APIUnavailableError as e:
+        logger.error(f"❌ ERRO API: API indisponível para um lote de {len(points)} pontos: {e}")
+        instrumentation.increment('api_unavailable_batches')
+        instrumentation.increment('api_failed_points', len(points))
+        return []
+
+
+async def _fetch_all_batches(batches: List[List[Dict[str, Any]]], api_params: Dict[str, Any], total_points: int, collector, cache=None):
+    controller = create_rate_controller()
+    bucket = AsyncTokenBucket(Config.API_RATE_LIMIT_CALLS / Config.API_RATE_LIMIT_PERIOD, controller=controller)
+    limits = httpx.Limits(
+        max_connections=Config.MAX_API_WORKERS,
+        max_keepalive_connections=Config.MAX_API_WORKERS
+    )
+    # O tempo de espera por uma conexão livre do pool não conta como timeout:
+    # a concorrência já é limitada pelo número de workers abaixo.
+    timeout = httpx.Timeout(Config.API_REQUEST_TIMEOUT, pool=None)
+    # Como no motor de threads, no máximo 2 lotes por worker em andamento:
+    # MAX_API_WORKERS buscando e outros tantos na fila. Um coletor lento
+    # (streaming) segura os workers e, com eles, o produtor.
+    queue: asyncio.Queue = asyncio.Queue(maxsize=Config.MAX_API_WORKERS)
+    # Uma única thread entrega os lotes ao coletor: `add` pode bloquear (fila
+    # cheia do streaming) ou gravar em disco (checkpoint) sem parar o event
+    # loop, e o coletor continua sendo chamado de um só lado.
+    loop = asyncio.get_running_loop()
+    delivery = ThreadPoolExecutor(max_workers=1, thread_name_prefix="collector")
+
+    def deliver(fetched):
+        for point, hourly in fetched:
+            collector.add(point, hourly)
+
+    async with httpx.AsyncClient(limits=limits, timeout=timeout) as client:
+        with tqdm(total=total_points, desc="Coletando dados da API (async)", unit="ponto") as pbar:
+            async def produce():
+                for batch in batches:
+                    await queue.put(batch)
+                for _ in range(Config.MAX_API_WORKERS):
+                    await queue.put(None)
+
+            async def worker():
+                while True:
+                    batch = await queue.get()
+                    if batch is None:
+                        return
+                    fetched = await fetch_batch_with_bisection_async(batch, api_params, client, bucket, cache)
+                    # Entrega cada lote assim que concluído (permite checkpoint);
+                    # o worker só pega o próximo lote depois da entrega.
+                    await loop.run_in_executor(delivery, deliver, fetched)
+                    pbar.update(len(batch))
+
+            try:
+                await asyncio.gather(produce(), *(worker() for _ in range(Config.MAX_API_WORKERS)))
+            finally:
+                delivery.shutdown(wait=True)
+
+    if controller is not None:
+        logger.info(controller.summary())
+
+
+def fetch_weather_data_async(locations_df: pd.DataFrame, api_params: Dict[str, Any], collector=None) -> pd.DataFrame:
+    """
+    Motor assíncrono com a mesma assinatura e saída de
+    `api_client.fetch_weather_data_parallel`.
+    """
+    if collector is None:
+        collector = make_collector(locations_df, api_params)
+    pending_df = collector.pending_locations(locations_df)
+    points = group_locations_by_coordinate(pending_df, Config.COORDINATE_ROUNDING_DECIMALS)
+    if len(points) < len(pending_df):
+        logger.info(f"🔁 {len(pending_df)} SBs agrupados em {len(points)} pontos distintos.")
+    batches = chunk_points(points, Config.API_BATCH_SIZE)
+
+    cache = create_response_cache()
+    asyncio.run(_fetch_all_batches(batches, api_params, len(points), collector, cache))
+    if cache is not None:
+        logger.info(cache.summary())
+        cache.close()
+    return collector.result()
@@ -0,0 +1,251 @@
+# rail_predictor/calibration.py
+"""
+Módulo de Calibração do Modelo Térmico.
+
+Compara a temperatura estimada com medições de campo do trilho para muitas
+combinações dos parâmetros do modelo (RADIATION_TO_CELSIUS_FACTOR,
+WIND_ADJUSTMENT_FACTOR, RAIN_ADDITION_CELSIUS, THERMAL_RETENTION_FACTOR).
+
+As séries meteorológicas dos SBs medidos são organizadas uma única vez em
+matrizes SB x hora; a temperatura de equilíbrio e a recorrência da inércia
+são então avaliadas para um bloco de combinações por vez, com os
+parâmetros em um eixo extra (parâmetro x SB x hora), em vez de uma
+execução do pipeline por combinação.
+"""
+import itertools
+import logging
+import os
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .config import Config
+from .processing import equilibrium_temperature, retention_for_step, thermal_inertia_recurrence, timestep
+
+logger = logging.getLogger(__name__)
+
+PARAMETERS = (
+    'RADIATION_TO_CELSIUS_FACTOR', 'WIND_ADJUSTMENT_FACTOR',
+    'RAIN_ADDITION_CELSIUS', 'THERMAL_RETENTION_FACTOR'
+)
+WEATHER_COLUMNS = ['temperature_celsius', 'wind_speed_kmh', 'precipitation_mm', 'solar_radiation_wm2']
+
+
+def parameter_grid(grid: Optional[Dict[str, Tuple[float, float, int]]] = None) -> pd.DataFrame:
+    """
+    Produto cartesiano das faixas de parâmetros.
+
+    Args:
+        grid: {parâmetro: (início, fim, quantidade)} (padrão:
+            Config.CALIBRATION_GRID). Parâmetros ausentes ficam fixos no
+            valor atual da Config.
+
+    Returns:
+        DataFrame com uma coluna por parâmetro e uma linha por combinação.
+    """
+    grid = Config.CALIBRATION_GRID if grid is None else grid
+    unknown = set(grid) - set(PARAMETERS)
+    if unknown:
+        raise ValueError(f"Parâmetros desconhecidos na grade: {sorted(unknown)}")
+    axes = [
+        # Arredonda o ruído do linspace (ex.: 0.0399999...) para relatórios legíveis.
+        np.round(np.linspace(*grid[name][:2], int(grid[name][2])), 10) if name in grid else [getattr(Config, name)]
+        for name in PARAMETERS
+    ]
+    return pd.DataFrame(list(itertools.product(*axes)), columns=list(PARAMETERS))
+
+
+def load_measurements(filepath: str, step: Optional[pd.Timedelta] = None) -> pd.DataFrame:
+    """
+    Lê as medições de campo (CSV ou Parquet) com as colunas SB, 'datetime' e
+    Config.CALIBRATION_MEASURED_COLUMN. Várias leituras no mesmo passo
+    (padrão: o de Config.TEMPORAL_RESOLUTION) são reduzidas à média.
+    """
+    step = timestep() if step is None else step
+    if os.path.splitext(filepath)[1].lower() in ('.parquet', '.pq'):
+        df = pd.read_parquet(filepath)
+    else:
+        df = pd.read_csv(filepath)
+
+    required = [Config.ID_COLUMN, 'datetime', Config.CALIBRATION_MEASURED_COLUMN]
+    missing = [col for col in required if col not in df.columns]
+    if missing:
+        raise ValueError(f"As medições devem conter as colunas {required} (faltando: {missing}).")
+
+    df = df[required].dropna()
+    df[Config.ID_COLUMN] = df[Config.ID_COLUMN].astype(str).str.strip()
+    df['datetime'] = pd.to_datetime(df['datetime']).dt.floor(step)
+    return df.groupby([Config.ID_COLUMN, 'datetime'], as_index=False)[Config.CALIBRATION_MEASURED_COLUMN].mean()
+
+
+class CalibrationSeries:
+    """
+    Séries dos SBs medidos como matrizes (n_sbs, n_passos), preenchidas
+    com NaN no fim das séries mais curtas. `step` é o passo entre as linhas
+    (padrão: o de Config.TEMPORAL_RESOLUTION); a grade de
+    THERMAL_RETENTION_FACTOR continua expressa por hora.
+    """
+
+    def __init__(self, weather_df: pd.DataFrame, measurements_df: pd.DataFrame, step: Optional[pd.Timedelta] = None):
+        self.step = timestep() if step is None else step
+        measured_sbs = set(measurements_df[Config.ID_COLUMN].astype(str))
+        df = weather_df[weather_df[Config.ID_COLUMN].astype(str).isin(measured_sbs)]
+        df = df[[Config.ID_COLUMN, 'datetime'] + WEATHER_COLUMNS].dropna().copy()
+        df[Config.ID_COLUMN] = df[Config.ID_COLUMN].astype(str)
+        df['datetime'] = pd.to_datetime(df['datetime'])
+        df = df.sort_values(by=[Config.ID_COLUMN, 'datetime']).reset_index(drop=True)
+        if df.empty:
+            raise ValueError("Nenhum SB medido tem dados meteorológicos no arquivo informado.")
+
+        codes, self.sbs = pd.factorize(df[Config.ID_COLUMN])
+        n = len(df)
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+        lengths = np.diff(np.r_[starts, n])
+        rows = np.repeat(np.arange(len(starts)), lengths)
+        steps = np.arange(n) - np.repeat(starts, lengths)
+        shape = (len(starts), lengths.max())
+
+        def to_grid(values: np.ndarray) -> np.ndarray:
+            grid = np.full(shape, np.nan)
+            grid[rows, steps] = values
+            return grid
+
+        self.air = to_grid(df['temperature_celsius'].to_numpy(dtype=float))
+        self.wind = to_grid(df['wind_speed_kmh'].to_numpy(dtype=float))
+        self.precipitation = to_grid(df['precipitation_mm'].to_numpy(dtype=float))
+        self.solar = to_grid(df['solar_radiation_wm2'].to_numpy(dtype=float))
+
+        merged = df[[Config.ID_COLUMN, 'datetime']].merge(
+            measurements_df, on=[Config.ID_COLUMN, 'datetime'], how='left'
+        )
+        self.measured = to_grid(merged[Config.CALIBRATION_MEASURED_COLUMN].to_numpy(dtype=float))
+        self.mask = ~np.isnan(self.measured)
+        self.counts = self.mask.sum(axis=1)
+        # Partida a frio, como no pipeline: T[-1] = temperatura do ar da 1ª hora.
+        self.initial_temps = self.air[:, 0]
+
+    @property
+    def cells(self) -> int:
+        return self.air.size
+
+    def evaluate(self, params: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """
+        Estima o trilho para todas as combinações de `params` de uma vez.
+
+        Returns:
+            Somas por (combinação, SB) dos resíduos nas horas medidas:
+            'sse' (quadrados), 'sae' (absolutos) e 'bias' (com sinal).
+        """
+        def column(name: str) -> np.ndarray:
+            return params[name].to_numpy(dtype=float)[:, None, None]
+
+        equilibrium = equilibrium_temperature(
+            self.air, self.wind, self.precipitation, self.solar,
+            radiation_factor=column('RADIATION_TO_CELSIUS_FACTOR'),
+            wind_factor=column('WIND_ADJUSTMENT_FACTOR'),
+            rain_addition=column('RAIN_ADDITION_CELSIUS'),
+        )  # (combinações, SBs, passos)
+        retention = retention_for_step(column('THERMAL_RETENTION_FACTOR')[:, :, 0], self.step)
+        estimated = thermal_inertia_recurrence(equilibrium, self.initial_temps, retention)
+        residual = np.where(self.mask, estimated - np.nan_to_num(self.measured), 0.0)
+        return {
+            'sse': (residual ** 2).sum(axis=2),
+            'sae': np.abs(residual).sum(axis=2),
+            'bias': residual.sum(axis=2),
+        }
+
+
+def evaluate_grid(series: CalibrationSeries, grid_df: pd.DataFrame, max_cells: int = None) -> Dict[str, np.ndarray]:
+    """
+    Avalia a grade em blocos de combinações, limitando cada bloco a
+    `max_cells` (padrão: Config.CALIBRATION_MAX_CELLS) valores por matriz.
+    """
+    max_cells = Config.CALIBRATION_MAX_CELLS if max_cells is None else max_cells
+    chunk = max(1, int(max_cells // max(1, series.cells)))
+    parts = [series.evaluate(grid_df.iloc[start:start + chunk]) for start in range(0, len(grid_df), chunk)]
+    return {key: np.concatenate([part[key] for part in parts]) for key in ('sse', 'sae', 'bias')}
+
+
+def _error_table(sums: Dict[str, np.ndarray], counts: np.ndarray) -> Dict[str, np.ndarray]:
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return {
+            'rmse': np.sqrt(sums['sse'] / counts),
+            'mae': sums['sae'] / counts,
+            'bias': sums['bias'] / counts,
+        }
+
+
+def calibrate(
+    weather_df: pd.DataFrame,
+    measurements_df: pd.DataFrame,
+    grid_df: Optional[pd.DataFrame] = None,
+    group_labels: Optional[pd.Series] = None
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Busca em grade dos parâmetros do modelo térmico.
+
+    Args:
+        weather_df: Séries horárias (SB, datetime, temperatura, vento, chuva,
+            radiação), ex.: o histórico de saída do pipeline.
+        measurements_df: Medições (ver `load_measurements`).
+        grid_df: Combinações a avaliar (padrão: `parameter_grid()`).
+        group_labels: Grupo de cada SB (ex.: a Sub), indexado pelo SB. Se
+            None, o melhor ajuste é calculado por SB.
+
+    Returns:
+        (superfície, melhor ajuste): a superfície tem uma linha por
+        combinação com RMSE/MAE/viés sobre todas as medições; o melhor ajuste
+        tem, por grupo, os parâmetros de menor RMSE e o RMSE dos parâmetros
+        atuais da Config para comparação.
+    """
+    grid_df = parameter_grid() if grid_df is None else grid_df.reset_index(drop=True)
+    series = CalibrationSeries(weather_df, measurements_df)
+    logger.info(
+        f"🎯 Calibrando {len(grid_df)} combinações de parâmetros em {len(series.sbs)} SBs "
+        f"({int(series.counts.sum())} medições)."
+    )
+    sums = evaluate_grid(series, grid_df)
+    current = series.evaluate(pd.DataFrame([{name: getattr(Config, name) for name in PARAMETERS}]))
+
+    surface = _error_table({key: value.sum(axis=1) for key, value in sums.items()}, series.counts.sum())
+    surface_df = grid_df.assign(**surface, n_measurements=int(series.counts.sum()))
+    surface_df = surface_df.sort_values(by='rmse', kind='stable').reset_index(drop=True)
+
+    # Soma por grupo: matriz indicadora SB x grupo.
+    if group_labels is None:
+        labels = pd.Series(series.sbs, index=series.sbs)
+    else:
+        labels = group_labels.copy()
+        labels.index = labels.index.astype(str)
+        labels = labels.reindex(series.sbs).fillna('N/A').astype(str)
+    group_codes, groups = pd.factorize(labels.to_numpy())
+    indicator = np.zeros((len(series.sbs), len(groups)))
+    indicator[np.arange(len(series.sbs)), group_codes] = 1.0
+    group_counts = series.counts @ indicator
+
+    by_group = _error_table({key: value @ indicator for key, value in sums.items()}, group_counts)
+    baseline = _error_table({key: value @ indicator for key, value in current.items()}, group_counts)
+    best = np.argmin(np.where(np.isnan(by_group['rmse']), np.inf, by_group['rmse']), axis=0)
+    columns = np.arange(len(groups))
+    best_df = grid_df.iloc[best].reset_index(drop=True)
+    best_df.insert(0, 'group', list(groups))
+    best_df = best_df.assign(
+        rmse=by_group['rmse'][best, columns],
+        mae=by_group['mae'][best, columns],
+        bias=by_group['bias'][best, columns],
+        current_rmse=baseline['rmse'][0],
+        n_measurements=group_counts.astype(int),
+    )
+    return surface_df, best_df
+
+
+def save_calibration(surface_df: pd.DataFrame, best_df: pd.DataFrame, surface_filepath: str, best_filepath: str):
+    """Grava a superfície de erro (Parquet) e o melhor ajuste por grupo (CSV)."""
+    for filepath in (surface_filepath, best_filepath):
+        directory = os.path.dirname(filepath)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+    surface_df.to_parquet(surface_filepath, index=False, engine='pyarrow')
+    best_df.to_csv(best_filepath, index=False)
+    logger.info(f"✅ Superfície de erro salva em '{surface_filepath}' e melhor ajuste em '{best_filepath}'.")
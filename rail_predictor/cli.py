@@ -0,0 +1,326 @@
+# rail_predictor/cli.py
+"""
+Interface de Linha de Comando (`python -m rail_predictor <comando>`).
+
+    run        Pipeline diário completo (o mesmo do `main.py`).
+    fetch      Coleta os dados brutos e grava em Config.RAW_WEATHER_FILE.
+    process    Processa a coleta bruta gravada e atualiza a saída.
+    compact    Regrava o histórico no formato compacto.
+    report     Estatísticas da janela do histórico e da última execução.
+    validate   Valida o coordenadas.json.
+    calibrate  Busca em grade dos parâmetros do modelo térmico.
+
+Este módulo só importa a biblioteca padrão: pandas, pyarrow, requests etc.
+são importados dentro de cada comando, e os comandos rápidos (`validate`,
+`report`) não carregam a pilha de coleta/processamento.
+"""
+import argparse
+import json
+import logging
+import math
+import os
+from collections import Counter
+from datetime import date, timedelta
+from typing import List, Optional, Tuple
+
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+LOCATION_FIELDS = ('SB', 'Mediana Latitude', 'Mediana Longitude')
+
+
+def _run_with_report(command) -> int:
+    """Executa `command()` (que retorna True em caso de sucesso) registrando o relatório da execução."""
+    from .instrumentation import configure_logging, start_run, finish_run
+
+    configure_logging()
+    start_run()
+    status = "failed"
+    try:
+        if command():
+            status = "success"
+    finally:
+        finish_run(Config.RUN_REPORT_FILE, status=status)
+    return 0 if status == "success" else 1
+
+
+def cmd_run(args) -> int:
+    from .pipeline import run_pipeline
+    return _run_with_report(run_pipeline)
+
+
+def cmd_fetch(args) -> int:
+    def fetch() -> bool:
+        from .api_client import clear_fetch_checkpoint
+        from .pipeline import build_api_params, fetch_raw, load_locations_stage
+
+        locations_df = load_locations_stage()
+        if locations_df.empty:
+            return False
+        api_params = build_api_params()
+        raw_df = fetch_raw(locations_df, api_params)
+        if raw_df.empty:
+            return False
+        directory = os.path.dirname(args.output)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        raw_df.to_parquet(args.output, index=False, engine='pyarrow')
+        logger.info(f"✅ Coleta bruta salva em '{args.output}' ({len(raw_df)} linhas).")
+        # A coleta está salva por inteiro: o checkpoint não é mais necessário.
+        clear_fetch_checkpoint(api_params)
+        return True
+
+    return _run_with_report(fetch)
+
+
+def cmd_process(args) -> int:
+    def process() -> bool:
+        import pandas as pd
+        from .data_io import load_thermal_state
+        from .pipeline import load_locations_stage, process_raw, update_thermal_state
+
+        if not os.path.exists(args.input):
+            logger.error(f"❌ Coleta bruta não encontrada em '{args.input}'. Rode o comando 'fetch' antes.")
+            return False
+        locations_df = load_locations_stage()
+        if locations_df.empty:
+            return False
+        raw_df = pd.read_parquet(args.input)
+        thermal_state_df = load_thermal_state(Config.THERMAL_STATE_FILE)
+        new_state_df = process_raw(raw_df, locations_df, thermal_state_df)
+        update_thermal_state(thermal_state_df, new_state_df)
+        return True
+
+    return _run_with_report(process)
+
+
+def cmd_compact(args) -> int:
+    from .instrumentation import configure_logging
+    from .data_io import SUB_PARTITION, load_dataset, load_history, save_dataset, save_output
+
+    configure_logging()
+    if Config.OUTPUT_FORMAT == "dataset":
+        df = load_dataset(Config.OUTPUT_DATASET_DIR)
+        if df.empty:
+            print(f"❌ Nenhum dado em '{Config.OUTPUT_DATASET_DIR}'.")
+            return 1
+        save_dataset(
+            df, Config.OUTPUT_DATASET_DIR, partition_by_sub=SUB_PARTITION in df.columns,
+            compact=True, dimension_filepath=Config.OUTPUT_DIMENSION_FILE
+        )
+    else:
+        df = load_history(Config.OUTPUT_FILE)
+        if df.empty:
+            print(f"❌ Nenhum dado em '{Config.OUTPUT_FILE}'.")
+            return 1
+        save_output(df, Config.OUTPUT_FILE, compact=True, dimension_filepath=Config.OUTPUT_DIMENSION_FILE)
+    if not Config.OUTPUT_COMPACT:
+        print("ℹ️ Ative Config.OUTPUT_COMPACT para que as próximas execuções mantenham o formato compacto.")
+    return 0
+
+
+def _history_files(path: str) -> List[str]:
+    if os.path.isdir(path):
+        return sorted(
+            os.path.join(root, name) for root, _, names in os.walk(path)
+            for name in names if name.endswith('.parquet') and '.staging-' not in root
+        )
+    return [path] if os.path.exists(path) else []
+
+
+def cmd_report(args) -> int:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    path = Config.OUTPUT_DATASET_DIR if Config.OUTPUT_FORMAT == "dataset" else Config.OUTPUT_FILE
+    files = _history_files(path)
+    today = date.today()
+    window_start = today - timedelta(days=Config.ROLLING_WINDOW_DAYS_PAST)
+    window_end = today + timedelta(days=Config.ROLLING_WINDOW_DAYS_FUTURE)
+    print(f"📅 Janela móvel esperada: {window_start} a {window_end}")
+
+    if not files:
+        print(f"❌ Histórico não encontrado em '{path}'.")
+    else:
+        tables = [pq.read_table(f, columns=[Config.ID_COLUMN, 'datetime']) for f in files]
+        table = pa.concat_tables([t.cast(tables[0].schema) for t in tables])
+        size_mb = sum(os.path.getsize(f) for f in files) / 2**20
+        days = pc.value_counts(pc.cast(table.column('datetime'), pa.date32())).to_pylist()
+        sb_count = pc.count_distinct(pc.cast(table.column(Config.ID_COLUMN), pa.string())).as_py()
+        print(f"📦 Histórico '{path}': {table.num_rows} linhas, {sb_count} SBs, "
+              f"{len(files)} arquivo(s), {size_mb:.1f} MB")
+        for entry in sorted(days, key=lambda e: e['values']):
+            day = entry['values']
+            flag = "" if window_start <= day <= window_end else "  ⚠️ fora da janela"
+            print(f"   {day}: {entry['counts']} linhas{flag}")
+        missing = [window_start + timedelta(days=i) for i in range((window_end - window_start).days + 1)]
+        missing = [day for day in missing if day not in {entry['values'] for entry in days}]
+        if missing:
+            print(f"⚠️ Dias da janela sem dados: {', '.join(str(day) for day in missing)}")
+
+    if os.path.exists(Config.RUN_REPORT_FILE):
+        with open(Config.RUN_REPORT_FILE, encoding='utf-8') as f:
+            report = json.load(f)
+        print(f"📊 Última execução: {report.get('status')} em {report.get('started_at')} "
+              f"({report.get('duration_seconds')}s, pico de {report.get('max_rss_mb')} MB)")
+        for record in report.get('stages', []):
+            rows = f", {record['rows_out']} linhas" if 'rows_out' in record else ""
+            print(f"   {record['stage']}: {record['seconds']}s{rows}")
+    return 0 if files else 1
+
+
+def validate_locations(records) -> Tuple[List[str], List[str]]:
+    """
+    Valida o conteúdo do coordenadas.json.
+
+    Returns:
+        (problemas, avisos): registros que `load_locations` descartaria ou
+        que indicam dado errado; avisos não impedem o uso do arquivo (ex.:
+        SBs repetidos, dos quais só o primeiro é usado).
+    """
+    if not isinstance(records, list):
+        return ["O arquivo deve conter uma lista de objetos."], []
+    problems, warnings = [], []
+    seen = Counter()
+    for position, record in enumerate(records):
+        label = f"Registro {position}"
+        if not isinstance(record, dict):
+            problems.append(f"{label}: não é um objeto.")
+            continue
+        missing = [field for field in LOCATION_FIELDS if record.get(field) in (None, "")]
+        if missing:
+            problems.append(f"{label}: campos ausentes {missing}.")
+            continue
+        sb = str(record['SB']).strip()
+        label = f"{label} (SB {sb})"
+        seen[sb] += 1
+        try:
+            latitude, longitude = float(record['Mediana Latitude']), float(record['Mediana Longitude'])
+        except (TypeError, ValueError):
+            problems.append(f"{label}: coordenada não numérica.")
+            continue
+        if not (math.isfinite(latitude) and -90 <= latitude <= 90):
+            problems.append(f"{label}: latitude fora de [-90, 90]: {latitude}.")
+        if not (math.isfinite(longitude) and -180 <= longitude <= 180):
+            problems.append(f"{label}: longitude fora de [-180, 180]: {longitude}.")
+        km_start, km_end = record.get('Km início'), record.get('Km fim')
+        if isinstance(km_start, (int, float)) and isinstance(km_end, (int, float)) and km_start > km_end:
+            problems.append(f"{label}: 'Km início' ({km_start}) maior que 'Km fim' ({km_end}).")
+    for sb, count in sorted(seen.items()):
+        if count > 1:
+            warnings.append(f"SB {sb} repetido {count} vezes (só o primeiro é usado).")
+    return problems, warnings
+
+
+def cmd_validate(args) -> int:
+    try:
+        with open(args.input, encoding='utf-8') as f:
+            records = json.load(f)
+    except FileNotFoundError:
+        print(f"❌ Arquivo de locais não encontrado em: {args.input}")
+        return 1
+    except json.JSONDecodeError as e:
+        print(f"❌ JSON inválido em '{args.input}': {e}")
+        return 1
+
+    problems, warnings = validate_locations(records)
+    for warning in warnings:
+        print(f"⚠️ {warning}")
+    for problem in problems:
+        print(f"❌ {problem}")
+    if isinstance(records, list):
+        valid = [r for r in records if isinstance(r, dict) and all(r.get(k) not in (None, "") for k in LOCATION_FIELDS)]
+        sbs = {str(r['SB']).strip() for r in valid}
+        points = {(r['Mediana Latitude'], r['Mediana Longitude']) for r in valid}
+        subs = {str(r.get('Sub')).strip() for r in valid if r.get('Sub') is not None}
+        print(f"📍 {len(records)} registros, {len(sbs)} SBs, {len(points)} coordenadas distintas, {len(subs)} Subs.")
+    print("✅ Arquivo de locais válido." if not problems else f"❌ {len(problems)} problema(s) encontrado(s).")
+    return 0 if not problems else 1
+
+
+def _parse_grid(specs: Optional[List[str]]):
+    """Converte 'PARAM=início:fim:quantidade' em {PARAM: (início, fim, quantidade)}."""
+    if not specs:
+        return None
+    grid = {}
+    for spec in specs:
+        name, _, values = spec.partition('=')
+        start, stop, num = values.split(':')
+        grid[name.strip()] = (float(start), float(stop), int(num))
+    return grid
+
+
+def cmd_calibrate(args) -> int:
+    import pandas as pd
+    from .instrumentation import configure_logging
+    from .calibration import calibrate, load_measurements, parameter_grid, save_calibration
+    from .data_io import load_history, load_locations
+
+    configure_logging()
+    measurements_df = load_measurements(args.measurements)
+    weather_path = args.weather or (Config.OUTPUT_DATASET_DIR if Config.OUTPUT_FORMAT == "dataset" else Config.OUTPUT_FILE)
+    weather_df = load_history(weather_path, sbs=measurements_df[Config.ID_COLUMN].unique())
+    if weather_df.empty:
+        print(f"❌ Sem dados meteorológicos em '{weather_path}' para os SBs medidos.")
+        return 1
+
+    group_labels = None
+    if args.group_by == "sub":
+        locations_df = load_locations(Config.INPUT_JSON_FILE)
+        if 'Sub' not in locations_df.columns:
+            print("❌ O agrupamento por Sub exige a coluna 'Sub' no coordenadas.json.")
+            return 1
+        group_labels = locations_df.set_index(Config.ID_COLUMN)['Sub']
+    elif args.group_by == "all":
+        sbs = measurements_df[Config.ID_COLUMN].unique()
+        group_labels = pd.Series('todos', index=sbs)
+
+    surface_df, best_df = calibrate(weather_df, measurements_df, parameter_grid(_parse_grid(args.grid)), group_labels)
+    save_calibration(surface_df, best_df, args.output, args.best_output)
+    with pd.option_context('display.width', 200, 'display.max_columns', 20):
+        print("\n🏆 Melhores combinações (todas as medições):")
+        print(surface_df.head(args.top).to_string(index=False))
+        print(f"\n🎯 Melhor ajuste por {args.group_by}:")
+        print(best_df.to_string(index=False))
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m rail_predictor", description="Pipeline de temperatura de trilhos.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("run", help="pipeline diário completo").set_defaults(func=cmd_run)
+
+    fetch = commands.add_parser("fetch", help="coleta os dados brutos da API")
+    fetch.add_argument("--output", default=Config.RAW_WEATHER_FILE)
+    fetch.set_defaults(func=cmd_fetch)
+
+    process = commands.add_parser("process", help="processa a coleta bruta e grava a saída")
+    process.add_argument("--input", default=Config.RAW_WEATHER_FILE)
+    process.set_defaults(func=cmd_process)
+
+    commands.add_parser("compact", help="regrava o histórico no formato compacto").set_defaults(func=cmd_compact)
+    commands.add_parser("report", help="estatísticas da janela e da última execução").set_defaults(func=cmd_report)
+
+    validate = commands.add_parser("validate", help="valida o arquivo de locais")
+    validate.add_argument("--input", default=Config.INPUT_JSON_FILE)
+    validate.set_defaults(func=cmd_validate)
+
+    calibrate = commands.add_parser("calibrate", help="calibra os parâmetros do modelo térmico")
+    calibrate.add_argument("measurements", help="CSV/Parquet com SB, datetime e a temperatura medida")
+    calibrate.add_argument("--weather", help="histórico com as variáveis meteorológicas (padrão: a saída do pipeline)")
+    calibrate.add_argument("--group-by", choices=("sb", "sub", "all"), default="sb")
+    calibrate.add_argument("--grid", action="append", metavar="PARAM=INICIO:FIM:N",
+                           help="substitui a faixa de um parâmetro (pode repetir)")
+    calibrate.add_argument("--output", default=Config.CALIBRATION_SURFACE_FILE)
+    calibrate.add_argument("--best-output", default=Config.CALIBRATION_BEST_FIT_FILE)
+    calibrate.add_argument("--top", type=int, default=10)
+    calibrate.set_defaults(func=cmd_calibrate)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
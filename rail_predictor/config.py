@@ -7,7 +7,78 @@ class Config:
     # --- Caminhos de Arquivos (I/O) ---
     # Atualizado para apontar para a pasta 'data'
     INPUT_JSON_FILE = "data/coordenadas.json" 
+    # Registro compilado dos locais (Parquet com SB, id inteiro, coordenadas,
+    # Sub, faixa de km e ponto da API de cada SB). É recompilado só quando o
+    # conteúdo do INPUT_JSON_FILE ou COORDINATE_ROUNDING_DECIMALS muda.
+    LOCATION_REGISTRY_ENABLED = True
+    LOCATION_REGISTRY_FILE = ".cache/location_registry.parquet"
     OUTPUT_FILE = "data/rail_prediction_history.parquet"
+    # Estado térmico (última temperatura estimada de cada dia, por SB), usado
+    # para continuar a recorrência de inércia entre execuções.
+    THERMAL_STATE_FILE = "data/thermal_state.parquet"
+    # Formato da saída: "file" reescreve o parquet único (OUTPUT_FILE) a cada
+    # execução; "dataset" grava um diretório particionado por data
+    # (OUTPUT_DATASET_DIR/date=AAAA-MM-DD/...), substituindo apenas as datas
+    # presentes nos dados novos e apagando as que saíram da janela móvel.
+    OUTPUT_FORMAT = "file"
+    OUTPUT_DATASET_DIR = "data/rail_prediction_history"
+    # Sub-particiona cada data pela Sub (trecho) do coordenadas.json.
+    OUTPUT_PARTITION_BY_SUB = False
+
+    # --- Formato Compacto da Saída ---
+    # Se True, SB e sky_condition são gravados como categóricos (dicionário),
+    # as medidas como float32 e lat/lon vão para uma tabela de dimensão
+    # (OUTPUT_DIMENSION_FILE, uma linha por SB) em vez de repetidas por hora.
+    # Ao ativar, publique também a dimensão no workflow (commit/release).
+    # Ganho medido (benchmarks/compare_output_formats.py, 221 mil linhas):
+    # ~3x menos memória e ~25% menos tempo de leitura; o tamanho em disco só
+    # cai (~20%) combinando com OUTPUT_COMPRESSION = "zstd".
+    OUTPUT_COMPACT = False
+    OUTPUT_DIMENSION_FILE = "data/sb_dimension.parquet"
+    # Opções do Parquet (valem para os dois formatos).
+    OUTPUT_COMPRESSION = "snappy"
+    OUTPUT_COMPRESSION_LEVEL = None
+    OUTPUT_ROW_GROUP_SIZE = None  # None = padrão do pyarrow (1 row group por arquivo pequeno)
+    # Ordenação antes de gravar: agrupa as horas de cada SB, o que favorece
+    # a codificação por dicionário/RLE das colunas repetitivas.
+    OUTPUT_SORT_COLUMNS = ["SB", "datetime"]
+
+    # --- Resumo Diário (BI / Alertas) ---
+    # Tabela auxiliar com uma linha por SB e dia: mínima, máxima e média da
+    # temperatura estimada, hora do pico e horas acima de cada limiar de
+    # flambagem. Dashboards leem milhares de linhas em vez do histórico horário.
+    DAILY_SUMMARY_ENABLED = True
+    DAILY_SUMMARY_FILE = "data/rail_daily_summary.parquet"
+    HEAT_BUCKLING_THRESHOLDS = [45.0, 50.0, 55.0]  # °C
+
+    # --- Publicação Incremental (Delta) ---
+    # Compara as linhas novas com o histórico anterior por (SB, datetime) e
+    # grava em DELTA_FILE só as linhas inseridas/alteradas (com os valores
+    # novos) e as chaves expiradas, coluna 'change'. As contagens e a
+    # variação da temperatura estimada vão nos metadados do arquivo e no
+    # relatório da execução. O arquivo completo continua sendo gravado.
+    DELTA_ENABLED = True
+    DELTA_FILE = "data/rail_prediction_delta.parquet"
+
+    # --- Arquivo Histórico de Previsões ---
+    # A janela móvel descarta tudo fora de D-3..D+3. Com ARCHIVE_ENABLED, a
+    # previsão de cada execução também é acrescentada a ARCHIVE_DIR, uma
+    # partição por data de emissão, ordenada por SB e hora, com um índice de
+    # row groups para `archive.query_archive`. Para manter o arquivo entre
+    # execuções do workflow, publique ARCHIVE_DIR junto com a saída.
+    ARCHIVE_ENABLED = False
+    ARCHIVE_DIR = "data/archive"
+    # Linhas por row group: a menor unidade lida por uma consulta.
+    ARCHIVE_ROW_GROUP_SIZE = 50_000
+    ARCHIVE_COMPRESSION = "zstd"
+
+    # --- Logs e Relatório da Execução ---
+    # "text" mostra as mensagens como linhas simples; "json" emite uma linha
+    # JSON por registro (com os campos estruturados de cada evento).
+    LOG_FORMAT = "text"
+    LOG_LEVEL = "INFO"
+    # Tempos, linhas e memória por etapa, latência/status das requisições.
+    RUN_REPORT_FILE = "data/run_report.json"
 
     # --- Definições de Colunas ---
     ID_COLUMN = "SB"
@@ -22,8 +93,107 @@ class Config:
     # medida perpendicular ao sol), que superestima o ganho solar com o sol baixo
     # no horizonte (início da manhã / fim da tarde).
     API_HOURLY_VARS = "temperature_2m,precipitation,weather_code,wind_speed_10m,shortwave_radiation"
+    # Resolução temporal: "hourly" pede as variáveis acima no bloco 'hourly'
+    # da Open-Meteo; "15min" pede as mesmas variáveis no bloco 'minutely_15'
+    # (4x mais linhas), o que capta picos do trilho entre as horas cheias.
+    # Fora da Europa Central e da América do Norte a Open-Meteo interpola o
+    # 15 min a partir dos modelos horários. Com "15min", prefira
+    # PIPELINE_MODE = "streaming" e OUTPUT_COMPACT = True para limitar a
+    # memória e o tamanho do arquivo.
+    TEMPORAL_RESOLUTION = "hourly"
     API_TIMEZONE = "America/Sao_Paulo"
     MAX_API_WORKERS = 10 
+    # Casas decimais usadas para agrupar SBs que compartilham o mesmo ponto
+    # antes de chamar a API (cada ponto distinto é buscado uma única vez).
+    # None = agrupa apenas coordenadas idênticas. Valores menores (ex.: 2,
+    # ~1 km) mesclam SBs vizinhos que caem na mesma célula do modelo.
+    COORDINATE_ROUNDING_DECIMALS = None
+    # "points" busca cada coordenada distinta dos SBs. "grid" encaixa os SBs
+    # em uma grade regular de SPATIAL_GRID_RESOLUTION graus, busca só os nós
+    # da grade usados e interpola as séries de cada SB:
+    # "idw": cada SB vai para o nó mais próximo e é interpolado pelo inverso
+    #   da distância^SPATIAL_IDW_POWER aos SPATIAL_IDW_NEIGHBORS nós buscados
+    #   mais próximos (com 0.1°, 615 nós para os 1538 SBs, contra 1115 pontos);
+    # "nearest": só o nó mais próximo (mesmos nós do "idw");
+    # "bilinear": os 4 cantos da célula (com 0.1°, 1413 nós: só compensa em
+    #   grades mais grossas).
+    # weather_code usa o nó de maior peso. Não se aplica ao streaming.
+    API_SPATIAL_MODE = "points"
+    SPATIAL_GRID_RESOLUTION = 0.1  # ~11 km, próximo da resolução dos modelos regionais
+    SPATIAL_INTERPOLATION = "idw"
+    SPATIAL_IDW_NEIGHBORS = 4
+    SPATIAL_IDW_POWER = 2.0
+    # Quantidade de coordenadas enviadas por requisição (a API aceita listas
+    # de latitude/longitude separadas por vírgula). 1 = uma chamada por ponto.
+    API_BATCH_SIZE = 50
+    # Motor de coleta: "threads" (ThreadPoolExecutor + requests) ou "async"
+    # (asyncio + httpx, com token bucket compartilhado entre as tarefas).
+    API_FETCH_ENGINE = "threads"
+    # Como as respostas são acumuladas: "arrow" grava os arrays 'hourly'
+    # direto em colunas pré-alocadas (SB/lat/lon como dicionário), "frames"
+    # cria um DataFrame por local e concatena tudo no final.
+    API_INGESTION = "arrow"
+    # Limite global de requisições HTTP (chamadas por período, em segundos).
+    # ATENÇÃO: o limite conta requisições, não locais. A Open-Meteo desconta
+    # da cota um local por coordenada, e cada requisição leva até
+    # API_BATCH_SIZE coordenadas: o ritmo efetivo é de até
+    # API_RATE_LIMIT_CALLS x API_BATCH_SIZE locais por período (padrão:
+    # 10 x 50 = 500 locais/s). Ajuste os dois juntos conforme a cota.
+    API_RATE_LIMIT_CALLS = 10
+    API_RATE_LIMIT_PERIOD = 1.0
+    # Controle de taxa: "fixed" usa o limite acima; "adaptive" parte dele e
+    # ajusta a taxa por AIMD (sobe enquanto as respostas são saudáveis, cai
+    # pela metade com 429/5xx/Retry-After), dentro de [MIN, MAX] req/s.
+    API_RATE_CONTROL = "fixed"
+    API_ADAPTIVE_MIN_RATE = 1.0
+    API_ADAPTIVE_MAX_RATE = 50.0
+    API_ADAPTIVE_INCREASE = 1.0
+    API_ADAPTIVE_DECREASE_FACTOR = 0.5
+    API_ADAPTIVE_LATENCY_TARGET = 2.0
+    # Tempo máximo (s) de cada requisição, para que um socket travado não
+    # bloqueie um worker indefinidamente.
+    API_REQUEST_TIMEOUT = 30.0
+    # Cache local (SQLite) das respostas por ponto: reexecuções dentro do TTL
+    # não vão à rede e reexecuções parciais buscam apenas o que falta.
+    # A previsão da Open-Meteo é atualizada de hora em hora.
+    API_CACHE_ENABLED = True
+    API_CACHE_FILE = ".cache/open_meteo_responses.sqlite"
+    API_CACHE_TTL_SECONDS = 3600
+    API_CACHE_MAX_BYTES = 200 * 1024 * 1024
+    # Checkpoint da coleta: os lotes concluídos são gravados em staging a cada
+    # N pontos; se a execução cair, a próxima (mesma data e parâmetros) pula
+    # os SBs já gravados. O staging é apagado ao fim de uma execução completa.
+    FETCH_CHECKPOINT_ENABLED = True
+    FETCH_STAGING_DIR = "data/staging"
+    # Saída do `python -m rail_predictor fetch` (entrada do `process`).
+    RAW_WEATHER_FILE = "data/staging/raw_weather.parquet"
+    FETCH_CHECKPOINT_EVERY_POINTS = 100
+
+    # --- Modo do Pipeline ---
+    # "batch" coleta tudo, depois processa, depois grava. "streaming"
+    # sobrepõe as fases: a cada STREAM_CHUNK_POINTS pontos recebidos, o bloco
+    # é processado e gravado como um row group do parquet, com no máximo
+    # STREAM_QUEUE_DEPTH blocos esperando (a coleta aguarda se a fila encher).
+    # Disponível para OUTPUT_FORMAT = "file"; no streaming não há checkpoint.
+    # O arquivo tem as mesmas linhas do lote, mas só cada row group sai
+    # ordenado por OUTPUT_SORT_COLUMNS (não o arquivo inteiro).
+    # Blocos muito pequenos pagam o custo fixo do processamento a cada bloco
+    # (com 100 pontos o streaming ficou ~3x mais lento que o lote no benchmark).
+    # O tamanho vale para dados horários: em 15 min o bloco tem 1/4 dos pontos
+    # (mesmo número de linhas).
+    PIPELINE_MODE = "batch"
+    STREAM_CHUNK_POINTS = 1000
+    STREAM_QUEUE_DEPTH = 2
+
+    # --- Processamento ---
+    # "single" processa tudo em um único processo; "sharded" divide os SBs
+    # em shards (por hash do SB ou pela Sub) e os processa em um pool de
+    # processos. Cada worker custa ~1-2s de inicialização (spawn + imports),
+    # então só compensa com várias CPUs e dezenas de milhares de SBs (o
+    # pipeline leva ~1s para 20 mil SBs x 7 dias em um único processo).
+    PROCESSING_ENGINE = "single"
+    PROCESSING_SHARD_BY = "sb_hash"  # "sb_hash" ou "sub"
+    PROCESSING_WORKERS = None  # None = número de CPUs
 
     # --- Configurações da Janela Móvel (Rolling Window) ---
     # O parquet final deve conter sempre: D-3 (passado) até D+3 (futuro)
@@ -40,4 +210,23 @@ class Config:
     SOLAR_ADJUSTMENT_CEILING = 20.0
     WIND_ADJUSTMENT_FACTOR = 8.5
     RAIN_ADDITION_CELSIUS = 1.5
-    THERMAL_RETENTION_FACTOR = 0.6
\ No newline at end of file
+    # Retenção por hora; em outras resoluções o fator usado a cada passo é
+    # THERMAL_RETENTION_FACTOR ** (passo / 1h) (ex.: 0.6 ** 0.25 em 15 min).
+    THERMAL_RETENTION_FACTOR = 0.6
+
+    # --- Calibração do Modelo Térmico (python -m rail_predictor calibrate) ---
+    # Medições de campo: CSV/Parquet com SB, datetime e esta coluna (°C).
+    CALIBRATION_MEASURED_COLUMN = "measured_rail_temp"
+    # Faixas avaliadas: {parâmetro: (início, fim, quantidade de valores)}.
+    # Parâmetros fora da grade ficam fixos no valor acima.
+    CALIBRATION_GRID = {
+        'RADIATION_TO_CELSIUS_FACTOR': (0.02, 0.08, 13),
+        'WIND_ADJUSTMENT_FACTOR': (4.0, 14.0, 11),
+        'RAIN_ADDITION_CELSIUS': (0.0, 3.0, 7),
+        'THERMAL_RETENTION_FACTOR': (0.3, 0.9, 13),
+    }
+    # Limite de valores (combinações x SBs x horas) por bloco avaliado;
+    # 20 milhões de float64 ≈ 160 MB por matriz intermediária.
+    CALIBRATION_MAX_CELLS = 20_000_000
+    CALIBRATION_SURFACE_FILE = "data/calibration/error_surface.parquet"
+    CALIBRATION_BEST_FIT_FILE = "data/calibration/best_fit.csv"
\ No newline at end of file
@@ -2,61 +2,446 @@
 """
 Módulo de Entrada/Saída (I/O) de Dados.
 """
+import json
+import logging
+import os
+import shutil
+import uuid
+from typing import Iterable, List, Optional
+
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 
 # Importação relativa
 from .config import Config
+from .location_registry import compile_location_registry, load_location_registry
+from .processing import rolling_window_bounds
 
-def load_locations(filepath: str = Config.INPUT_JSON_FILE) -> pd.DataFrame:
-    """Carrega e valida o arquivo JSON de locais de entrada."""
-    try:
-        df = pd.read_json(filepath, encoding='utf-8')
-        df.rename(columns={
-            'SB': Config.ID_COLUMN,
-            'Mediana Latitude': Config.LAT_COLUMN,
-            'Mediana Longitude': Config.LON_COLUMN
-        }, inplace=True)
+logger = logging.getLogger(__name__)
 
-        required_cols = [Config.ID_COLUMN, Config.LAT_COLUMN, Config.LON_COLUMN]
-        if not all(col in df.columns for col in required_cols):
-            raise ValueError("O JSON deve conter as colunas: 'SB', 'Mediana Latitude' e 'Mediana Longitude'")
+DATE_PARTITION = 'date'
+SUB_PARTITION = 'Sub'
 
-        df[Config.ID_COLUMN] = df[Config.ID_COLUMN].astype(str).str.strip()
-        df.dropna(subset=required_cols, inplace=True)
-        df.drop_duplicates(subset=[Config.ID_COLUMN], keep='first', inplace=True)
+# Colunas do formato compacto
+MEASURE_COLUMNS = [
+    'estimated_rail_temp', 'temperature_celsius', 'precipitation_mm',
+    'wind_speed_kmh', 'solar_radiation_wm2'
+]
+CATEGORY_COLUMNS = [Config.ID_COLUMN, 'sky_condition']
+
+def load_locations(filepath: str = Config.INPUT_JSON_FILE) -> pd.DataFrame:
+    """
+    Carrega e valida o arquivo JSON de locais de entrada.
 
-        return df[required_cols]
+    Além de ID, latitude, longitude e 'Sub' (se houver), retorna a faixa de
+    km e os ids inteiros do registro de locais (`sb_id`, `point_id`). Com
+    Config.LOCATION_REGISTRY_ENABLED o registro compilado é reaproveitado
+    enquanto o JSON não mudar.
+    """
+    try:
+        if Config.LOCATION_REGISTRY_ENABLED:
+            return load_location_registry(
+                filepath, Config.LOCATION_REGISTRY_FILE, Config.COORDINATE_ROUNDING_DECIMALS
+            )
+        return compile_location_registry(filepath, Config.COORDINATE_ROUNDING_DECIMALS)
 
     except FileNotFoundError:
-        print(f"❌ ERRO CRÍTICO: Arquivo de locais não encontrado em: {filepath}")
+        logger.error(f"❌ ERRO CRÍTICO: Arquivo de locais não encontrado em: {filepath}")
         return pd.DataFrame()
     except Exception as e:
-        print(f"❌ ERRO CRÍTICO: Falha ao ler ou processar o JSON de locais. Detalhes: {e}")
+        logger.error(f"❌ ERRO CRÍTICO: Falha ao ler ou processar o JSON de locais. Detalhes: {e}")
         return pd.DataFrame()
 
-def load_history(filepath: str = Config.OUTPUT_FILE, new_data_dates: pd.Series = None) -> pd.DataFrame:
-    """Carrega o histórico de previsões (Parquet) e remove dados sobrepostos."""
+def build_history_filters(
+    start_date=None,
+    end_date=None,
+    sbs: Optional[Iterable[str]] = None,
+    exclude_dates: Optional[Iterable] = None,
+    partitioned: bool = False
+) -> Optional[List[List[tuple]]]:
+    """
+    Monta os filtros (forma normal disjuntiva do pyarrow) para ler apenas as
+    linhas de interesse do histórico.
+
+    Args:
+        start_date / end_date: Intervalo de datas (inclusivo) a manter.
+        sbs: Lista de SBs a manter.
+        exclude_dates: Datas que serão substituídas pelos dados novos. Se
+            forem contíguas, o intervalo é excluído já na leitura.
+        partitioned: Se True, repete os filtros de data sobre a coluna de
+            partição 'date', para que diretórios inteiros sejam ignorados.
+
+    Returns:
+        Lista de conjunções (OR de ANDs) ou None se não houver filtro.
+    """
+    base = []
+    if start_date is not None:
+        start_ts = pd.Timestamp(start_date).normalize()
+        base.append(('datetime', '>=', start_ts))
+        if partitioned:
+            base.append((DATE_PARTITION, '>=', start_ts.strftime('%Y-%m-%d')))
+    if end_date is not None:
+        end_ts = pd.Timestamp(end_date).normalize()
+        base.append(('datetime', '<', end_ts + pd.Timedelta(days=1)))
+        if partitioned:
+            base.append((DATE_PARTITION, '<=', end_ts.strftime('%Y-%m-%d')))
+    if sbs is not None:
+        base.append((Config.ID_COLUMN, 'in', sorted({str(sb) for sb in sbs})))
+
+    excluded_days = pd.DatetimeIndex([])
+    if exclude_dates is not None:
+        excluded_days = pd.DatetimeIndex(pd.to_datetime(list(exclude_dates))).normalize().unique()
+    # Só dá para excluir por intervalo se as datas forem contíguas; caso
+    # contrário a exclusão fica para o filtro em memória.
+    if excluded_days.empty or (excluded_days.max() - excluded_days.min()).days + 1 != len(excluded_days):
+        return [base] if base else None
+
+    first_excluded = excluded_days.min()
+    after_excluded = excluded_days.max() + pd.Timedelta(days=1)
+    before = base + [('datetime', '<', first_excluded)]
+    after = base + [('datetime', '>=', after_excluded)]
+    if partitioned:
+        before.append((DATE_PARTITION, '<', first_excluded.strftime('%Y-%m-%d')))
+        after.append((DATE_PARTITION, '>=', after_excluded.strftime('%Y-%m-%d')))
+    return [before, after]
+
+def load_history(
+    filepath: str = Config.OUTPUT_FILE,
+    new_data_dates: pd.Series = None,
+    start_date=None,
+    end_date=None,
+    sbs: Optional[Iterable[str]] = None,
+    columns: Optional[List[str]] = None
+) -> pd.DataFrame:
+    """
+    Carrega o histórico de previsões (Parquet) e remove dados sobrepostos.
+
+    Os filtros de data/SB e a lista de colunas são repassados ao pyarrow, que
+    descarta row groups (e, no dataset particionado, diretórios de data)
+    pelas estatísticas, sem materializar as linhas fora do filtro.
+
+    Args:
+        filepath: Parquet único ou diretório do dataset particionado.
+        new_data_dates: Datas presentes nos dados novos (serão substituídas).
+        start_date / end_date: Intervalo de datas (inclusivo) a carregar.
+        sbs: SBs a carregar (todos, se None).
+        columns: Colunas a carregar (todas, se None).
+    """
     try:
-        history_df = pd.read_parquet(filepath)
+        partitioned = os.path.isdir(filepath)
+        filters = build_history_filters(start_date, end_date, sbs, new_data_dates, partitioned=partitioned)
+        if columns is not None and 'datetime' not in columns:
+            columns = list(columns) + ['datetime']
+
+        history_df = pd.read_parquet(filepath, engine='pyarrow', columns=columns, filters=filters)
+        if partitioned and DATE_PARTITION in history_df.columns:
+            history_df = history_df.drop(columns=[DATE_PARTITION])
         history_df['datetime'] = pd.to_datetime(history_df['datetime'])
+        if columns is None:
+            # Histórico no formato compacto: lat/lon vêm da tabela de dimensão.
+            history_df = attach_dimension(history_df, load_dimension(Config.OUTPUT_DIMENSION_FILE))
         
         if new_data_dates is not None:
-            clean_history_df = history_df[~history_df['datetime'].dt.date.isin(new_data_dates)]
+            # Datas não contíguas dentro do intervalo excluído na leitura.
+            new_days = pd.to_datetime(pd.Series(list(new_data_dates))).dt.normalize()
+            clean_history_df = history_df[~history_df['datetime'].dt.normalize().isin(new_days)]
             return clean_history_df
         
         return history_df
 
     except FileNotFoundError:
-        print("Arquivo de histórico (parquet) não encontrado. Um novo será criado.")
+        logger.info("Arquivo de histórico (parquet) não encontrado. Um novo será criado.")
+        return pd.DataFrame()
+    except Exception as e:
+        logger.error(f"❌ ERRO: Falha ao ler o histórico parquet. Detalhes: {e}")
+        return pd.DataFrame()
+
+def parquet_write_options() -> dict:
+    """Opções de gravação Parquet configuradas em Config (compressão, row groups)."""
+    options = {'compression': Config.OUTPUT_COMPRESSION}
+    if Config.OUTPUT_COMPRESSION_LEVEL is not None:
+        options['compression_level'] = Config.OUTPUT_COMPRESSION_LEVEL
+    if Config.OUTPUT_ROW_GROUP_SIZE is not None:
+        options['row_group_size'] = Config.OUTPUT_ROW_GROUP_SIZE
+    return options
+
+def sort_for_output(df: pd.DataFrame) -> pd.DataFrame:
+    """Ordena pelas colunas de OUTPUT_SORT_COLUMNS presentes no DataFrame."""
+    sort_columns = [col for col in Config.OUTPUT_SORT_COLUMNS if col in df.columns]
+    if not sort_columns:
+        return df
+    return df.sort_values(by=sort_columns, kind='stable').reset_index(drop=True)
+
+def split_compact_output(df: pd.DataFrame, previous_dimension: Optional[pd.DataFrame] = None):
+    """
+    Converte o DataFrame de saída para o formato compacto.
+
+    Returns:
+        (fato, dimensão): o fato sem lat/lon, com SB/sky_condition categóricos
+        e medidas em float32; a dimensão com uma linha por SB (SB, lat, lon).
+        SBs do fato sem coordenada nos dados (ex.: vindos do histórico
+        compacto) mantêm a coordenada de `previous_dimension`.
+    """
+    coordinate_columns = [Config.LAT_COLUMN, Config.LON_COLUMN]
+    dimension_columns = [Config.ID_COLUMN] + coordinate_columns
+
+    dimension_df = pd.DataFrame(columns=dimension_columns)
+    if all(col in df.columns for col in coordinate_columns):
+        dimension_df = df[dimension_columns].dropna().astype({Config.ID_COLUMN: str})
+    if previous_dimension is not None and not previous_dimension.empty:
+        dimension_df = pd.concat([dimension_df, previous_dimension[dimension_columns].astype({Config.ID_COLUMN: str})])
+    dimension_df = dimension_df.drop_duplicates(subset=[Config.ID_COLUMN], keep='first')
+    fact_ids = set(df[Config.ID_COLUMN].astype(str).unique())
+    dimension_df = dimension_df[dimension_df[Config.ID_COLUMN].isin(fact_ids)]
+    dimension_df = dimension_df.sort_values(by=Config.ID_COLUMN).reset_index(drop=True)
+
+    fact_df = df.drop(columns=[col for col in coordinate_columns if col in df.columns])
+    for col in CATEGORY_COLUMNS:
+        if col in fact_df.columns:
+            fact_df[col] = fact_df[col].astype(str).astype('category')
+    for col in MEASURE_COLUMNS:
+        if col in fact_df.columns:
+            fact_df[col] = fact_df[col].astype('float32')
+    return sort_for_output(fact_df), dimension_df
+
+def load_dimension(filepath: str = Config.OUTPUT_DIMENSION_FILE) -> pd.DataFrame:
+    """Carrega a tabela de dimensão de SBs (SB, lat, lon) do formato compacto."""
+    try:
+        return pd.read_parquet(filepath)
+    except FileNotFoundError:
+        return pd.DataFrame()
+
+def attach_dimension(df: pd.DataFrame, dimension_df: pd.DataFrame) -> pd.DataFrame:
+    """Recoloca lat/lon (da tabela de dimensão) em um DataFrame compacto."""
+    if dimension_df.empty or Config.LAT_COLUMN in df.columns:
+        return df
+    coordinates = dimension_df.set_index(Config.ID_COLUMN)
+    sb = df[Config.ID_COLUMN].astype(str)
+    df = df.copy()
+    df[Config.LAT_COLUMN] = sb.map(coordinates[Config.LAT_COLUMN]).to_numpy()
+    df[Config.LON_COLUMN] = sb.map(coordinates[Config.LON_COLUMN]).to_numpy()
+    return df
+
+def save_output(
+    df: pd.DataFrame,
+    filepath: str = Config.OUTPUT_FILE,
+    compact: Optional[bool] = None,
+    dimension_filepath: str = Config.OUTPUT_DIMENSION_FILE
+):
+    """
+    Salva o DataFrame final no arquivo de saída Parquet.
+
+    No formato compacto (`compact`, padrão Config.OUTPUT_COMPACT), grava o
+    fato em `filepath` e a tabela de dimensão em `dimension_filepath`.
+    """
+    compact = Config.OUTPUT_COMPACT if compact is None else compact
+    try:
+        if compact:
+            df, dimension_df = split_compact_output(df, load_dimension(dimension_filepath))
+            dimension_df.to_parquet(dimension_filepath, index=False, engine='pyarrow')
+        df.to_parquet(filepath, index=False, engine='pyarrow', **parquet_write_options())
+        logger.info(f"\n✅ Sucesso! Histórico salvo em '{filepath}'.")
+    except Exception as e:
+        logger.error(f"❌ ERRO CRÍTICO: Falha ao salvar o arquivo Parquet. Detalhes: {e}")
+
+def _partition_dir(root: str, date_label: str, sub: Optional[str] = None) -> str:
+    path = os.path.join(root, f"{DATE_PARTITION}={date_label}")
+    if sub is not None:
+        path = os.path.join(path, f"{SUB_PARTITION}={sub}")
+    return path
+
+def list_date_partitions(root: str = Config.OUTPUT_DATASET_DIR) -> List[str]:
+    """Lista as datas (AAAA-MM-DD) presentes no dataset particionado."""
+    if not os.path.isdir(root):
+        return []
+    prefix = f"{DATE_PARTITION}="
+    return sorted(
+        name[len(prefix):] for name in os.listdir(root)
+        if name.startswith(prefix) and os.path.isdir(os.path.join(root, name))
+    )
+
+def save_dataset(
+    df: pd.DataFrame,
+    root: str = Config.OUTPUT_DATASET_DIR,
+    partition_by_sub: bool = False,
+    compact: Optional[bool] = None,
+    dimension_filepath: str = Config.OUTPUT_DIMENSION_FILE
+):
+    """
+    Grava o DataFrame no dataset particionado por data (estilo Hive), com
+    uma sub-partição por Sub se `partition_by_sub` for True.
+
+    Somente as datas presentes em `df` são substituídas; as demais partições
+    ficam intactas. Cada data é gravada primeiro em um diretório temporário e
+    só então trocada pela versão antiga, para que uma falha no meio da
+    gravação não deixe uma partição pela metade. No formato compacto, lat/lon
+    vão para a tabela de dimensão, como em `save_output`.
+    """
+    if df.empty:
+        return
+    compact = Config.OUTPUT_COMPACT if compact is None else compact
+    try:
+        if partition_by_sub and SUB_PARTITION not in df.columns:
+            raise ValueError(f"Particionar por Sub exige a coluna '{SUB_PARTITION}'.")
+        if compact:
+            previous_dimension = load_dimension(dimension_filepath)
+            df, dimension_df = split_compact_output(df, previous_dimension)
+            dimension_df = pd.concat([dimension_df, previous_dimension])
+            dimension_df = dimension_df.drop_duplicates(subset=[Config.ID_COLUMN], keep='first')
+            dimension_df.sort_values(by=Config.ID_COLUMN).to_parquet(dimension_filepath, index=False, engine='pyarrow')
+
+        staging_root = os.path.join(root, f".staging-{uuid.uuid4().hex}")
+        day = pd.to_datetime(df['datetime']).dt.normalize()
+        group_keys = [day, df[SUB_PARTITION]] if partition_by_sub else [day]
+        data_columns = [col for col in df.columns if col != SUB_PARTITION]
+
+        written_dates = set()
+        for keys, part_df in df[data_columns].groupby(group_keys, sort=True, observed=True):
+            keys = keys if isinstance(keys, tuple) else (keys,)
+            date_label = pd.Timestamp(keys[0]).strftime('%Y-%m-%d')
+            part_dir = _partition_dir(staging_root, date_label, keys[1] if partition_by_sub else None)
+            os.makedirs(part_dir, exist_ok=True)
+            sort_for_output(part_df).to_parquet(
+                os.path.join(part_dir, 'part-0.parquet'), index=False, engine='pyarrow',
+                **parquet_write_options()
+            )
+            written_dates.add(date_label)
+
+        for date_label in sorted(written_dates):
+            target_dir = _partition_dir(root, date_label)
+            if os.path.isdir(target_dir):
+                shutil.rmtree(target_dir)
+            os.replace(_partition_dir(staging_root, date_label), target_dir)
+        shutil.rmtree(staging_root, ignore_errors=True)
+
+        logger.info(f"\n✅ Sucesso! {len(written_dates)} partições de data gravadas em '{root}'.")
+    except Exception as e:
+        logger.error(f"❌ ERRO CRÍTICO: Falha ao salvar o dataset particionado. Detalhes: {e}")
+
+def drop_expired_partitions(
+    root: str = Config.OUTPUT_DATASET_DIR,
+    reference_date=None,
+    days_past: int = Config.ROLLING_WINDOW_DAYS_PAST,
+    days_future: int = Config.ROLLING_WINDOW_DAYS_FUTURE
+) -> List[str]:
+    """Apaga as partições de data fora da janela móvel e retorna as datas removidas."""
+    start_date, end_date = rolling_window_bounds(reference_date, days_past, days_future)
+    start_label, end_label = start_date.isoformat(), end_date.isoformat()
+
+    expired = [d for d in list_date_partitions(root) if not (start_label <= d <= end_label)]
+    for date_label in expired:
+        shutil.rmtree(_partition_dir(root, date_label))
+    if expired:
+        logger.info(f"🧹 Janela móvel aplicada [{start_date} a {end_date}]: "
+              f"{len(expired)} partições expiradas removidas.")
+    return expired
+
+def load_dataset(root: str = Config.OUTPUT_DATASET_DIR) -> pd.DataFrame:
+    """Lê o dataset particionado inteiro como um único DataFrame."""
+    try:
+        if not list_date_partitions(root):
+            return pd.DataFrame()
+        df = pd.read_parquet(root, engine='pyarrow')
+        # As colunas de partição são reconstruídas a partir dos diretórios;
+        # 'datetime' já contém a data.
+        df = df.drop(columns=[DATE_PARTITION])
+        if SUB_PARTITION in df.columns:
+            df[SUB_PARTITION] = df[SUB_PARTITION].astype(str)
+        df['datetime'] = pd.to_datetime(df['datetime'])
+        return df.sort_values(by=[Config.ID_COLUMN, 'datetime']).reset_index(drop=True)
+    except Exception as e:
+        logger.error(f"❌ ERRO: Falha ao ler o dataset particionado. Detalhes: {e}")
+        return pd.DataFrame()
+
+def load_thermal_state(filepath: str = Config.THERMAL_STATE_FILE) -> pd.DataFrame:
+    """Carrega o estado térmico (SB, datetime, estimated_rail_temp) da execução anterior."""
+    try:
+        state_df = pd.read_parquet(filepath)
+        state_df['datetime'] = pd.to_datetime(state_df['datetime'])
+        return state_df
+
+    except FileNotFoundError:
+        logger.info("Estado térmico não encontrado. A inércia partirá da temperatura do ar.")
+        return pd.DataFrame()
+    except Exception as e:
+        logger.error(f"❌ ERRO: Falha ao ler o estado térmico. Detalhes: {e}")
+        return pd.DataFrame()
+
+def save_thermal_state(state_df: pd.DataFrame, filepath: str = Config.THERMAL_STATE_FILE):
+    """Salva o estado térmico para a próxima execução."""
+    try:
+        state_df.to_parquet(filepath, index=False, engine='pyarrow')
+        logger.info(f"✅ Estado térmico salvo em '{filepath}' ({len(state_df)} linhas).")
+    except Exception as e:
+        logger.error(f"❌ ERRO: Falha ao salvar o estado térmico. Detalhes: {e}")
+
+def load_daily_summary(filepath: str = Config.DAILY_SUMMARY_FILE) -> pd.DataFrame:
+    """Carrega o resumo diário por SB (ver `build_daily_summary`)."""
+    try:
+        return pd.read_parquet(filepath)
+    except FileNotFoundError:
+        return pd.DataFrame()
+    except Exception as e:
+        logger.error(f"❌ ERRO: Falha ao ler o resumo diário. Detalhes: {e}")
+        return pd.DataFrame()
+
+def save_daily_summary(
+    summary_df: pd.DataFrame,
+    filepath: str = Config.DAILY_SUMMARY_FILE,
+    reference_date=None,
+    days_past: int = Config.ROLLING_WINDOW_DAYS_PAST,
+    days_future: int = Config.ROLLING_WINDOW_DAYS_FUTURE
+):
+    """
+    Grava o resumo diário. Os dias de `summary_df` substituem os do arquivo
+    existente, os demais são mantidos e tudo fica restrito à janela móvel
+    (como no histórico horário).
+    """
+    try:
+        previous_df = load_daily_summary(filepath)
+        if not previous_df.empty:
+            previous_df = previous_df[~previous_df['date'].isin(summary_df['date'].unique())]
+            summary_df = pd.concat([previous_df, summary_df], ignore_index=True)
+
+        start_date, end_date = rolling_window_bounds(reference_date, days_past, days_future)
+        in_window = summary_df['date'].between(pd.Timestamp(start_date), pd.Timestamp(end_date))
+        summary_df = summary_df[in_window].sort_values(by=[Config.ID_COLUMN, 'date']).reset_index(drop=True)
+
+        directory = os.path.dirname(filepath)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        summary_df.to_parquet(filepath, index=False, engine='pyarrow')
+        logger.info(f"✅ Resumo diário salvo em '{filepath}' ({len(summary_df)} linhas SB x dia).")
+    except Exception as e:
+        logger.error(f"❌ ERRO: Falha ao salvar o resumo diário. Detalhes: {e}")
+
+DELTA_STATS_KEY = b'delta_stats'
+
+def load_delta(filepath: str = Config.DELTA_FILE) -> pd.DataFrame:
+    """Carrega o delta da última execução; as contagens ficam em `df.attrs['delta_stats']`."""
+    try:
+        table = pq.read_table(filepath)
+    except FileNotFoundError:
         return pd.DataFrame()
     except Exception as e:
-        print(f"❌ ERRO: Falha ao ler o histórico parquet. Detalhes: {e}")
+        logger.error(f"❌ ERRO: Falha ao ler o delta. Detalhes: {e}")
         return pd.DataFrame()
+    delta_df = table.to_pandas()
+    metadata = table.schema.metadata or {}
+    delta_df.attrs['delta_stats'] = json.loads(metadata.get(DELTA_STATS_KEY, b'{}'))
+    return delta_df
 
-def save_output(df: pd.DataFrame, filepath: str = Config.OUTPUT_FILE):
-    """Salva o DataFrame final no arquivo de saída Parquet."""
+def save_delta(delta_df: pd.DataFrame, stats: dict, filepath: str = Config.DELTA_FILE):
+    """Grava o delta da execução, com as contagens nos metadados do Parquet."""
     try:
-        df.to_parquet(filepath, index=False, engine='pyarrow')
-        print(f"\n✅ Sucesso! Histórico salvo em '{filepath}'.")
+        table = pa.Table.from_pandas(delta_df, preserve_index=False)
+        metadata = dict(table.schema.metadata or {})
+        metadata[DELTA_STATS_KEY] = json.dumps(stats).encode()
+        directory = os.path.dirname(filepath)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        pq.write_table(table.replace_schema_metadata(metadata), filepath, compression=Config.OUTPUT_COMPRESSION)
+        logger.info(f"✅ Delta salvo em '{filepath}' ({len(delta_df)} linhas alteradas).")
     except Exception as e:
-        print(f"❌ ERRO CRÍTICO: Falha ao salvar o arquivo Parquet. Detalhes: {e}")
\ No newline at end of file
+        logger.error(f"❌ ERRO: Falha ao salvar o delta. Detalhes: {e}")
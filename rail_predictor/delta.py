@@ -0,0 +1,166 @@
+# rail_predictor/delta.py
+"""
+Módulo de Detecção de Mudanças (publicação incremental).
+
+A cada execução o histórico inteiro é regravado, mas só as datas
+recoletadas mudam. `ForecastDelta` compara as linhas novas com o histórico
+anterior por (SB, datetime) e monta o delta da execução:
+
+    'inserted' - chave nova (ex.: o novo último dia da previsão);
+    'updated'  - chave existente com algum valor diferente;
+    'expired'  - chave do histórico anterior que saiu da janela móvel ou
+                 não veio mais em uma data recoletada.
+
+Do histórico anterior guardamos só a chave, um hash das colunas de valor e
+a temperatura estimada (para medir quanto a previsão mudou), em vez das
+linhas inteiras.
+"""
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from .config import Config
+from .data_io import CATEGORY_COLUMNS, MEASURE_COLUMNS
+from .processing import rolling_window_bounds
+
+CHANGE_COLUMN = 'change'
+# Colunas comparadas (lat/lon são atributos do SB, não da previsão).
+VALUE_COLUMNS = MEASURE_COLUMNS + [col for col in CATEGORY_COLUMNS if col != Config.ID_COLUMN]
+
+
+def row_hashes(df: pd.DataFrame) -> np.ndarray:
+    """
+    Hash (uint64) das colunas de valor de cada linha. As medidas são
+    comparadas em float32, a precisão do formato compacto: o mesmo valor
+    gravado no formato compacto ou no completo tem o mesmo hash.
+    """
+    columns = {}
+    for col in VALUE_COLUMNS:
+        if col not in df.columns:
+            continue
+        if col in MEASURE_COLUMNS:
+            columns[col] = df[col].to_numpy(dtype='float32')
+        else:
+            # Categórico: cada texto distinto é hasheado uma vez só (o hash
+            # é o mesmo do texto em uma coluna comum).
+            columns[col] = _as_categorical(df[col])
+    return pd.util.hash_pandas_object(pd.DataFrame(columns), index=False).to_numpy()
+
+
+def _as_categorical(values: pd.Series) -> pd.Categorical:
+    categorical = values.array if isinstance(values.dtype, pd.CategoricalDtype) else pd.Categorical(values)
+    return categorical.rename_categories(categorical.categories.astype(str))
+
+
+def _epoch_seconds(datetimes: pd.Series) -> np.ndarray:
+    return pd.to_datetime(datetimes).to_numpy(dtype='datetime64[s]').astype(np.int64)
+
+
+class ForecastDelta:
+    """
+    Delta entre o histórico anterior (`previous_df`) e as linhas novas
+    entregues a `compare` (uma vez, ou bloco a bloco no modo streaming).
+    """
+
+    def __init__(self, previous_df: pd.DataFrame):
+        if previous_df.empty:
+            previous_df = pd.DataFrame({
+                Config.ID_COLUMN: pd.Series(dtype=object),
+                'datetime': pd.Series(dtype='datetime64[s]'),
+                'estimated_rail_temp': pd.Series(dtype='float32'),
+            })
+        previous_sb = _as_categorical(previous_df[Config.ID_COLUMN])
+        # Chave inteira (código do SB, segundos da época): a junção por
+        # (SB, datetime) vira uma busca em tabela hash de int64.
+        self._sb_index = pd.Index(previous_sb.categories)
+        previous_time = _epoch_seconds(previous_df['datetime'])
+        keys = previous_sb.codes.astype(np.int64) * (1 << 32) + previous_time
+        unique = ~pd.Index(keys).duplicated(keep='last')
+        self._previous_index = pd.Index(keys[unique])
+        self._previous_sb_codes = previous_sb.codes[unique]
+        self._previous_time = previous_time[unique]
+        self._previous_hash = row_hashes(previous_df)[unique]
+        self._previous_temp = previous_df['estimated_rail_temp'].to_numpy(dtype='float32')[unique]
+        self._matched = np.zeros(len(self._previous_index), dtype=bool)
+
+        self.new_dates = set()
+        self.inserted = 0
+        self.updated = 0
+        self.unchanged = 0
+        self._parts: List[pd.DataFrame] = []
+        self._temp_changes: List[np.ndarray] = []
+
+    def _keys(self, sb: pd.Series, datetimes: pd.Series) -> np.ndarray:
+        # Busca só os SBs distintos e expande pelos códigos do categórico.
+        sb = _as_categorical(sb)
+        codes = self._sb_index.get_indexer(sb.categories.astype(str)).astype(np.int64)[sb.codes]
+        # SBs fora do histórico recebem código -1: chave negativa, sem par.
+        return codes * (1 << 32) + _epoch_seconds(datetimes)
+
+    def compare(self, current_df: pd.DataFrame):
+        """Classifica as linhas novas (já na janela móvel) e guarda as alteradas."""
+        if current_df.empty:
+            return
+        self.new_dates.update(current_df['datetime'].dt.normalize().unique())
+        positions = self._previous_index.get_indexer(self._keys(current_df[Config.ID_COLUMN], current_df['datetime']))
+        found = positions >= 0
+        matched = positions[found]
+        self._matched[matched] = True
+
+        changed = np.zeros(len(current_df), dtype=bool)
+        changed[found] = row_hashes(current_df)[found] != self._previous_hash[matched]
+        inserted = ~found
+        self.inserted += int(inserted.sum())
+        self.updated += int(changed.sum())
+        self.unchanged += int(found.sum()) - int(changed.sum())
+
+        current_temp = current_df['estimated_rail_temp'].to_numpy(dtype='float32')
+        self._temp_changes.append(np.abs(current_temp[changed] - self._previous_temp[positions[changed]]))
+
+        keep = inserted | changed
+        if keep.any():
+            columns = [Config.ID_COLUMN, 'datetime'] + [col for col in VALUE_COLUMNS if col in current_df.columns]
+            part = current_df.loc[keep, columns].reset_index(drop=True)
+            part.insert(0, CHANGE_COLUMN, np.where(inserted[keep], 'inserted', 'updated'))
+            self._parts.append(part)
+
+    def _expired_mask(self) -> np.ndarray:
+        start_date, end_date = rolling_window_bounds()
+        days = self._previous_time - self._previous_time % 86400
+        start, end = (np.datetime64(day, 's').astype(np.int64) for day in (start_date, end_date))
+        new_days = np.array([np.datetime64(day, 's').astype(np.int64) for day in self.new_dates], dtype=np.int64)
+        # Fora da janela, ou de uma data recoletada e sem linha nova.
+        return ~self._matched & ((days < start) | (days > end) | np.isin(days, new_days))
+
+    def expired(self) -> pd.DataFrame:
+        """Chaves do histórico anterior que não existem mais no histórico novo."""
+        expired = self._expired_mask()
+        return pd.DataFrame({
+            CHANGE_COLUMN: 'expired',
+            Config.ID_COLUMN: self._sb_index.take(self._previous_sb_codes[expired]).to_numpy(dtype=object),
+            'datetime': self._previous_time[expired].astype('datetime64[s]'),
+        })
+
+    def result(self) -> pd.DataFrame:
+        """Delta completo (inserted/updated com os valores novos, expired só com a chave)."""
+        parts = [part for part in self._parts + [self.expired()] if not part.empty]
+        if not parts:
+            return pd.DataFrame(columns=[CHANGE_COLUMN, Config.ID_COLUMN, 'datetime'])
+        delta_df = pd.concat(parts, ignore_index=True)
+        delta_df['datetime'] = pd.to_datetime(delta_df['datetime'])
+        return delta_df.sort_values(by=[Config.ID_COLUMN, 'datetime'], kind='stable').reset_index(drop=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Contagens e variação da temperatura estimada nas linhas atualizadas."""
+        temp_changes = np.concatenate(self._temp_changes) if self._temp_changes else np.empty(0, dtype='float32')
+        compared = self.inserted + self.updated + self.unchanged
+        return {
+            'inserted': self.inserted,
+            'updated': self.updated,
+            'unchanged': self.unchanged,
+            'expired': int(self._expired_mask().sum()),
+            'changed_fraction': round((self.inserted + self.updated) / compared, 4) if compared else 0.0,
+            'mean_abs_temp_change': round(float(temp_changes.mean()), 3) if temp_changes.size else 0.0,
+            'max_abs_temp_change': round(float(temp_changes.max()), 3) if temp_changes.size else 0.0,
+        }
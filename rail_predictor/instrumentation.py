@@ -0,0 +1,230 @@
+# rail_predictor/instrumentation.py
+"""
+Módulo de Instrumentação (logs estruturados e relatório da execução).
+
+As etapas do pipeline são medidas com `stage(...)` (duração, linhas e pico
+de memória do processo) e as requisições à API com `record_request(...)`
+(latência, status, repetições). Tudo é acumulado no `RunReport` ativo e
+gravado como JSON ao lado da saída Parquet (Config.RUN_REPORT_FILE).
+
+Os módulos registram mensagens no logger "rail_predictor"; com
+Config.LOG_FORMAT = "json" cada linha do log é um objeto JSON, com os
+campos estruturados do evento (ex.: etapa, duração) em "data".
+"""
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from .config import Config
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger("rail_predictor")
+
+
+class JsonLogFormatter(logging.Formatter):
+    """Uma linha JSON por registro, com `event` e `data` quando informados."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage().strip(),
+        }
+        if getattr(record, 'event', None):
+            entry['event'] = record.event
+        if getattr(record, 'data', None):
+            entry['data'] = record.data
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def configure_logging(log_format: str = None, level: str = None):
+    """
+    Envia os logs do pacote para o stdout: "text" mantém as mensagens como
+    eram impressas; "json" emite uma linha JSON por registro.
+    """
+    log_format = log_format or Config.LOG_FORMAT
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JsonLogFormatter() if log_format == "json" else logging.Formatter("%(message)s"))
+
+    logger.handlers = [handler]
+    logger.setLevel(level or Config.LOG_LEVEL)
+    logger.propagate = False
+
+
+def max_rss_mb() -> Optional[float]:
+    """Pico de memória residente (RSS) do processo até agora, em MB."""
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss vem em KiB no Linux e em bytes no macOS.
+    return round(max_rss / (2**20 if sys.platform == 'darwin' else 2**10), 1)
+
+
+class RunReport:
+    """Acumula as métricas de uma execução do pipeline (thread-safe)."""
+
+    def __init__(self):
+        self.started_at = datetime.now(timezone.utc)
+        self._started = time.perf_counter()
+        self.stages = []
+        self.counters: Dict[str, int] = {}
+        self.status = "running"
+        self._latencies = []
+        self._status_codes: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add_stage(self, record: Dict[str, Any]):
+        with self._lock:
+            self.stages.append(record)
+
+    def increment(self, name: str, amount: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def record_request(self, latency: float, status_code: Optional[int], retries: int = 0, cached: bool = False):
+        with self._lock:
+            label = str(status_code) if status_code is not None else 'error'
+            self._status_codes[label] = self._status_codes.get(label, 0) + 1
+            if cached:
+                self.counters['api_cache_hits'] = self.counters.get('api_cache_hits', 0) + 1
+            else:
+                self._latencies.append(latency)
+            if retries:
+                self.counters['api_retries'] = self.counters.get('api_retries', 0) + retries
+
+    def api_summary(self) -> Dict[str, Any]:
+        """Contagem de requisições por status e percentis de latência (s)."""
+        with self._lock:
+            latencies = np.asarray(self._latencies, dtype=float)
+            summary = {
+                'requests': int(sum(self._status_codes.values())),
+                'status_codes': dict(self._status_codes),
+            }
+        if latencies.size:
+            p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+            summary['latency_seconds'] = {
+                'p50': round(float(p50), 4), 'p90': round(float(p90), 4),
+                'p99': round(float(p99), 4), 'max': round(float(latencies.max()), 4),
+                'mean': round(float(latencies.mean()), 4),
+            }
+        return summary
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'status': self.status,
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'duration_seconds': round(time.perf_counter() - self._started, 3),
+            'max_rss_mb': max_rss_mb(),
+            'config': {
+                'fetch_engine': Config.API_FETCH_ENGINE,
+                'ingestion': Config.API_INGESTION,
+                'batch_size': Config.API_BATCH_SIZE,
+                'rate_control': Config.API_RATE_CONTROL,
+                'spatial_mode': Config.API_SPATIAL_MODE,
+                'output_format': Config.OUTPUT_FORMAT,
+            },
+            'stages': list(self.stages),
+            'api': self.api_summary(),
+            'counters': dict(self.counters),
+        }
+
+    def write(self, filepath: str):
+        directory = os.path.dirname(filepath)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(filepath, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+
+
+_current_run: Optional[RunReport] = None
+
+
+def start_run() -> RunReport:
+    """Inicia um novo relatório e o torna o destino das métricas."""
+    global _current_run
+    _current_run = RunReport()
+    return _current_run
+
+
+def current_run() -> Optional[RunReport]:
+    return _current_run
+
+
+def finish_run(filepath: str = Config.RUN_REPORT_FILE, status: str = "success") -> Optional[RunReport]:
+    """Encerra o relatório ativo e o grava em `filepath`."""
+    global _current_run
+    report, _current_run = _current_run, None
+    if report is None:
+        return None
+    report.status = status
+    try:
+        report.write(filepath)
+        logger.info(f"📊 Relatório da execução salvo em '{filepath}'.",
+                    extra={'event': 'run_report', 'data': {'path': filepath, 'status': status}})
+    except OSError as e:
+        logger.error(f"❌ ERRO: Falha ao salvar o relatório da execução. Detalhes: {e}")
+    return report
+
+
+@contextmanager
+def stage(name: str):
+    """
+    Mede uma etapa do pipeline. O bloco pode preencher o dicionário recebido
+    (ex.: `rows_in`, `rows_out`) e ele é anexado ao relatório ativo.
+
+        with stage('load_locations') as metrics:
+            df = load_locations()
+            metrics['rows_out'] = len(df)
+    """
+    metrics: Dict[str, Any] = {'stage': name}
+    started = time.perf_counter()
+    try:
+        yield metrics
+    except Exception:
+        metrics['failed'] = True
+        raise
+    finally:
+        metrics['seconds'] = round(time.perf_counter() - started, 4)
+        metrics['max_rss_mb'] = max_rss_mb()
+        if _current_run is not None:
+            _current_run.add_stage(metrics)
+        rows = f", {metrics['rows_out']} linhas" if 'rows_out' in metrics else ""
+        logger.info(f"⏱️ Etapa '{name}' concluída em {metrics['seconds']:.2f}s{rows}.",
+                    extra={'event': 'stage', 'data': metrics})
+
+
+def record_request(latency: float, status_code: Optional[int], retries: int = 0, cached: bool = False):
+    """Registra uma requisição à API no relatório ativo (se houver)."""
+    if _current_run is not None:
+        _current_run.record_request(latency, status_code, retries, cached)
+
+
+def record_response(response, latency: float):
+    """`record_request` a partir de um `requests.Response` (inclui as repetições do urllib3)."""
+    if _current_run is None:
+        return
+    retry_state = getattr(getattr(response, 'raw', None), 'retries', None)
+    retries = len(getattr(retry_state, 'history', ()) or ())
+    cached = response.headers.get('X-Cache') == 'HIT'
+    _current_run.record_request(latency, response.status_code, retries, cached)
+
+
+def increment(name: str, amount: int = 1):
+    """Incrementa um contador do relatório ativo (se houver)."""
+    if _current_run is not None:
+        _current_run.increment(name, amount)
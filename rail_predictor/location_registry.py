@@ -0,0 +1,157 @@
+# rail_predictor/location_registry.py
+"""
+Módulo do Registro Compilado de Locais.
+
+O coordenadas.json é validado e normalizado uma única vez e gravado como um
+Parquet (Config.LOCATION_REGISTRY_FILE) com, por SB: código, id inteiro,
+coordenadas, Sub, faixa de km e o id do ponto da API (agrupamento por
+coordenada). As execuções seguintes leem o Parquet enquanto o hash do
+conteúdo do JSON (e o arredondamento das coordenadas) não mudar.
+
+`sb_id` é a posição do SB na ordem alfabética dos códigos, a mesma dos
+códigos das colunas categóricas de SB geradas pela coleta. `point_id`
+numera os pontos distintos na ordem em que aparecem no JSON.
+"""
+import hashlib
+import json
+import logging
+import os
+import uuid
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+SB_ID_COLUMN = 'sb_id'
+POINT_ID_COLUMN = 'point_id'
+SUB_COLUMN = 'Sub'
+KM_COLUMNS = {'Km início': 'km_start', 'Km fim': 'km_end'}
+
+# Mudanças no conteúdo do registro devem incrementar a versão para
+# invalidar os arquivos já compilados.
+REGISTRY_VERSION = "1"
+_METADATA_KEY = b'rail_predictor.location_registry'
+
+
+def source_hash(filepath: str) -> str:
+    """SHA-256 do conteúdo do arquivo de locais."""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def registry_key(filepath: str, decimals: Optional[int]) -> str:
+    """Identifica o registro: versão + hash do JSON + arredondamento usado nos pontos."""
+    return json.dumps({'version': REGISTRY_VERSION, 'source': source_hash(filepath), 'decimals': decimals})
+
+
+def compile_location_registry(
+    filepath: str,
+    decimals: Optional[int] = Config.COORDINATE_ROUNDING_DECIMALS
+) -> pd.DataFrame:
+    """
+    Lê e valida o JSON de locais e monta o registro.
+
+    Returns:
+        DataFrame com ID, latitude, longitude, 'Sub' e 'km_start'/'km_end'
+        (se presentes no JSON), `sb_id` e `point_id`, na ordem do arquivo.
+    """
+    with open(filepath, encoding='utf-8') as f:
+        df = pd.DataFrame(json.load(f))
+    df.rename(columns={
+        'SB': Config.ID_COLUMN,
+        'Mediana Latitude': Config.LAT_COLUMN,
+        'Mediana Longitude': Config.LON_COLUMN,
+        **KM_COLUMNS
+    }, inplace=True)
+
+    required_cols = [Config.ID_COLUMN, Config.LAT_COLUMN, Config.LON_COLUMN]
+    if not all(col in df.columns for col in required_cols):
+        raise ValueError("O JSON deve conter as colunas: 'SB', 'Mediana Latitude' e 'Mediana Longitude'")
+
+    df[Config.ID_COLUMN] = df[Config.ID_COLUMN].astype(str).str.strip()
+    df.dropna(subset=required_cols, inplace=True)
+    df.drop_duplicates(subset=[Config.ID_COLUMN], keep='first', inplace=True)
+    df[Config.LAT_COLUMN] = df[Config.LAT_COLUMN].astype(float)
+    df[Config.LON_COLUMN] = df[Config.LON_COLUMN].astype(float)
+
+    # 'Sub' e a faixa de km são opcionais.
+    columns = list(required_cols)
+    if SUB_COLUMN in df.columns:
+        df[SUB_COLUMN] = df[SUB_COLUMN].astype(str).str.strip()
+        columns.append(SUB_COLUMN)
+    for km_column in KM_COLUMNS.values():
+        if km_column in df.columns:
+            df[km_column] = pd.to_numeric(df[km_column], errors='coerce')
+            columns.append(km_column)
+    df = df[columns].reset_index(drop=True)
+
+    sb_codes = df[Config.ID_COLUMN].to_numpy()
+    df[SB_ID_COLUMN] = np.argsort(np.argsort(sb_codes, kind='stable'), kind='stable').astype(np.int32)
+
+    keys = df[[Config.LAT_COLUMN, Config.LON_COLUMN]]
+    if decimals is not None:
+        keys = keys.round(decimals)
+    df[POINT_ID_COLUMN] = keys.groupby(
+        [Config.LAT_COLUMN, Config.LON_COLUMN], sort=False
+    ).ngroup().to_numpy(dtype=np.int32)
+    return df
+
+
+def _read_registry(registry_path: str, key: str) -> Optional[pd.DataFrame]:
+    """Lê o registro compilado se ele existir e corresponder a `key`."""
+    try:
+        metadata = pq.read_schema(registry_path).metadata or {}
+    except (OSError, pa.ArrowInvalid):
+        return None
+    if metadata.get(_METADATA_KEY, b'').decode('utf-8') != key:
+        return None
+    return pq.read_table(registry_path).to_pandas()
+
+
+def _write_registry(df: pd.DataFrame, registry_path: str, key: str):
+    """Grava o registro de forma atômica, com a chave nos metadados do Parquet."""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), _METADATA_KEY: key.encode('utf-8')})
+    directory = os.path.dirname(registry_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{registry_path}.tmp-{uuid.uuid4().hex}"
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, registry_path)
+
+
+def load_location_registry(
+    filepath: str = Config.INPUT_JSON_FILE,
+    registry_path: str = Config.LOCATION_REGISTRY_FILE,
+    decimals: Optional[int] = Config.COORDINATE_ROUNDING_DECIMALS
+) -> pd.DataFrame:
+    """
+    Retorna o registro de locais, recompilando-o apenas se o JSON (ou o
+    arredondamento das coordenadas) mudou desde a última compilação.
+
+    Args:
+        decimals: Arredondamento usado em `point_id` (None = apenas
+            coordenadas idênticas formam um ponto).
+    """
+    key = registry_key(filepath, decimals)
+    registry_df = _read_registry(registry_path, key)
+    if registry_df is not None:
+        return registry_df
+
+    registry_df = compile_location_registry(filepath, decimals)
+    try:
+        _write_registry(registry_df, registry_path, key)
+        logger.info(f"🗂️ Registro de locais compilado em '{registry_path}' ({len(registry_df)} SBs).")
+    except OSError as e:
+        # Sem o arquivo, a próxima execução apenas compila de novo.
+        logger.warning(f"⚠️ AVISO: Não foi possível gravar o registro de locais. Detalhes: {e}")
+    return registry_df
@@ -0,0 +1,299 @@
+# rail_predictor/pipeline.py
+"""
+Módulo de Orquestração do Pipeline (usado por `main.py` e pela CLI).
+
+As etapas podem rodar juntas (`run_pipeline`, a execução diária) ou
+separadas pela CLI: `fetch_raw` grava a coleta bruta em Parquet e
+`process_raw` a processa e grava a saída depois. Os motores opcionais
+(multi-processo, streaming) só são importados quando configurados.
+"""
+import logging
+import os
+from typing import Any, Dict, Optional
+
+import pandas as pd
+
+from .config import Config
+from .data_io import (
+    load_locations, load_history, save_output, load_thermal_state, save_thermal_state,
+    save_dataset, drop_expired_partitions, save_daily_summary, save_delta
+)
+from .api_client import fetch_weather_data_parallel, clear_fetch_checkpoint, RESOLUTION_TIME_BLOCKS
+from .processing import (
+    run_processing_pipeline, apply_rolling_window, rolling_window_bounds,
+    extract_thermal_state, merge_thermal_state, build_daily_summary, timestep
+)
+from .instrumentation import stage
+
+logger = logging.getLogger("rail_predictor.main")
+
+
+def build_api_params() -> Dict[str, Any]:
+    """Parâmetros da API para a janela móvel e a resolução temporal configuradas."""
+    timestep(Config.TEMPORAL_RESOLUTION)  # valida a resolução
+    return {
+        # 'hourly' ou 'minutely_15', conforme Config.TEMPORAL_RESOLUTION.
+        RESOLUTION_TIME_BLOCKS[Config.TEMPORAL_RESOLUTION]: Config.API_HOURLY_VARS,
+        'timezone': Config.API_TIMEZONE,
+        # Sempre buscamos a janela completa (D-3 a D+3) em toda execução.
+        # Isso garante que a janela móvel avance dia a dia, com o passado
+        # recente sempre atualizado com dados observados (não apenas previstos)
+        # e o horizonte de previsão sempre renovado.
+        'past_days': Config.ROLLING_WINDOW_DAYS_PAST,
+        'forecast_days': Config.ROLLING_WINDOW_DAYS_FUTURE
+    }
+
+
+def write_daily_summary(summary_df: pd.DataFrame):
+    """Mescla o resumo diário por SB ao DAILY_SUMMARY_FILE."""
+    if summary_df.empty:
+        return
+    with stage('daily_summary') as metrics:
+        save_daily_summary(summary_df, Config.DAILY_SUMMARY_FILE)
+        metrics['rows_out'] = len(summary_df)
+
+
+def history_path() -> str:
+    return Config.OUTPUT_DATASET_DIR if Config.OUTPUT_FORMAT == "dataset" else Config.OUTPUT_FILE
+
+
+def load_delta_baseline():
+    """
+    Carrega do histórico anterior só o necessário para o delta (chave e
+    colunas de valor). Precisa rodar antes de a saída ser regravada.
+    """
+    from .delta import ForecastDelta, VALUE_COLUMNS
+    with stage('load_delta_baseline') as metrics:
+        previous_df = load_history(history_path(), columns=[Config.ID_COLUMN] + VALUE_COLUMNS)
+        metrics['rows_out'] = len(previous_df)
+        return ForecastDelta(previous_df)
+
+
+def publish_delta(delta):
+    """Grava o delta da execução (DELTA_FILE) e registra as contagens no relatório."""
+    with stage('publish_delta') as metrics:
+        delta_df = delta.result()
+        stats = delta.stats()
+        save_delta(delta_df, stats, Config.DELTA_FILE)
+        metrics.update(stats)
+        metrics['rows_out'] = len(delta_df)
+    logger.info(
+        f"🔁 Delta: {stats['inserted']} inseridas, {stats['updated']} alteradas, "
+        f"{stats['unchanged']} iguais, {stats['expired']} expiradas "
+        f"(variação média da temperatura estimada: {stats['mean_abs_temp_change']} °C)."
+    )
+
+
+def save_as_single_file(new_processed_df: pd.DataFrame):
+    """Mescla com o histórico e reescreve o parquet único (OUTPUT_FORMAT = "file")."""
+    # Apenas o histórico dentro da janela e fora das datas novas é lido do
+    # disco (filtros repassados ao pyarrow).
+    new_data_dates = new_processed_df['datetime'].dt.normalize().unique()
+    start_date, end_date = rolling_window_bounds()
+    with stage('load_history') as metrics:
+        clean_history_df = load_history(
+            Config.OUTPUT_FILE, new_data_dates=new_data_dates, start_date=start_date, end_date=end_date
+        )
+        metrics['rows_out'] = len(clean_history_df)
+
+    final_df = pd.concat([clean_history_df, new_processed_df], ignore_index=True)
+    logger.info("✅ Modelo de inércia térmica aplicado e dados combinados.")
+
+    logger.info(f"\n--- 5/5: Aplicando Janela Móvel e Salvando ---")
+    # Garante que o arquivo final NUNCA cresça indefinidamente: mantém
+    # apenas D-3 a D+3, independentemente do que veio do histórico antigo
+    # ou da nova coleta.
+    with stage('apply_rolling_window') as metrics:
+        metrics['rows_in'] = len(final_df)
+        final_df = apply_rolling_window(final_df)
+        final_df.sort_values(by=[Config.ID_COLUMN, 'datetime'], inplace=True)
+        metrics['rows_out'] = len(final_df)
+
+    with stage('save_output') as metrics:
+        save_output(final_df, Config.OUTPUT_FILE, Config.OUTPUT_COMPACT, Config.OUTPUT_DIMENSION_FILE)
+        metrics['rows_out'] = len(final_df)
+
+    if Config.DAILY_SUMMARY_ENABLED:
+        write_daily_summary(build_daily_summary(final_df, Config.HEAT_BUCKLING_THRESHOLDS))
+
+
+def save_as_dataset(new_processed_df: pd.DataFrame, locations_df: pd.DataFrame):
+    """
+    Grava apenas as partições de data cobertas pelos dados novos
+    (OUTPUT_FORMAT = "dataset"); o histórico não precisa ser lido.
+    """
+    logger.info(f"\n--- 5/5: Aplicando Janela Móvel e Salvando (dataset particionado) ---")
+    with stage('apply_rolling_window') as metrics:
+        metrics['rows_in'] = len(new_processed_df)
+        new_processed_df = apply_rolling_window(new_processed_df)
+        metrics['rows_out'] = len(new_processed_df)
+
+    if Config.OUTPUT_PARTITION_BY_SUB:
+        sub_by_sb = locations_df.set_index(Config.ID_COLUMN)['Sub']
+        new_processed_df['Sub'] = new_processed_df[Config.ID_COLUMN].astype(str).map(sub_by_sb).fillna('N/A')
+
+    with stage('save_output') as metrics:
+        save_dataset(
+            new_processed_df, Config.OUTPUT_DATASET_DIR, Config.OUTPUT_PARTITION_BY_SUB,
+            Config.OUTPUT_COMPACT, Config.OUTPUT_DIMENSION_FILE
+        )
+        drop_expired_partitions(Config.OUTPUT_DATASET_DIR)
+        metrics['rows_out'] = len(new_processed_df)
+
+    # Só as datas novas são resumidas; as demais são mantidas do arquivo.
+    if Config.DAILY_SUMMARY_ENABLED:
+        write_daily_summary(build_daily_summary(new_processed_df, Config.HEAT_BUCKLING_THRESHOLDS))
+
+
+def load_locations_stage() -> pd.DataFrame:
+    logger.info(f"\n--- 1/5: Carregando Dados de Localização ---")
+    with stage('load_locations') as metrics:
+        locations_df = load_locations(Config.INPUT_JSON_FILE)
+        metrics['rows_out'] = len(locations_df)
+    if locations_df.empty:
+        logger.error("❌ Encerrando: Não foi possível carregar os locais.")
+    else:
+        logger.info(f"✅ {len(locations_df)} locais únicos carregados.")
+    return locations_df
+
+
+def fetch_raw(locations_df: pd.DataFrame, api_params: Dict[str, Any]) -> pd.DataFrame:
+    """Etapa 3: coleta os dados brutos de todos os locais."""
+    logger.info(f"\n--- 3/5: Coletando Dados da API (Paralelo) ---")
+    with stage('fetch_weather_data_parallel') as metrics:
+        metrics['rows_in'] = len(locations_df)
+        new_df = fetch_weather_data_parallel(locations_df, api_params)
+        metrics['rows_out'] = len(new_df)
+    if not new_df.empty:
+        logger.info(f"\n✅ Dados da API coletados. {len(new_df)} linhas recebidas.")
+    return new_df
+
+
+def process_raw(new_df: pd.DataFrame, locations_df: pd.DataFrame, thermal_state_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Etapas 4 e 5: processa os dados brutos e grava a saída. Retorna o estado
+    térmico extraído dos dados novos.
+    """
+    logger.info(f"\n--- 4/5: Processando Dados e Aplicando Modelo ---")
+    with stage('run_processing_pipeline') as metrics:
+        metrics['rows_in'] = len(new_df)
+        if Config.PROCESSING_ENGINE == "sharded":
+            # Importação tardia: só o motor multi-processo precisa dele.
+            from .sharding import run_processing_pipeline_sharded
+            new_processed_df = run_processing_pipeline_sharded(new_df, thermal_state_df, locations_df)
+        else:
+            new_processed_df = run_processing_pipeline(new_df, thermal_state=thermal_state_df)
+        metrics['rows_out'] = len(new_processed_df)
+
+    delta = None
+    if Config.DELTA_ENABLED:
+        delta = load_delta_baseline()
+        with stage('detect_changes') as metrics:
+            metrics['rows_in'] = len(new_processed_df)
+            delta.compare(apply_rolling_window(new_processed_df))
+
+    if Config.ARCHIVE_ENABLED:
+        from .archive import archive_forecast
+        with stage('archive_forecast') as metrics:
+            archive_forecast(new_processed_df, Config.ARCHIVE_DIR)
+            metrics['rows_out'] = len(new_processed_df)
+
+    if Config.OUTPUT_FORMAT == "dataset":
+        save_as_dataset(new_processed_df, locations_df)
+    else:
+        save_as_single_file(new_processed_df)
+    if delta is not None:
+        publish_delta(delta)
+    return extract_thermal_state(new_processed_df)
+
+
+def run_as_batch(locations_df: pd.DataFrame, api_params: dict, thermal_state_df: pd.DataFrame):
+    """
+    Coleta tudo, processa e grava (PIPELINE_MODE = "batch"). Retorna o
+    estado térmico extraído dos dados novos, ou None se nada foi coletado.
+    """
+    new_df = fetch_raw(locations_df, api_params)
+    if new_df.empty:
+        return None
+    return process_raw(new_df, locations_df, thermal_state_df)
+
+
+def run_as_stream(locations_df: pd.DataFrame, api_params: dict, thermal_state_df: pd.DataFrame):
+    """
+    Coleta, processa e grava de forma sobreposta (PIPELINE_MODE = "streaming").
+    Retorna o estado térmico dos dados novos, ou None se nada foi coletado.
+    """
+    from .streaming import run_streaming_pipeline
+
+    delta = load_delta_baseline() if Config.DELTA_ENABLED else None
+
+    logger.info(f"\n--- 3-5/5: Coletando, Processando e Salvando (streaming) ---")
+    with stage('stream_pipeline') as metrics:
+        metrics['rows_in'] = len(locations_df)
+        summary = run_streaming_pipeline(
+            locations_df, api_params, thermal_state_df, Config.OUTPUT_FILE,
+            Config.OUTPUT_COMPACT, Config.OUTPUT_DIMENSION_FILE,
+            summary_thresholds=Config.HEAT_BUCKLING_THRESHOLDS if Config.DAILY_SUMMARY_ENABLED else None,
+            archive_dir=Config.ARCHIVE_DIR if Config.ARCHIVE_ENABLED else None, delta=delta
+        )
+        metrics['rows_fetched'] = summary['rows_fetched']
+        metrics['rows_out'] = summary['rows_written']
+        metrics['row_groups'] = summary['row_groups']
+    if summary['rows_fetched'] == 0:
+        return None
+    write_daily_summary(summary['daily_summary'])
+    if delta is not None:
+        publish_delta(delta)
+    return summary['thermal_state']
+
+
+def update_thermal_state(thermal_state_df: pd.DataFrame, new_state_df: pd.DataFrame):
+    """Mescla o estado térmico dos dados novos ao anterior e o grava."""
+    # O estado guarda um dia a mais no passado que a janela: é o ponto de
+    # partida da próxima execução (e de reexecuções no mesmo dia).
+    thermal_state_df = merge_thermal_state(thermal_state_df, new_state_df)
+    thermal_state_df = apply_rolling_window(
+        thermal_state_df, days_past=Config.ROLLING_WINDOW_DAYS_PAST + 1
+    )
+    save_thermal_state(thermal_state_df, Config.THERMAL_STATE_FILE)
+
+
+def run_pipeline() -> bool:
+    """
+    Executa o pipeline de ETL de ponta a ponta. Retorna False se a execução
+    foi encerrada antes de gravar a saída.
+    """
+    locations_df = load_locations_stage()
+    if locations_df.empty:
+        return False
+
+    logger.info(f"\n--- 2/5: Preparando Parâmetros da API ---")
+    api_params = build_api_params()
+
+    if not os.path.exists(history_path()):
+        logger.info(f"Histórico não encontrado. Buscando janela inicial: "
+              f"D-{Config.ROLLING_WINDOW_DAYS_PAST} a D+{Config.ROLLING_WINDOW_DAYS_FUTURE}.")
+    else:
+        logger.info(f"Histórico encontrado. Atualizando janela móvel: "
+              f"D-{Config.ROLLING_WINDOW_DAYS_PAST} a D+{Config.ROLLING_WINDOW_DAYS_FUTURE}.")
+
+    # Continua a inércia térmica a partir do estado salvo na execução anterior
+    # (evita a partida a frio no início de cada janela).
+    thermal_state_df = load_thermal_state(Config.THERMAL_STATE_FILE)
+
+    if Config.PIPELINE_MODE == "streaming" and Config.OUTPUT_FORMAT == "file" and Config.API_SPATIAL_MODE == "points":
+        new_state_df = run_as_stream(locations_df, api_params, thermal_state_df)
+    else:
+        if Config.PIPELINE_MODE == "streaming":
+            logger.warning("⚠️ Aviso: o modo streaming exige OUTPUT_FORMAT = \"file\" e "
+                           "API_SPATIAL_MODE = \"points\"; usando o modo em lote.")
+        new_state_df = run_as_batch(locations_df, api_params, thermal_state_df)
+    if new_state_df is None:
+        logger.error("❌ Encerrando: Nenhum dado foi obtido da API.")
+        return False
+
+    update_thermal_state(thermal_state_df, new_state_df)
+
+    # Execução completa: o staging da coleta (checkpoint) não é mais necessário.
+    clear_fetch_checkpoint(api_params)
+    return True
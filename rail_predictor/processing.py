@@ -2,52 +2,132 @@
 """
 Módulo de Processamento e Modelagem.
 """
+import logging
+
 import pandas as pd
 import numpy as np
 from datetime import datetime
+from typing import Iterable, List, Optional
 
 # Importação relativa
 from .config import Config
 
+logger = logging.getLogger(__name__)
+
+# Tabela WMO (código de tempo) usada pela Open-Meteo.
+WEATHER_CODE_MAP = {
+    0: 'Céu limpo', 1: 'Principalmente limpo', 2: 'Parcialmente nublado', 3: 'Nublado',
+    45: 'Nevoeiro', 48: 'Nevoeiro com geada',
+    51: 'Garoa fraca', 53: 'Garoa moderada', 55: 'Garoa forte',
+    56: 'Garoa congelante fraca', 57: 'Garoa congelante forte',
+    61: 'Chuva fraca', 63: 'Chuva moderada', 65: 'Chuva forte',
+    66: 'Chuva congelante fraca', 67: 'Chuva congelante forte',
+    71: 'Neve fraca', 73: 'Neve moderada', 75: 'Neve forte', 77: 'Grãos de neve',
+    80: 'Pancadas de chuva fracas', 81: 'Pancadas de chuva moderadas', 82: 'Pancadas de chuva violentas',
+    85: 'Pancadas de neve fracas', 86: 'Pancadas de neve fortes',
+    95: 'Trovoada', 96: 'Trovoada com granizo fraco', 99: 'Trovoada com granizo forte'
+}
+UNCLASSIFIED_WEATHER = 'Não classificado'
+
+# Categorias de sky_condition e tabela de consulta código WMO (0-99) ->
+# posição da categoria, montadas uma única vez na importação.
+SKY_CONDITION_CATEGORIES = list(WEATHER_CODE_MAP.values()) + [UNCLASSIFIED_WEATHER]
+_UNCLASSIFIED_POSITION = len(SKY_CONDITION_CATEGORIES) - 1
+_WEATHER_CODE_LOOKUP = np.full(100, _UNCLASSIFIED_POSITION, dtype=np.int8)
+for _position, _code in enumerate(WEATHER_CODE_MAP):
+    _WEATHER_CODE_LOOKUP[_code] = _position
+
+# Passo entre linhas de cada resolução temporal (Config.TEMPORAL_RESOLUTION).
+TIMESTEPS = {
+    "hourly": pd.Timedelta(hours=1),
+    "15min": pd.Timedelta(minutes=15),
+}
+ONE_HOUR = pd.Timedelta(hours=1)
+
+
+def timestep(resolution: Optional[str] = None) -> pd.Timedelta:
+    """Passo entre linhas da resolução temporal (padrão: Config.TEMPORAL_RESOLUTION)."""
+    resolution = Config.TEMPORAL_RESOLUTION if resolution is None else resolution
+    if resolution not in TIMESTEPS:
+        raise ValueError(f"Resolução temporal desconhecida: {resolution!r} (use {', '.join(TIMESTEPS)}).")
+    return TIMESTEPS[resolution]
+
+
+def retention_for_step(retention_factor, step: pd.Timedelta = ONE_HOUR):
+    """
+    Converte o fator de retenção por hora no fator equivalente a um passo de
+    `step`: a ** (step / 1h). Aceita arrays (grade da calibração).
+    """
+    return np.power(retention_factor, step / ONE_HOUR)
+
+
 def translate_weather_code(code: int) -> str:
     """Decodifica o WMO weather code (código de tempo) em uma string legível."""
-    code_map = {
-        0: 'Céu limpo', 1: 'Principalmente limpo', 2: 'Parcialmente nublado', 3: 'Nublado',
-        45: 'Nevoeiro',
-        61: 'Chuva fraca', 63: 'Chuva moderada', 65: 'Chuva forte',
-        80: 'Pancadas de chuva fracas', 95: 'Trovoada'
-    }
-    return code_map.get(code, 'Não classificado')
+    return WEATHER_CODE_MAP.get(code, UNCLASSIFIED_WEATHER)
 
-def calculate_equilibrium_temperature_vectorized(df: pd.DataFrame) -> pd.Series:
-    """Calcula a temperatura de equilíbrio (sem inércia) de forma vetorizada."""
-    air_temp = df['temperature_celsius']
-    wind_kmh = df['wind_speed_kmh']
-    precipitation_mm = df['precipitation_mm']
-    solar_radiation = df['solar_radiation_wm2']
+def translate_weather_codes_vectorized(codes: pd.Series) -> pd.Series:
+    """
+    Versão vetorizada de `translate_weather_code` para uma coluna inteira:
+    indexa a tabela de consulta com NumPy e devolve uma Series categórica.
+    Códigos nulos, fracionários ou fora de 0-99 viram 'Não classificado'.
+    """
+    values = pd.to_numeric(codes, errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+    valid = np.isfinite(values) & (values >= 0) & (values < len(_WEATHER_CODE_LOOKUP)) & (values == np.floor(values))
+    positions = np.full(len(values), _UNCLASSIFIED_POSITION, dtype=np.int8)
+    positions[valid] = _WEATHER_CODE_LOOKUP[values[valid].astype(np.intp)]
+    return pd.Series(
+        pd.Categorical.from_codes(positions, categories=SKY_CONDITION_CATEGORIES),
+        index=codes.index
+    )
 
-    solar_adjustment = solar_radiation * Config.RADIATION_TO_CELSIUS_FACTOR
-    solar_adjustment = np.minimum(solar_adjustment, Config.SOLAR_ADJUSTMENT_CEILING) 
+def equilibrium_temperature(
+    air_temp,
+    wind_kmh,
+    precipitation_mm,
+    solar_radiation,
+    radiation_factor=None,
+    wind_factor=None,
+    rain_addition=None,
+    solar_ceiling=None
+) -> np.ndarray:
+    """
+    Fórmula da temperatura de equilíbrio sobre arrays NumPy.
+
+    Os parâmetros do modelo (padrão: valores da Config) podem ser arrays:
+    eles são combinados com as variáveis por broadcasting, o que permite
+    avaliar muitas combinações de parâmetros de uma só vez (calibração).
+    """
+    radiation_factor = Config.RADIATION_TO_CELSIUS_FACTOR if radiation_factor is None else radiation_factor
+    wind_factor = Config.WIND_ADJUSTMENT_FACTOR if wind_factor is None else wind_factor
+    rain_addition = Config.RAIN_ADDITION_CELSIUS if rain_addition is None else rain_addition
+    solar_ceiling = Config.SOLAR_ADJUSTMENT_CEILING if solar_ceiling is None else solar_ceiling
+
+    solar_adjustment = np.minimum(solar_radiation * radiation_factor, solar_ceiling)
+    wind_adjustment = wind_kmh / wind_factor
 
-    wind_adjustment = wind_kmh / Config.WIND_ADJUSTMENT_FACTOR
-    
     equilibrium_temp = (air_temp + solar_adjustment) - wind_adjustment
-    
+
     # Durante chuva, assumimos céu encoberto (sem ganho solar), mas o vento
     # continua resfriando o trilho por convecção - por isso o ajuste de vento
     # é preservado mesmo no cenário de chuva.
-    rain_equilibrium_temp = (air_temp + Config.RAIN_ADDITION_CELSIUS) - wind_adjustment
+    rain_equilibrium_temp = (air_temp + rain_addition) - wind_adjustment
 
-    final_equilibrium_temp = np.where(
-        precipitation_mm > 0, 
-        rain_equilibrium_temp, 
-        equilibrium_temp
+    return np.where(precipitation_mm > 0, rain_equilibrium_temp, equilibrium_temp)
+
+def calculate_equilibrium_temperature_vectorized(df: pd.DataFrame) -> pd.Series:
+    """Calcula a temperatura de equilíbrio (sem inércia) de forma vetorizada."""
+    final_equilibrium_temp = equilibrium_temperature(
+        df['temperature_celsius'].to_numpy(dtype=float),
+        df['wind_speed_kmh'].to_numpy(dtype=float),
+        df['precipitation_mm'].to_numpy(dtype=float),
+        df['solar_radiation_wm2'].to_numpy(dtype=float)
     )
     return pd.Series(final_equilibrium_temp, index=df.index)
 
-def apply_thermal_inertia_fast(sb_dataframe: pd.DataFrame) -> pd.Series:
+def apply_thermal_inertia_fast(sb_dataframe: pd.DataFrame, step: pd.Timedelta = ONE_HOUR) -> pd.Series:
     """Aplica o modelo de inércia térmica iterativamente sobre um grupo (SB)."""
-    new_effects_factor = 1 - Config.THERMAL_RETENTION_FACTOR
+    retention_factor = retention_for_step(Config.THERMAL_RETENTION_FACTOR, step)
+    new_effects_factor = 1 - retention_factor
     
     equilibrium_temps = sb_dataframe['equilibrium_temp'].to_numpy()
     air_temps = sb_dataframe['temperature_celsius'].to_numpy()
@@ -59,15 +139,169 @@ def apply_thermal_inertia_fast(sb_dataframe: pd.DataFrame) -> pd.Series:
         previous_rail_temp = air_temps[0] 
         for i in range(n):
             equilibrium_temp = equilibrium_temps[i]
-            current_rail_temp = (previous_rail_temp * Config.THERMAL_RETENTION_FACTOR) + \
+            current_rail_temp = (previous_rail_temp * retention_factor) + \
                                 (equilibrium_temp * new_effects_factor)
             estimated_temperatures[i] = round(current_rail_temp, 2)
             previous_rail_temp = current_rail_temp
             
     return pd.Series(estimated_temperatures, index=sb_dataframe.index)
 
-def run_processing_pipeline(df: pd.DataFrame) -> pd.DataFrame:
-    """Executa o pipeline de transformação completo nos dados meteorológicos brutos."""
+def thermal_inertia_recurrence(
+    equilibrium_temps: np.ndarray,
+    initial_temps: np.ndarray,
+    retention_factor: float = Config.THERMAL_RETENTION_FACTOR,
+    out: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Resolve T[i] = a * T[i-1] + (1 - a) * E[i] para todas as séries de uma vez.
+
+    A recorrência é avançada ao longo do eixo do tempo (último eixo), com
+    cada passo vetorizado sobre todas as séries (e quaisquer eixos extras,
+    via broadcasting). Evita a forma fechada com potências de `a`, que perde
+    precisão em janelas longas, e produz exatamente os mesmos valores do laço
+    escalar de `apply_thermal_inertia_fast` (sem o arredondamento).
+
+    Args:
+        equilibrium_temps: Array (..., n_passos) de temperaturas de equilíbrio.
+            Valores NaN após o fim de uma série (preenchimento) são ignorados.
+        initial_temps: Array (...) com o estado inicial T[-1] de cada série.
+        retention_factor: Fator de retenção `a`.
+        out: Array de saída opcional, com o shape do resultado. Pode ser o
+            próprio `equilibrium_temps` (cada passo é lido antes de ser
+            sobrescrito), o que evita uma segunda matriz SB x passo.
+
+    Returns:
+        Array com o mesmo shape de `equilibrium_temps` (broadcast com o estado
+        inicial) contendo as temperaturas estimadas.
+    """
+    equilibrium_temps = np.asarray(equilibrium_temps, dtype=float)
+    retention_factor = np.asarray(retention_factor, dtype=float)
+    new_effects_factor = 1 - retention_factor
+
+    previous = np.asarray(initial_temps, dtype=float)
+    n_steps = equilibrium_temps.shape[-1]
+    out_shape = np.broadcast_shapes(equilibrium_temps.shape, previous.shape + (n_steps,),
+                                    retention_factor.shape + (n_steps,))
+    estimated = np.empty(out_shape) if out is None else out
+    for i in range(n_steps):
+        previous = (previous * retention_factor) + (equilibrium_temps[..., i] * new_effects_factor)
+        estimated[..., i] = previous
+    return estimated
+
+
+def apply_thermal_inertia_vectorized(
+    df: pd.DataFrame,
+    initial_temps: Optional[pd.Series] = None,
+    step: pd.Timedelta = ONE_HOUR
+) -> pd.Series:
+    """
+    Aplica o modelo de inércia térmica em todos os SBs de uma só vez.
+
+    As séries (de tamanhos possivelmente diferentes) são organizadas em uma
+    matriz SB x passo, preenchida com NaN, e resolvidas por
+    `thermal_inertia_recurrence`. O DataFrame deve estar ordenado por SB e
+    datetime (as linhas de cada SB precisam ser contíguas).
+
+    Args:
+        df: DataFrame com SB, 'temperature_celsius' e 'equilibrium_temp'.
+        initial_temps: Estado inicial opcional (temperatura do trilho no passo
+            anterior à primeira linha), indexado por SB. SBs ausentes partem
+            da temperatura do ar da primeira hora (partida a frio).
+        step: Passo entre as linhas; o fator de retenção (por hora) é
+            ajustado a ele (ver `retention_for_step`).
+    """
+    n = len(df)
+    if n == 0:
+        return pd.Series(np.zeros(0), index=df.index)
+
+    codes, _ = pd.factorize(df[Config.ID_COLUMN])
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    lengths = np.diff(np.r_[starts, n])
+    rows = np.repeat(np.arange(len(starts)), lengths)
+    steps = np.arange(n) - np.repeat(starts, lengths)
+
+    equilibrium_grid = np.full((len(starts), lengths.max()), np.nan)
+    equilibrium_grid[rows, steps] = df['equilibrium_temp'].to_numpy(dtype=float)
+    cold_start_temps = df['temperature_celsius'].to_numpy(dtype=float)[starts]
+    if initial_temps is not None and not initial_temps.empty:
+        first_ids = df[Config.ID_COLUMN].to_numpy()[starts].astype(str)
+        warm_start_temps = initial_temps.reindex(first_ids).to_numpy(dtype=float)
+        cold_start_temps = np.where(np.isnan(warm_start_temps), cold_start_temps, warm_start_temps)
+
+    retention_factor = retention_for_step(Config.THERMAL_RETENTION_FACTOR, step)
+    # Resolvida no lugar: com 15 min (4x passos) a matriz é o maior consumo de memória.
+    estimated_grid = thermal_inertia_recurrence(
+        equilibrium_grid, cold_start_temps, retention_factor, out=equilibrium_grid
+    )
+    estimated = estimated_grid[rows, steps]
+    return pd.Series(np.round(estimated, 2, out=estimated), index=df.index)
+
+
+def extract_thermal_state(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Extrai o estado térmico a ser persistido: a última temperatura estimada
+    de cada dia, por SB. Uma execução futura cuja janela comece no dia
+    seguinte retoma a recorrência a partir desse valor.
+    """
+    state_columns = [Config.ID_COLUMN, 'datetime', 'estimated_rail_temp']
+    if df.empty:
+        return pd.DataFrame(columns=state_columns)
+
+    state_df = df[state_columns].copy()
+    state_df[Config.ID_COLUMN] = state_df[Config.ID_COLUMN].astype(str)
+    state_df['datetime'] = pd.to_datetime(state_df['datetime'])
+    state_df.sort_values(by=[Config.ID_COLUMN, 'datetime'], inplace=True)
+    day = state_df['datetime'].dt.normalize()
+    return state_df.groupby([state_df[Config.ID_COLUMN], day]).tail(1).reset_index(drop=True)
+
+
+def merge_thermal_state(previous_state: pd.DataFrame, new_state: pd.DataFrame) -> pd.DataFrame:
+    """Combina estados térmicos; valores novos substituem os antigos do mesmo (SB, datetime)."""
+    merged = pd.concat([previous_state, new_state], ignore_index=True)
+    if merged.empty:
+        return merged
+    merged.drop_duplicates(subset=[Config.ID_COLUMN, 'datetime'], keep='last', inplace=True)
+    merged.sort_values(by=[Config.ID_COLUMN, 'datetime'], inplace=True)
+    return merged.reset_index(drop=True)
+
+
+def lookup_initial_temps(df: pd.DataFrame, thermal_state: pd.DataFrame, step: pd.Timedelta = ONE_HOUR) -> pd.Series:
+    """
+    Para cada SB de `df`, busca no estado térmico a temperatura estimada no
+    passo imediatamente anterior à sua primeira linha. SBs sem estado
+    contíguo (primeira execução, dias sem execução) ficam de fora.
+
+    Returns:
+        Série de temperaturas iniciais indexada por SB.
+    """
+    if df.empty or thermal_state is None or thermal_state.empty:
+        return pd.Series(dtype=float)
+
+    first_times = df.groupby(df[Config.ID_COLUMN].astype(str), observed=True)['datetime'].min()
+    wanted = pd.DataFrame({
+        Config.ID_COLUMN: first_times.index,
+        'datetime': pd.to_datetime(first_times.to_numpy()) - step,
+    })
+    state = thermal_state.astype({Config.ID_COLUMN: str})
+    state['datetime'] = pd.to_datetime(state['datetime']).astype(wanted['datetime'].dtype)
+    matched = wanted.merge(state, on=[Config.ID_COLUMN, 'datetime'], how='inner')
+    return matched.set_index(Config.ID_COLUMN)['estimated_rail_temp']
+
+
+def run_processing_pipeline(
+    df: pd.DataFrame,
+    thermal_state: Optional[pd.DataFrame] = None,
+    step: Optional[pd.Timedelta] = None
+) -> pd.DataFrame:
+    """
+    Executa o pipeline de transformação completo nos dados meteorológicos brutos.
+
+    Se `thermal_state` for informado (ver `extract_thermal_state`), a inércia
+    de cada SB continua a partir do estado da execução anterior em vez de
+    partir da temperatura do ar da primeira hora. `step` é o passo entre as
+    linhas (padrão: o de Config.TEMPORAL_RESOLUTION).
+    """
+    step = timestep() if step is None else step
     df.rename(columns={
         'time': 'datetime', 
         'temperature_2m': 'temperature_celsius', 
@@ -84,14 +318,16 @@ def run_processing_pipeline(df: pd.DataFrame) -> pd.DataFrame:
 
     df.reset_index(drop=True, inplace=True)
 
-    print("Calculando temperaturas de equilíbrio (vetorizado)...")
+    logger.info("Calculando temperaturas de equilíbrio (vetorizado)...")
     df['equilibrium_temp'] = calculate_equilibrium_temperature_vectorized(df)
 
-    print("Aplicando modelo de inércia térmica (otimizado)...")
-    estimations = df.groupby(Config.ID_COLUMN, group_keys=False).apply(apply_thermal_inertia_fast)
-    df['estimated_rail_temp'] = estimations.values
+    logger.info("Aplicando modelo de inércia térmica (vetorizado)...")
+    initial_temps = lookup_initial_temps(df, thermal_state, step)
+    if not initial_temps.empty:
+        logger.info(f"♻️ Estado térmico retomado para {len(initial_temps)} SBs.")
+    df['estimated_rail_temp'] = apply_thermal_inertia_vectorized(df, initial_temps, step)
     
-    df['sky_condition'] = df['weather_code'].apply(translate_weather_code)
+    df['sky_condition'] = translate_weather_codes_vectorized(df['weather_code'])
 
     ordered_columns = [
         Config.ID_COLUMN, 'datetime', Config.LAT_COLUMN, Config.LON_COLUMN,
@@ -100,14 +336,34 @@ def run_processing_pipeline(df: pd.DataFrame) -> pd.DataFrame:
     ]
     
     final_columns = [col for col in ordered_columns if col in df.columns]
-    return df[final_columns]
+    # Monta a saída com as próprias colunas, sem copiá-las: `df[colunas]`
+    # duplicaria o frame inteiro no pico de memória (4x maior em 15 min).
+    return pd.DataFrame({col: df[col] for col in final_columns}, copy=False)
+
+
+def rolling_window_bounds(
+    reference_date=None,
+    days_past: int = Config.ROLLING_WINDOW_DAYS_PAST,
+    days_future: int = Config.ROLLING_WINDOW_DAYS_FUTURE
+):
+    """Retorna as datas (início, fim), inclusivas, da janela [D-days_past, D+days_future]."""
+    if reference_date is None:
+        reference_date = datetime.now()
+
+    reference_date = pd.Timestamp(reference_date).normalize()
+
+    start_date = (reference_date - pd.Timedelta(days=days_past)).date()
+    end_date = (reference_date + pd.Timedelta(days=days_future)).date()
+    return start_date, end_date
 
 
 def apply_rolling_window(
     df: pd.DataFrame,
     reference_date=None,
     days_past: int = Config.ROLLING_WINDOW_DAYS_PAST,
-    days_future: int = Config.ROLLING_WINDOW_DAYS_FUTURE
+    days_future: int = Config.ROLLING_WINDOW_DAYS_FUTURE,
+    sbs: Optional[Iterable[str]] = None,
+    columns: Optional[List[str]] = None
 ) -> pd.DataFrame:
     """
     Filtra o DataFrame para manter apenas a janela móvel de datas
@@ -122,6 +378,8 @@ def apply_rolling_window(
         reference_date: Data de referência (D0). Se None, usa a data atual.
         days_past: Quantos dias no passado manter (D-N).
         days_future: Quantos dias no futuro manter (D+N).
+        sbs: Se informado, mantém apenas esses SBs.
+        columns: Se informado, mantém apenas essas colunas.
 
     Returns:
         DataFrame filtrado, contendo apenas as linhas dentro da janela.
@@ -129,24 +387,101 @@ def apply_rolling_window(
     if df.empty:
         return df
 
-    if reference_date is None:
-        reference_date = datetime.now()
+    start_date, end_date = rolling_window_bounds(reference_date, days_past, days_future)
 
-    reference_date = pd.Timestamp(reference_date).normalize()
+    # Compara timestamps diretamente (vetorizado), sem criar um objeto
+    # `date` do Python por linha.
+    row_times = pd.to_datetime(df['datetime'])
+    window_start = pd.Timestamp(start_date)
+    window_end = pd.Timestamp(end_date) + pd.Timedelta(days=1)
+    if row_times.dt.tz is not None:
+        window_start = window_start.tz_localize(row_times.dt.tz)
+        window_end = window_end.tz_localize(row_times.dt.tz)
+    mask = (row_times >= window_start) & (row_times < window_end)
 
-    start_date = (reference_date - pd.Timedelta(days=days_past)).date()
-    end_date = (reference_date + pd.Timedelta(days=days_future)).date()
+    if sbs is not None:
+        mask &= df[Config.ID_COLUMN].astype(str).isin({str(sb) for sb in sbs})
 
-    row_dates = pd.to_datetime(df['datetime']).dt.date
-    mask = (row_dates >= start_date) & (row_dates <= end_date)
-
-    filtered_df = df.loc[mask].copy()
+    filtered_df = df.loc[mask, columns].copy() if columns is not None else df.loc[mask].copy()
 
     removed = len(df) - len(filtered_df)
     if removed > 0:
-        print(
+        logger.info(
             f"🧹 Janela móvel aplicada [{start_date} a {end_date}]: "
             f"{removed} linhas fora da janela foram descartadas."
         )
 
-    return filtered_df
\ No newline at end of file
+    return filtered_df
+
+
+def exceedance_column(threshold: float) -> str:
+    """Nome da coluna de horas acima de um limiar (ex.: 47.5 -> 'hours_above_47_5c')."""
+    return f"hours_above_{threshold:g}c".replace('.', '_').replace('-', 'minus_')
+
+
+def build_daily_summary(
+    df: pd.DataFrame,
+    thresholds: Optional[Iterable[float]] = None,
+    step: Optional[pd.Timedelta] = None
+) -> pd.DataFrame:
+    """
+    Resumo diário por SB da temperatura estimada do trilho, para BI e alertas.
+
+    Tudo é calculado em um único groupby por (SB, dia): os indicadores de
+    excedência são colunas booleanas somadas na mesma agregação e a hora do
+    pico vem do `idxmax` da temperatura.
+
+    Args:
+        df: Saída do pipeline (SB, 'datetime', 'estimated_rail_temp').
+        thresholds: Limiares de flambagem em °C (padrão:
+            Config.HEAT_BUCKLING_THRESHOLDS).
+        step: Passo entre as linhas (padrão: o de Config.TEMPORAL_RESOLUTION);
+            as contagens de linhas viram horas (ex.: 4 linhas de 15 min = 1 h).
+
+    Returns:
+        DataFrame com SB, 'date', 'min_rail_temp', 'max_rail_temp',
+        'mean_rail_temp', 'peak_hour', 'hours_with_data' e uma coluna
+        'hours_above_<limiar>c' por limiar.
+    """
+    thresholds = Config.HEAT_BUCKLING_THRESHOLDS if thresholds is None else thresholds
+    step = timestep() if step is None else step
+    if df.empty:
+        return pd.DataFrame()
+
+    temps = df['estimated_rail_temp'].to_numpy(dtype=float)
+    row_times = pd.to_datetime(df['datetime'])
+    valid = ~np.isnan(temps)
+    temps = temps[valid]
+    exceedance = {exceedance_column(threshold): temps > threshold for threshold in thresholds}
+    # Agrupa por códigos inteiros do SB (ordenados), não pelas strings.
+    sb_codes, sb_labels = pd.factorize(df[Config.ID_COLUMN].astype(str), sort=True)
+    work = pd.DataFrame({
+        'sb_code': sb_codes[valid],
+        'date': row_times.dt.normalize().to_numpy()[valid],
+        'temp': temps,
+        **exceedance,
+    })
+
+    summary = work.groupby(['sb_code', 'date'], sort=True).agg(
+        min_rail_temp=('temp', 'min'),
+        max_rail_temp=('temp', 'max'),
+        mean_rail_temp=('temp', 'mean'),
+        peak_row=('temp', 'idxmax'),
+        hours_with_data=('temp', 'count'),
+        **{column: (column, 'sum') for column in exceedance},
+    ).reset_index()
+
+    # `work` tem índice posicional: o rótulo do idxmax é a linha do pico.
+    peak_hours = row_times.dt.hour.to_numpy()[valid]
+    summary.insert(0, Config.ID_COLUMN, np.asarray(sb_labels, dtype=object)[summary.pop('sb_code').to_numpy()])
+    summary.insert(5, 'peak_hour', peak_hours[summary.pop('peak_row').to_numpy()].astype(np.int8))
+    summary['mean_rail_temp'] = summary['mean_rail_temp'].round(2)
+
+    # Em resolução horária as horas são contagens inteiras; em passos menores,
+    # múltiplos do passo (ex.: 2.75 h em 15 min).
+    hour_columns = ['hours_with_data'] + list(exceedance)
+    step_hours = step / ONE_HOUR
+    if step_hours == 1:
+        return summary.astype({column: np.int16 for column in hour_columns})
+    summary[hour_columns] = (summary[hour_columns] * step_hours).astype(np.float32)
+    return summary
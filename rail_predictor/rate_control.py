@@ -0,0 +1,155 @@
+# rail_predictor/rate_control.py
+"""
+Módulo de Controle Adaptativo de Taxa (AIMD).
+
+Em vez de um limite fixo de chamadas por segundo, o controlador aumenta a
+taxa aos poucos (aumento aditivo) enquanto as respostas chegam saudáveis e
+rápidas, e a corta pela metade (redução multiplicativa) ao receber 429/5xx
+ou um cabeçalho Retry-After, respeitando a pausa pedida pelo servidor.
+"""
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+from .config import Config
+
+THROTTLE_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Converte o cabeçalho Retry-After (segundos ou data HTTP) em segundos."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class AimdRateController:
+    """
+    Controlador AIMD da taxa de requisições (thread-safe, sem esperas).
+
+    Args:
+        initial_rate: Taxa inicial (req/s).
+        min_rate / max_rate: Limites da taxa.
+        increase: Req/s somados a cada segundo de tráfego saudável (cada
+            resposta saudável soma `increase / taxa_atual`).
+        decrease_factor: Fator aplicado à taxa em cada sinal de sobrecarga.
+        latency_target: Latência (s) acima da qual a taxa para de subir.
+        cooldown: Intervalo mínimo (s) entre duas reduções, para que as
+            respostas já em voo de uma mesma rajada não cortem a taxa várias vezes.
+    """
+
+    def __init__(
+        self,
+        initial_rate: float,
+        min_rate: float = 1.0,
+        max_rate: float = 50.0,
+        increase: float = 1.0,
+        decrease_factor: float = 0.5,
+        latency_target: float = 2.0,
+        cooldown: float = 1.0
+    ):
+        self.min_rate = float(min_rate)
+        self.max_rate = float(max_rate)
+        self.increase = float(increase)
+        self.decrease_factor = float(decrease_factor)
+        self.latency_target = float(latency_target)
+        self.cooldown = float(cooldown)
+        self._rate = min(self.max_rate, max(self.min_rate, float(initial_rate)))
+        self._blocked_until = 0.0
+        self._last_decrease = float('-inf')
+        self._lock = threading.Lock()
+        self._started_at = time.monotonic()
+        self.stats = {
+            'responses': 0, 'throttled': 0, 'errors': 0,
+            'min_rate': self._rate, 'max_rate': self._rate,
+        }
+
+    @property
+    def rate(self) -> float:
+        return self._rate
+
+    def wait_time(self) -> float:
+        """Segundos restantes de uma pausa pedida via Retry-After."""
+        return max(0.0, self._blocked_until - time.monotonic())
+
+    def on_response(self, status_code: int, latency: float, retry_after: Optional[float] = None):
+        """Registra uma resposta HTTP e ajusta a taxa."""
+        with self._lock:
+            self.stats['responses'] += 1
+            if status_code in THROTTLE_STATUS_CODES or retry_after is not None:
+                self.stats['throttled'] += 1
+                if retry_after is not None:
+                    self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+                self._decrease()
+            elif latency <= self.latency_target:
+                self._set_rate(self._rate + self.increase / self._rate)
+
+    def on_error(self):
+        """Registra uma falha de transporte (timeout, conexão recusada...)."""
+        with self._lock:
+            self.stats['errors'] += 1
+            self._decrease()
+
+    def _decrease(self):
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        self._set_rate(self._rate * self.decrease_factor)
+
+    def _set_rate(self, rate: float):
+        self._rate = min(self.max_rate, max(self.min_rate, rate))
+        self.stats['min_rate'] = min(self.stats['min_rate'], self._rate)
+        self.stats['max_rate'] = max(self.stats['max_rate'], self._rate)
+
+    def achieved_rate(self) -> float:
+        elapsed = time.monotonic() - self._started_at
+        return self.stats['responses'] / elapsed if elapsed > 0 else 0.0
+
+    def summary(self) -> str:
+        """Resumo da execução para o log."""
+        return (f"📈 Taxa adaptativa: {self.achieved_rate():.1f} req/s alcançados; "
+                f"limite final {self._rate:.1f} req/s (mín. {self.stats['min_rate']:.1f}, "
+                f"máx. {self.stats['max_rate']:.1f}); {self.stats['throttled']} respostas 429/5xx, "
+                f"{self.stats['errors']} falhas de conexão.")
+
+
+class AdaptiveRateLimiter:
+    """Limitador síncrono (threads) que espaça as requisições pela taxa do controlador."""
+
+    def __init__(self, controller: AimdRateController):
+        self.controller = controller
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Reserva o próximo intervalo livre e dorme (fora do lock) até ele."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now + self.controller.wait_time(), self._next_slot)
+            self._next_slot = slot + 1.0 / self.controller.rate
+        delay = slot - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def create_rate_controller() -> Optional[AimdRateController]:
+    """Cria o controlador AIMD se Config.API_RATE_CONTROL == "adaptive"."""
+    if Config.API_RATE_CONTROL != "adaptive":
+        return None
+    return AimdRateController(
+        initial_rate=Config.API_RATE_LIMIT_CALLS / Config.API_RATE_LIMIT_PERIOD,
+        min_rate=Config.API_ADAPTIVE_MIN_RATE,
+        max_rate=Config.API_ADAPTIVE_MAX_RATE,
+        increase=Config.API_ADAPTIVE_INCREASE,
+        decrease_factor=Config.API_ADAPTIVE_DECREASE_FACTOR,
+        latency_target=Config.API_ADAPTIVE_LATENCY_TARGET,
+    )
@@ -0,0 +1,237 @@
+# rail_predictor/response_cache.py
+"""
+Módulo de Cache de Respostas da API.
+
+Guarda, em um arquivo SQLite local, o resultado da Open-Meteo de cada ponto
+(chave = coordenada + demais parâmetros), com validade (TTL) configurável e
+descarte LRU por tamanho. O `CachingHTTPAdapter` encaixa o cache na sessão
+do `requests`: requisições multi-coordenada são reescritas para pedir à API
+apenas os pontos ausentes, e a resposta é remontada na ordem original.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .config import Config
+
+COORDINATE_PARAMS = ('latitude', 'longitude')
+
+
+class ResponseCache:
+    """
+    Cache persistente (SQLite) de resultados por ponto.
+
+    Args:
+        path: Arquivo SQLite.
+        ttl_seconds: Idade máxima de uma entrada considerada válida.
+        max_bytes: Tamanho máximo somado das respostas; ao exceder, as
+            entradas acessadas há mais tempo são descartadas (LRU).
+    """
+
+    def __init__(self, path: str, ttl_seconds: float = 3600, max_bytes: int = 200 * 1024 * 1024):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.stats = {'hits': 0, 'misses': 0, 'revalidated': 0, 'stored': 0, 'evicted': 0}
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, body TEXT NOT NULL, size INTEGER NOT NULL,"
+            " etag TEXT, last_modified TEXT,"
+            " stored_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(base_url: str, params: Dict[str, Any], latitude: Any, longitude: Any) -> str:
+        """Chave de um ponto: URL base + parâmetros (exceto coordenadas) + coordenada."""
+        other_params = sorted((k, str(v)) for k, v in params.items() if k not in COORDINATE_PARAMS)
+        raw = json.dumps([base_url, other_params, str(latitude), str(longitude)])
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Retorna a entrada (com 'result', 'fresh', 'etag', 'last_modified') ou
+        None. Entradas vencidas continuam disponíveis para revalidação.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, etag, last_modified, stored_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        body, etag, last_modified, stored_at = row
+        return {
+            'result': json.loads(body),
+            'fresh': (time.time() - stored_at) <= self.ttl_seconds,
+            'etag': etag,
+            'last_modified': last_modified,
+        }
+
+    def store(self, key: str, result: Any, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        body = json.dumps(result)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, body, len(body), etag, last_modified, now, now)
+            )
+            self.stats['stored'] += 1
+            self._evict()
+            self._conn.commit()
+
+    def touch(self, key: str):
+        """Renova a validade de uma entrada revalidada (HTTP 304)."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("UPDATE responses SET stored_at = ?, accessed_at = ? WHERE key = ?", (now, now, key))
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT key, size FROM responses ORDER BY accessed_at ASC").fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            self.stats['evicted'] += 1
+
+    def record(self, hits: int = 0, misses: int = 0, revalidated: int = 0):
+        with self._lock:
+            self.stats['hits'] += hits
+            self.stats['misses'] += misses
+            self.stats['revalidated'] += revalidated
+
+    def summary(self) -> str:
+        """Resumo das métricas para o log da execução."""
+        lookups = self.stats['hits'] + self.stats['misses']
+        hit_rate = (100.0 * self.stats['hits'] / lookups) if lookups else 0.0
+        return (f"💾 Cache de respostas: {self.stats['hits']} acertos, {self.stats['misses']} faltas "
+                f"({hit_rate:.1f}% de acerto), {self.stats['revalidated']} revalidados, "
+                f"{self.stats['evicted']} descartados.")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def create_response_cache() -> Optional[ResponseCache]:
+    """Cria o cache conforme Config (None se desativado)."""
+    if not Config.API_CACHE_ENABLED:
+        return None
+    return ResponseCache(Config.API_CACHE_FILE, Config.API_CACHE_TTL_SECONDS, Config.API_CACHE_MAX_BYTES)
+
+
+def _split_coordinates(params: List[Tuple[str, str]]) -> Tuple[List[str], List[str], Dict[str, str]]:
+    values = dict(params)
+    latitudes = values.get('latitude', '').split(',')
+    longitudes = values.get('longitude', '').split(',')
+    other = {k: v for k, v in params if k not in COORDINATE_PARAMS}
+    return latitudes, longitudes, other
+
+
+def _json_response(request: requests.PreparedRequest, payload: Any, cache_status: str) -> requests.Response:
+    response = requests.Response()
+    response.status_code = 200
+    response._content = json.dumps(payload).encode('utf-8')
+    response.encoding = 'utf-8'
+    response.headers['Content-Type'] = 'application/json'
+    response.headers['X-Cache'] = cache_status
+    response.url = request.url
+    response.request = request
+    return response
+
+
+class CachingHTTPAdapter(HTTPAdapter):
+    """
+    HTTPAdapter que consulta o `ResponseCache` antes de ir à rede (somente
+    GETs com latitude/longitude). Pontos válidos no cache não são pedidos à
+    API; uma entrada vencida com ETag/Last-Modified, pedida sozinha, é
+    revalidada com uma requisição condicional (HTTP 304 reaproveita o corpo).
+    """
+
+    def __init__(self, cache: ResponseCache, **kwargs):
+        super().__init__(**kwargs)
+        self.cache = cache
+
+    def send(self, request, **kwargs):
+        parts = urlsplit(request.url)
+        params = parse_qsl(parts.query, keep_blank_values=True)
+        if request.method != 'GET' or 'latitude' not in dict(params):
+            return super().send(request, **kwargs)
+
+        latitudes, longitudes, other = _split_coordinates(params)
+        base_url = urlunsplit((parts.scheme, parts.netloc, parts.path, '', ''))
+        keys = [ResponseCache.make_key(base_url, other, lat, lon) for lat, lon in zip(latitudes, longitudes)]
+
+        results: List[Any] = [None] * len(keys)
+        stale_entries = {}
+        for i, key in enumerate(keys):
+            entry = self.cache.lookup(key)
+            if entry is not None and entry['fresh']:
+                results[i] = entry['result']
+            elif entry is not None:
+                stale_entries[i] = entry
+        missing = [i for i, result in enumerate(results) if result is None]
+        self.cache.record(hits=len(keys) - len(missing), misses=len(missing))
+
+        if not missing:
+            return _json_response(request, results if len(results) > 1 else results[0], 'HIT')
+
+        forwarded = request.copy()
+        forwarded.url = urlunsplit(parts._replace(query=urlencode(list(other.items()) + [
+            ('latitude', ','.join(latitudes[i] for i in missing)),
+            ('longitude', ','.join(longitudes[i] for i in missing)),
+        ])))
+        if len(missing) == 1 and missing[0] in stale_entries:
+            entry = stale_entries[missing[0]]
+            if entry['etag']:
+                forwarded.headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                forwarded.headers['If-Modified-Since'] = entry['last_modified']
+
+        response = super().send(forwarded, **kwargs)
+
+        if response.status_code == 304 and len(missing) == 1 and missing[0] in stale_entries:
+            self.cache.touch(keys[missing[0]])
+            self.cache.record(revalidated=1)
+            results[missing[0]] = stale_entries[missing[0]]['result']
+        elif response.status_code == 200:
+            try:
+                payload = response.json()
+            except ValueError:
+                return response
+            fetched = payload if isinstance(payload, list) else [payload]
+            if len(fetched) != len(missing):
+                return response
+            single = len(missing) == 1
+            for i, result in zip(missing, fetched):
+                # Validadores HTTP só identificam a resposta de um único ponto.
+                self.cache.store(
+                    keys[i], result,
+                    etag=response.headers.get('ETag') if single else None,
+                    last_modified=response.headers.get('Last-Modified') if single else None,
+                )
+                results[i] = result
+        else:
+            return response
+
+        return _json_response(request, results if len(results) > 1 else results[0], 'MISS')
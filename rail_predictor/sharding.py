@@ -0,0 +1,196 @@
+# rail_predictor/sharding.py
+"""
+Módulo de Processamento Particionado (multi-processo).
+
+Divide os dados brutos da coleta em shards disjuntos de SBs (pela Sub do
+coordenadas.json ou por hash do SB), executa `run_processing_pipeline` em
+cada shard em um pool de processos e junta os resultados ordenados por SB e
+datetime. Como a inércia térmica só depende da série de cada SB, o
+resultado é idêntico ao do processamento em um único processo.
+
+Os shards não são serializados com pickle: cada um é gravado como arquivo
+Arrow IPC em um diretório temporário e lido pelo worker via memory-map
+(sem cópia), e o resultado volta pelo mesmo caminho.
+"""
+import logging
+import os
+import tempfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from .config import Config
+from .processing import run_processing_pipeline, timestep
+
+logger = logging.getLogger(__name__)
+
+
+def stable_hash(values: np.ndarray) -> np.ndarray:
+    """Hash CRC32 de cada valor (estável entre processos e execuções, ao contrário de `hash`)."""
+    return np.fromiter((zlib.crc32(str(v).encode('utf-8')) for v in values), dtype=np.uint64, count=len(values))
+
+
+def shards_by_sb(
+    df: pd.DataFrame,
+    n_shards: int,
+    by: str = "sb_hash",
+    locations_df: Optional[pd.DataFrame] = None
+):
+    """
+    Decide o shard de cada SB distinto de `df`.
+
+    Args:
+        by: "sb_hash" espalha os SBs pelo hash do código; "sub" mantém cada
+            Sub inteira em um shard, distribuindo as Subs pelo número de
+            linhas (maior primeiro, no shard mais vazio) para equilibrar a carga.
+        locations_df: Necessário com by="sub" (colunas SB e Sub).
+
+    Returns:
+        (código do SB por linha, SBs distintos, shard de cada SB distinto).
+    """
+    # Fatoriza a coluna original (categórica, em geral) e só converte os
+    # valores distintos para texto.
+    sb_codes, sb_values = pd.factorize(df[Config.ID_COLUMN])
+    sb_values = np.asarray(sb_values).astype(str)
+    if by == "sb_hash":
+        return sb_codes, sb_values, (stable_hash(sb_values) % n_shards).astype(np.int32)
+
+    if by != "sub":
+        raise ValueError(f"Modo de particionamento desconhecido: {by!r} (use 'sb_hash' ou 'sub').")
+    if locations_df is None or 'Sub' not in locations_df.columns:
+        raise ValueError("O particionamento por Sub exige a coluna 'Sub' em locations_df.")
+
+    sub_by_sb = locations_df.assign(**{Config.ID_COLUMN: locations_df[Config.ID_COLUMN].astype(str)}) \
+        .set_index(Config.ID_COLUMN)['Sub']
+    sub_codes, sub_values = pd.factorize(pd.Series(sb_values).map(sub_by_sb).fillna('N/A'))
+    rows_per_sub = np.bincount(sub_codes[sb_codes], minlength=len(sub_values))
+
+    shard_of_sub = np.empty(len(sub_values), dtype=np.int32)
+    shard_rows = np.zeros(n_shards, dtype=np.int64)
+    for sub in np.argsort(-rows_per_sub, kind='stable'):
+        target = int(np.argmin(shard_rows))
+        shard_of_sub[sub] = target
+        shard_rows[target] += rows_per_sub[sub]
+    return sb_codes, sb_values, shard_of_sub[sub_codes]
+
+
+def assign_shards(
+    df: pd.DataFrame,
+    n_shards: int,
+    by: str = "sb_hash",
+    locations_df: Optional[pd.DataFrame] = None
+) -> np.ndarray:
+    """Retorna o shard (0..n_shards-1) de cada linha de `df` (ver `shards_by_sb`)."""
+    sb_codes, _, shard_of_sb = shards_by_sb(df, n_shards, by, locations_df)
+    return shard_of_sb[sb_codes]
+
+
+def write_ipc(table: pa.Table, path: str):
+    with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+
+
+def read_ipc(path: str) -> pa.Table:
+    """Lê um arquivo Arrow IPC via memory-map (os buffers apontam para o arquivo)."""
+    with pa.memory_map(path, 'r') as source:
+        return pa.ipc.open_file(source).read_all()
+
+
+def process_shard(
+    input_path: str,
+    output_path: str,
+    thermal_state: Optional[pd.DataFrame] = None,
+    step: Optional[pd.Timedelta] = None
+) -> str:
+    """Worker: processa um shard lido de `input_path` e grava o resultado em `output_path`."""
+    shard_df = read_ipc(input_path).to_pandas()
+    processed_df = run_processing_pipeline(shard_df, thermal_state=thermal_state, step=step)
+    write_ipc(pa.Table.from_pandas(processed_df, preserve_index=False), output_path)
+    return output_path
+
+
+def merge_shards(tables: List[pa.Table]) -> pd.DataFrame:
+    """
+    Junta os resultados dos shards em um único DataFrame ordenado por SB e
+    datetime. Cada shard já vem ordenado e os SBs não se repetem entre
+    shards, então basta uma ordenação estável pelo SB.
+    """
+    tables = [table for table in tables if table.num_rows > 0]
+    if not tables:
+        return pd.DataFrame()
+    merged_df = pa.concat_tables(tables).to_pandas()
+    sb = merged_df[Config.ID_COLUMN]
+    if not isinstance(sb.dtype, pd.CategoricalDtype):
+        merged_df.sort_values(by=[Config.ID_COLUMN, 'datetime'], inplace=True, kind='stable')
+        return merged_df.reset_index(drop=True)
+
+    # Os dicionários dos shards são unificados na ordem de chegada;
+    # reordena para que ordenar pelo código seja ordenar pelo SB.
+    sb = sb.cat.reorder_categories(sorted(sb.cat.categories))
+    merged_df[Config.ID_COLUMN] = sb
+    order = np.argsort(sb.cat.codes.to_numpy(), kind='stable')
+    return merged_df.take(order).reset_index(drop=True)
+
+
+def run_processing_pipeline_sharded(
+    df: pd.DataFrame,
+    thermal_state: Optional[pd.DataFrame] = None,
+    locations_df: Optional[pd.DataFrame] = None,
+    workers: Optional[int] = None,
+    shard_by: Optional[str] = None,
+    step: Optional[pd.Timedelta] = None
+) -> pd.DataFrame:
+    """
+    Versão multi-processo de `run_processing_pipeline` (mesmo resultado).
+
+    Args:
+        df: Dados brutos da coleta.
+        thermal_state: Estado térmico da execução anterior (cada shard
+            recebe apenas as linhas dos seus SBs).
+        locations_df: Locais (com 'Sub'), necessário para shard_by="sub".
+        workers: Processos no pool (padrão: Config.PROCESSING_WORKERS ou
+            o número de CPUs). Também é o número de shards.
+        shard_by: "sb_hash" ou "sub" (padrão: Config.PROCESSING_SHARD_BY).
+        step: Passo entre as linhas (padrão: o de Config.TEMPORAL_RESOLUTION).
+            Resolvido aqui: os workers ("spawn") não veem alterações da Config.
+    """
+    workers = workers or Config.PROCESSING_WORKERS or os.cpu_count() or 1
+    shard_by = shard_by or Config.PROCESSING_SHARD_BY
+    step = timestep() if step is None else step
+    if df.empty or workers == 1:
+        return run_processing_pipeline(df, thermal_state=thermal_state, step=step)
+
+    sb_codes, sb_values, shard_of_sb = shards_by_sb(df, workers, shard_by, locations_df)
+    shard_ids = shard_of_sb[sb_codes]
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    order = np.argsort(shard_ids, kind='stable')
+    bounds = np.searchsorted(shard_ids[order], np.arange(workers + 1))
+
+    with tempfile.TemporaryDirectory(prefix="rail_shards_") as workdir:
+        jobs = []
+        for shard in range(workers):
+            rows = order[bounds[shard]:bounds[shard + 1]]
+            if len(rows) == 0:
+                continue
+            shard_table = table.take(pa.array(rows))
+            input_path = os.path.join(workdir, f"shard-{shard}.arrow")
+            write_ipc(shard_table, input_path)
+
+            shard_state = None
+            if thermal_state is not None and not thermal_state.empty:
+                shard_sbs = sb_values[shard_of_sb == shard]
+                shard_state = thermal_state[thermal_state[Config.ID_COLUMN].astype(str).isin(shard_sbs)]
+            jobs.append((input_path, os.path.join(workdir, f"result-{shard}.arrow"), shard_state, step))
+
+        logger.info(f"🧩 Processando {len(df)} linhas em {len(jobs)} shards ({shard_by}) com {workers} processos...")
+        # "spawn": os workers não herdam as threads/sockets do processo pai.
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), mp_context=get_context("spawn")) as executor:
+            result_paths = list(executor.map(process_shard, *zip(*jobs)))
+
+        # Os arquivos são lidos por memory-map: materializa antes de apagar o diretório.
+        return merge_shards([read_ipc(path) for path in result_paths])
@@ -0,0 +1,225 @@
+# rail_predictor/spatial.py
+"""
+Módulo de Interpolação Espacial (API_SPATIAL_MODE = "grid").
+
+SBs vizinhos ao longo da via costumam cair na mesma célula do modelo
+meteorológico. Neste modo os SBs são encaixados em uma grade regular
+(Config.SPATIAL_GRID_RESOLUTION graus), apenas os nós da grade usados são
+buscados na API e as variáveis horárias de cada SB são interpoladas a partir
+dos nós vizinhos com pesos pré-calculados.
+
+Os pesos formam uma matriz esparsa (SBs x nós) guardada no formato ELL: para
+cada SB, os índices de até k nós vizinhos e o peso de cada um.
+"""
+import logging
+from typing import Any, Dict
+
+import numpy as np
+import pandas as pd
+
+from .config import Config
+from .api_client import (
+    HourlyColumnBuffer, expected_rows_per_location, fetch_weather_data_parallel, make_collector, requested_variables
+)
+from . import instrumentation
+
+logger = logging.getLogger(__name__)
+
+INTERPOLATION_METHODS = ("bilinear", "idw", "nearest")
+# Variáveis categóricas (códigos WMO): usam o valor do nó de maior peso em
+# vez da média ponderada.
+DISCRETE_VARIABLES = ('weather_code',)
+KM_PER_DEGREE = 111.195
+
+
+class GridInterpolation:
+    """
+    Nós da grade a buscar e pesos de interpolação de cada SB.
+
+    Attributes:
+        locations_df: Os SBs interpolados (mesma ordem das linhas dos pesos).
+        nodes_df: Nós usados, com ID ('grid_<lat>_<lon>'), latitude e longitude.
+        node_index: (n_sbs, k) índices em `nodes_df`.
+        weights: (n_sbs, k) pesos (cada linha soma 1; 0 = vizinho ignorado).
+    """
+
+    def __init__(self, locations_df: pd.DataFrame, nodes_df: pd.DataFrame, node_index: np.ndarray, weights: np.ndarray):
+        self.locations_df = locations_df.reset_index(drop=True)
+        self.nodes_df = nodes_df
+        self.node_index = node_index
+        self.weights = weights
+
+    def to_coo(self):
+        """Matriz de pesos como tripla COO (linhas, colunas, valores), sem os zeros."""
+        rows = np.repeat(np.arange(len(self.weights)), self.weights.shape[1])
+        nonzero = self.weights.ravel() > 0
+        return rows[nonzero], self.node_index.ravel()[nonzero], self.weights.ravel()[nonzero]
+
+    def interpolate(self, node_values: np.ndarray, discrete: bool = False) -> np.ndarray:
+        """
+        Interpola valores dos nós, (n_nodes, T), para os SBs, (n_sbs, T).
+
+        Nós sem valor (NaN) são ignorados e os pesos restantes renormalizados;
+        SBs sem nenhum vizinho com valor ficam NaN.
+        """
+        neighbor_values = node_values[self.node_index]  # (n_sbs, k, T)
+        available = ~np.isnan(neighbor_values)
+        weights = self.weights[:, :, None] * available
+        if discrete:
+            best = np.argmax(weights, axis=1)  # (n_sbs, T)
+            result = np.take_along_axis(neighbor_values, best[:, None, :], axis=1)[:, 0, :]
+            return np.where(weights.sum(axis=1) > 0, result, np.nan)
+
+        total = weights.sum(axis=1)
+        weighted = (weights * np.nan_to_num(neighbor_values)).sum(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(total > 0, weighted / np.where(total > 0, total, 1), np.nan)
+
+
+def _distance_km(lat_a: np.ndarray, lon_a: np.ndarray, lat_b: np.ndarray, lon_b: np.ndarray) -> np.ndarray:
+    """Distância aproximada (equiretangular), suficiente para poucos km."""
+    dy = (lat_b - lat_a) * KM_PER_DEGREE
+    dx = (lon_b - lon_a) * KM_PER_DEGREE * np.cos(np.radians(lat_a))
+    return np.hypot(dy, dx)
+
+
+def _bilinear_weights(y: np.ndarray, x: np.ndarray):
+    """Os 4 cantos da célula de cada SB (índices i, j da grade) e os pesos bilineares."""
+    i0, j0 = np.floor(y).astype(np.int64), np.floor(x).astype(np.int64)
+    fy, fx = y - i0, x - j0
+    corner_i = np.stack([i0, i0 + 1, i0, i0 + 1], axis=1)
+    corner_j = np.stack([j0, j0, j0 + 1, j0 + 1], axis=1)
+    weights = np.stack([(1 - fy) * (1 - fx), fy * (1 - fx), (1 - fy) * fx, fy * fx], axis=1)
+    return corner_i, corner_j, weights
+
+
+def _snapped_weights(y: np.ndarray, x: np.ndarray, resolution: float, method: str, neighbors: int, power: float):
+    """
+    Encaixa cada SB no nó mais próximo; os nós distintos assim obtidos são
+    os únicos buscados. "nearest" usa só o próprio nó; "idw" pondera os
+    `neighbors` nós buscados mais próximos entre os 3x3 ao redor dele.
+    """
+    own_i, own_j = np.rint(y).astype(np.int64), np.rint(x).astype(np.int64)
+    if method == "nearest":
+        return own_i[:, None], own_j[:, None], np.ones((len(y), 1))
+
+    offsets = np.array([(di, dj) for di in (-1, 0, 1) for dj in (-1, 0, 1)])
+    candidate_i = own_i[:, None] + offsets[:, 0]
+    candidate_j = own_j[:, None] + offsets[:, 1]
+    # Só os nós que algum SB ocupa existem (não buscamos nós vazios).
+    own_keys = np.unique(np.stack([own_i, own_j], axis=1), axis=0)
+    exists = (
+        pd.MultiIndex.from_arrays([candidate_i.ravel(), candidate_j.ravel()])
+        .isin(pd.MultiIndex.from_arrays([own_keys[:, 0], own_keys[:, 1]]))
+        .reshape(candidate_i.shape)
+    )
+
+    latitudes, longitudes = y * resolution, x * resolution
+    distance = _distance_km(latitudes[:, None], longitudes[:, None], candidate_i * resolution, candidate_j * resolution)
+    distance = np.where(exists, distance, np.inf)
+    nearest = np.argsort(distance, axis=1, kind='stable')[:, :max(1, neighbors)]
+    rows = np.arange(len(y))[:, None]
+    distance = distance[rows, nearest]
+
+    on_node = distance < 1e-9
+    with np.errstate(divide='ignore'):
+        weights = np.where(on_node.any(axis=1, keepdims=True), on_node.astype(float), 1.0 / distance ** power)
+    return candidate_i[rows, nearest], candidate_j[rows, nearest], np.where(np.isfinite(distance), weights, 0.0)
+
+
+def build_grid_interpolation(
+    locations_df: pd.DataFrame,
+    resolution: float = Config.SPATIAL_GRID_RESOLUTION,
+    method: str = Config.SPATIAL_INTERPOLATION,
+    neighbors: int = Config.SPATIAL_IDW_NEIGHBORS,
+    power: float = Config.SPATIAL_IDW_POWER
+) -> GridInterpolation:
+    """
+    Encaixa os SBs na grade e calcula os pesos de interpolação.
+
+    Args:
+        resolution: Espaçamento da grade em graus (ex.: 0.1 ≈ 11 km).
+        method: "idw" e "nearest" buscam só os nós mais próximos dos SBs;
+            "bilinear" busca os 4 cantos da célula de cada SB (mais nós).
+        neighbors / power: Vizinhos e expoente do "idw".
+    """
+    if method not in INTERPOLATION_METHODS:
+        raise ValueError(f"Interpolação desconhecida: {method!r} (use {', '.join(INTERPOLATION_METHODS)}).")
+    y = locations_df[Config.LAT_COLUMN].to_numpy(dtype=float) / resolution
+    x = locations_df[Config.LON_COLUMN].to_numpy(dtype=float) / resolution
+    if method == "bilinear":
+        node_i, node_j, weights = _bilinear_weights(y, x)
+    else:
+        node_i, node_j, weights = _snapped_weights(y, x, resolution, method, neighbors, power)
+    weights = weights / weights.sum(axis=1, keepdims=True)
+
+    # Só os nós com peso em algum SB são buscados.
+    used = weights > 0
+    unique_keys, inverse = np.unique(np.stack([node_i[used], node_j[used]], axis=1), axis=0, return_inverse=True)
+    node_index = np.zeros(weights.shape, dtype=np.int64)
+    node_index[used] = inverse.ravel()
+    weights = np.where(used, weights, 0.0)
+
+    node_latitudes = np.round(unique_keys[:, 0] * resolution, 6)
+    node_longitudes = np.round(unique_keys[:, 1] * resolution, 6)
+    nodes_df = pd.DataFrame({
+        Config.ID_COLUMN: [f"grid_{lat:.6f}_{lon:.6f}" for lat, lon in zip(node_latitudes, node_longitudes)],
+        Config.LAT_COLUMN: node_latitudes,
+        Config.LON_COLUMN: node_longitudes,
+    })
+    return GridInterpolation(locations_df, nodes_df, node_index, weights)
+
+
+def interpolate_to_locations(grid_df: pd.DataFrame, interpolation: GridInterpolation, variables) -> pd.DataFrame:
+    """
+    Converte os dados brutos dos nós (saída da coleta) em dados brutos por SB,
+    no mesmo formato da coleta direta ('time', variáveis, ID, lat, lon).
+    """
+    if grid_df.empty:
+        return pd.DataFrame()
+
+    node_ids = interpolation.nodes_df[Config.ID_COLUMN]
+    node_codes = pd.Categorical(grid_df[Config.ID_COLUMN].astype(str), categories=node_ids).codes
+    times = pd.to_datetime(grid_df['time'])
+    time_values, time_codes = np.unique(times.to_numpy(), return_inverse=True)
+    known = node_codes >= 0
+
+    interpolated = {}
+    for var in variables:
+        node_values = np.full((len(node_ids), len(time_values)), np.nan)
+        if var in grid_df.columns:
+            node_values[node_codes[known], time_codes[known]] = grid_df[var].to_numpy(dtype=float)[known]
+        interpolated[var] = interpolation.interpolate(node_values, discrete=var in DISCRETE_VARIABLES)
+
+    # Um "ponto" por SB, com as coordenadas do próprio SB.
+    locations_df = interpolation.locations_df
+    buffer = HourlyColumnBuffer(locations_df, list(variables), len(time_values))
+    for position, record in enumerate(locations_df.to_dict('records')):
+        hourly = {'time': time_values, **{var: interpolated[var][position] for var in variables}}
+        buffer.add({'members': [record]}, hourly)
+    return buffer.result()
+
+
+def fetch_weather_data_interpolated(locations_df: pd.DataFrame, api_params: Dict[str, Any]) -> pd.DataFrame:
+    """Busca apenas os nós da grade e interpola as séries horárias para cada SB."""
+    if locations_df.empty:
+        return pd.DataFrame()
+    interpolation = build_grid_interpolation(
+        locations_df, Config.SPATIAL_GRID_RESOLUTION, Config.SPATIAL_INTERPOLATION,
+        Config.SPATIAL_IDW_NEIGHBORS, Config.SPATIAL_IDW_POWER
+    )
+    nodes_df = interpolation.nodes_df
+    logger.info(
+        f"🌐 {len(locations_df)} SBs encaixados em {len(nodes_df)} nós da grade de "
+        f"{Config.SPATIAL_GRID_RESOLUTION}° ({Config.SPATIAL_INTERPOLATION})."
+    )
+    instrumentation.increment('spatial_grid_nodes', len(nodes_df))
+
+    # Com um coletor explícito a coleta busca os nós como pontos comuns.
+    grid_df = fetch_weather_data_parallel(nodes_df, api_params, collector=make_collector(nodes_df, api_params))
+    variables = requested_variables(api_params)
+    raw_df = interpolate_to_locations(grid_df, interpolation, variables)
+    if not raw_df.empty:
+        expected = len(locations_df) * expected_rows_per_location(api_params)
+        logger.info(f"✅ Séries interpoladas: {len(raw_df)} linhas (esperado ~{expected}).")
+    return raw_df
@@ -0,0 +1,337 @@
+# rail_predictor/streaming.py
+"""
+Módulo de Pipeline em Streaming.
+
+Sobrepõe as três fases do ETL: enquanto os workers da coleta buscam os
+próximos lotes, os lotes já recebidos passam (por uma fila limitada) a uma
+thread que calcula equilíbrio + inércia e grava cada bloco de SBs como um
+novo row group do Parquet de saída. O pico de memória passa a depender do
+tamanho do bloco e da profundidade da fila, não do tamanho da rede.
+
+A saída tem as mesmas linhas do modo em lote ("file"): os blocos novos já
+vêm filtrados pela janela móvel e, ao fim da coleta, o histórico das datas
+que não foram recoletadas é anexado antes de o arquivo substituir o
+anterior. A ORDEM difere: cada row group é ordenado por
+OUTPUT_SORT_COLUMNS, mas os row groups seguem a ordem de chegada dos blocos
+e o histórico vem por último, então o arquivo não é ordenado globalmente
+por (SB, datetime). Uma regravação ordenada exigiria reler a saída inteira,
+o que anularia o ganho de memória; leitores que dependam da ordem devem
+ordenar ao ler.
+"""
+import logging
+import os
+import queue
+import threading
+import uuid
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .config import Config
+from .archive import ArchiveWriter
+from .delta import ForecastDelta
+from .api_client import (
+    TIME_BLOCKS, HourlyColumnBuffer, WeatherCollector, expected_rows_per_location, fetch_weather_data_parallel,
+    requested_variables, time_block
+)
+from .data_io import load_dimension, load_history, parquet_write_options, sort_for_output, split_compact_output
+from .processing import (
+    apply_rolling_window, build_daily_summary, extract_thermal_state, merge_thermal_state, rolling_window_bounds,
+    run_processing_pipeline
+)
+from . import instrumentation
+
+logger = logging.getLogger(__name__)
+
+_END_OF_STREAM = None
+
+
+class IncrementalParquetWriter:
+    """
+    Grava DataFrames como row groups sucessivos de um único Parquet.
+
+    O esquema é fixado pelo primeiro bloco (colunas dicionário/categóricas
+    viram o tipo dos valores, para que blocos com dicionários diferentes e o
+    histórico lido do disco sejam compatíveis). A escrita vai para um arquivo
+    temporário que só substitui `filepath` em `close()`.
+    """
+
+    def __init__(self, filepath: str):
+        self.filepath = filepath
+        self.rows_written = 0
+        self.row_groups = 0
+        self._tmp_path = f"{filepath}.tmp-{uuid.uuid4().hex}"
+        self._writer: Optional[pq.ParquetWriter] = None
+        self._schema: Optional[pa.Schema] = None
+
+    def write(self, df: pd.DataFrame):
+        if df.empty:
+            return
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if self._writer is None:
+            self._schema = pa.schema([
+                pa.field(field.name, field.type.value_type if pa.types.is_dictionary(field.type) else field.type)
+                for field in table.schema
+            ])
+            options = parquet_write_options()
+            options.pop('row_group_size', None)
+            directory = os.path.dirname(self.filepath)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._writer = pq.ParquetWriter(self._tmp_path, self._schema, **options)
+        table = table.select(self._schema.names).cast(self._schema)
+        self._writer.write_table(table, row_group_size=Config.OUTPUT_ROW_GROUP_SIZE)
+        self.rows_written += table.num_rows
+        self.row_groups += 1
+
+    def close(self):
+        """Fecha o arquivo e o move para `filepath` (nada é gravado se não houve linhas)."""
+        if self._writer is None:
+            return
+        self._writer.close()
+        os.replace(self._tmp_path, self.filepath)
+
+    def abort(self):
+        if self._writer is not None:
+            self._writer.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+
+class StreamingCollector(WeatherCollector):
+    """
+    Coletor que, a cada `chunk_points` pontos recebidos, monta o bloco bruto
+    e o entrega a uma thread de processamento por uma fila de até
+    `queue_depth` blocos. Com a fila cheia, `add` bloqueia e, com ele, a
+    submissão de novos lotes à API (backpressure).
+    """
+
+    def __init__(
+        self,
+        api_params: Dict[str, Any],
+        writer: IncrementalParquetWriter,
+        thermal_state: Optional[pd.DataFrame] = None,
+        chunk_points: int = Config.STREAM_CHUNK_POINTS,
+        queue_depth: int = Config.STREAM_QUEUE_DEPTH,
+        compact: bool = False,
+        summary_thresholds: Optional[List[float]] = None,
+        archive: Optional[ArchiveWriter] = None,
+        delta: Optional[ForecastDelta] = None
+    ):
+        self.variables = requested_variables(api_params)
+        self.rows_per_location = expected_rows_per_location(api_params)
+        self.writer = writer
+        self.thermal_state = thermal_state
+        # Blocos com o mesmo número de linhas em qualquer resolução temporal.
+        self.chunk_points = max(1, int(chunk_points) // TIME_BLOCKS[time_block(api_params)])
+        self.compact = compact
+        self.summary_thresholds = summary_thresholds
+        self.archive = archive
+        self.delta = delta
+
+        self.new_dates = set()
+        self.rows_fetched = 0
+        self.chunks = 0
+        self.dimension_parts: List[pd.DataFrame] = []
+        self.summary_parts: List[pd.DataFrame] = []
+        self._state_parts: List[pd.DataFrame] = []
+        self._pending: List[tuple] = []
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, int(queue_depth)))
+        self._error: Optional[BaseException] = None
+        self._worker = threading.Thread(target=self._consume, name="stream-processing", daemon=True)
+        self._worker.start()
+
+    # --- Lado da coleta (thread principal / thread de entrega do motor assíncrono) ---
+
+    def add(self, point: Dict[str, Any], hourly: Dict[str, list]):
+        self._pending.append((point, hourly))
+        if len(self._pending) >= self.chunk_points:
+            self._flush()
+
+    def reset(self):
+        self._pending = []
+
+    def _flush(self):
+        if not self._pending:
+            return
+        members = [member for point, _ in self._pending for member in point['members']]
+        buffer = HourlyColumnBuffer(pd.DataFrame(members), self.variables, self.rows_per_location)
+        for point, hourly in self._pending:
+            buffer.add(point, hourly)
+        self._pending = []
+        self._put(buffer.result())
+
+    def _put(self, item):
+        while True:
+            if self._error is not None:
+                raise RuntimeError("Falha no processamento em streaming.") from self._error
+            try:
+                self._queue.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def finish(self):
+        """Entrega o último bloco, espera a thread de processamento e propaga falhas."""
+        try:
+            self._flush()
+        finally:
+            self.stop()
+        if self._error is not None:
+            raise RuntimeError("Falha no processamento em streaming.") from self._error
+
+    def stop(self):
+        """Encerra a thread de processamento (descarta o bloco ainda não entregue)."""
+        self._pending = []
+        if self._worker.is_alive():
+            try:
+                self._put(_END_OF_STREAM)
+            except RuntimeError:
+                pass
+        self._worker.join()
+
+    def result(self) -> pd.DataFrame:
+        # As linhas já foram gravadas: não há DataFrame final em memória.
+        return pd.DataFrame()
+
+    def daily_summary_result(self) -> pd.DataFrame:
+        """Resumo diário (`build_daily_summary`) de tudo o que foi gravado."""
+        parts = [part for part in self.summary_parts if not part.empty]
+        if not parts:
+            return pd.DataFrame()
+        return pd.concat(parts, ignore_index=True)
+
+    def thermal_state_result(self) -> pd.DataFrame:
+        """Estado térmico (`extract_thermal_state`) de todos os blocos processados."""
+        if not self._state_parts:
+            return pd.DataFrame()
+        return merge_thermal_state(pd.DataFrame(), pd.concat(self._state_parts, ignore_index=True))
+
+    # --- Thread de processamento ---
+
+    def _consume(self):
+        while True:
+            raw_df = self._queue.get()
+            if raw_df is _END_OF_STREAM:
+                return
+            try:
+                self._process(raw_df)
+            except BaseException as e:
+                self._error = e
+                return
+
+    def _process(self, raw_df: pd.DataFrame):
+        if raw_df.empty:
+            return
+        self.rows_fetched += len(raw_df)
+        processed_df = run_processing_pipeline(raw_df, thermal_state=self.thermal_state)
+        self.new_dates.update(processed_df['datetime'].dt.normalize().unique())
+        self._state_parts.append(extract_thermal_state(processed_df))
+        if self.archive is not None:
+            # Uma parte do arquivo por bloco (SBs de cada bloco já ordenados).
+            self.archive.write(processed_df)
+        processed_df = apply_rolling_window(processed_df)
+        if self.delta is not None:
+            self.delta.compare(processed_df)
+        self.write(processed_df)
+        self.chunks += 1
+
+    def write(self, df: pd.DataFrame):
+        """Grava um bloco já processado (no formato compacto, se configurado)."""
+        if df.empty:
+            return
+        if self.summary_thresholds is not None:
+            # Cada bloco tem séries completas de seus SBs e o histórico só
+            # as datas não recoletadas: os resumos dos blocos não se sobrepõem.
+            self.summary_parts.append(build_daily_summary(df, self.summary_thresholds))
+        if self.compact:
+            df, dimension_df = split_compact_output(df)
+            self.dimension_parts.append(dimension_df)
+        else:
+            df = sort_for_output(df)
+        self.writer.write(df)
+
+
+def run_streaming_pipeline(
+    locations_df: pd.DataFrame,
+    api_params: Dict[str, Any],
+    thermal_state: Optional[pd.DataFrame] = None,
+    output_filepath: str = Config.OUTPUT_FILE,
+    compact: Optional[bool] = None,
+    dimension_filepath: str = Config.OUTPUT_DIMENSION_FILE,
+    summary_thresholds: Optional[List[float]] = None,
+    archive_dir: Optional[str] = None,
+    delta: Optional[ForecastDelta] = None
+) -> Dict[str, Any]:
+    """
+    Executa coleta, processamento e gravação sobrepostos (modo "file"). A
+    saída tem as mesmas linhas do modo em lote, ordenadas dentro de cada row
+    group, mas não globalmente (ver o docstring do módulo).
+
+    Returns:
+        Resumo com 'rows_fetched', 'rows_written', 'chunks', 'row_groups' e
+        'thermal_state' (estado extraído dos dados novos) e 'daily_summary'
+        (resumo diário do arquivo gravado, se `summary_thresholds` for
+        informado; vazio caso contrário). Com `archive_dir`, a previsão
+        também é acrescentada ao arquivo histórico (`archive.ArchiveWriter`).
+        Com `delta` (`delta.ForecastDelta`), cada bloco é comparado ao
+        histórico anterior antes de ser gravado.
+    """
+    compact = Config.OUTPUT_COMPACT if compact is None else compact
+    writer = IncrementalParquetWriter(output_filepath)
+    archive = None
+    if archive_dir is not None:
+        archive = ArchiveWriter(archive_dir, row_group_size=Config.ARCHIVE_ROW_GROUP_SIZE,
+                                compression=Config.ARCHIVE_COMPRESSION)
+    collector = StreamingCollector(
+        api_params, writer, thermal_state,
+        chunk_points=Config.STREAM_CHUNK_POINTS, queue_depth=Config.STREAM_QUEUE_DEPTH, compact=compact,
+        summary_thresholds=summary_thresholds, archive=archive, delta=delta
+    )
+    try:
+        fetch_weather_data_parallel(locations_df, api_params, collector=collector)
+        collector.finish()
+
+        if collector.rows_fetched == 0:
+            writer.abort()
+            if archive is not None:
+                archive.abort()
+            return {'rows_fetched': 0, 'rows_written': 0, 'chunks': 0, 'row_groups': 0,
+                    'thermal_state': pd.DataFrame(), 'daily_summary': pd.DataFrame()}
+
+        # Histórico das datas que não foram recoletadas, dentro da janela.
+        start_date, end_date = rolling_window_bounds()
+        history_df = load_history(
+            output_filepath, new_data_dates=sorted(collector.new_dates), start_date=start_date, end_date=end_date
+        )
+        collector.write(apply_rolling_window(history_df))
+        if compact:
+            previous_dimension = load_dimension(dimension_filepath)
+            dimension_df = pd.concat(collector.dimension_parts + [previous_dimension], ignore_index=True)
+            dimension_df = dimension_df.drop_duplicates(subset=[Config.ID_COLUMN], keep='first')
+            dimension_df.sort_values(by=Config.ID_COLUMN).to_parquet(dimension_filepath, index=False, engine='pyarrow')
+        writer.close()
+        if archive is not None:
+            archive.close()
+    except BaseException:
+        collector.stop()
+        writer.abort()
+        if archive is not None:
+            archive.abort()
+        raise
+
+    instrumentation.increment('stream_chunks', collector.chunks)
+    logger.info(
+        f"\n✅ Sucesso! Histórico salvo em '{output_filepath}' em streaming: "
+        f"{writer.rows_written} linhas em {writer.row_groups} row groups ({collector.chunks} blocos da API)."
+    )
+    return {
+        'rows_fetched': collector.rows_fetched,
+        'rows_written': writer.rows_written,
+        'chunks': collector.chunks,
+        'row_groups': writer.row_groups,
+        'thermal_state': collector.thermal_state_result(),
+        'daily_summary': collector.daily_summary_result(),
+    }
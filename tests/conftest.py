@@ -0,0 +1,113 @@
+# tests/conftest.py
+"""
+Fixtures compartilhadas pelos testes.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import pandas as pd
+import pytest
+
+from rail_predictor.config import Config
+
+
+@pytest.fixture(autouse=True)
+def disable_local_fetch_state(monkeypatch):
+    """Os testes não devem ler nem gravar o cache de respostas nem o staging reais."""
+    monkeypatch.setattr(Config, 'API_CACHE_ENABLED', False)
+    monkeypatch.setattr(Config, 'FETCH_CHECKPOINT_ENABLED', False)
+
+
+@pytest.fixture
+def make_locations():
+    """Fábrica de locais (um SB por latitude, mesma longitude) para o servidor falso."""
+    def factory(latitudes):
+        return pd.DataFrame({
+            Config.ID_COLUMN: [f'SB{i}' for i in range(len(latitudes))],
+            Config.LAT_COLUMN: latitudes,
+            Config.LON_COLUMN: [-51.0] * len(latitudes),
+        })
+    return factory
+
+
+class StubOpenMeteoHandler(BaseHTTPRequestHandler):
+    """
+    Imita a API Open-Meteo: devolve 2 horas por coordenada (a temperatura da
+    1ª hora é a própria latitude). Latitude 99 trava por 2s e, assim como a
+    98, responde HTTP 400. A primeira requisição com latitude 97 recebe 429
+    com Retry-After. Requisições de um único ponto recebem um ETag e
+    respondem 304 a um If-None-Match correspondente.
+    """
+
+    requests_seen = []
+    conditional_requests = 0
+    throttled_once = False
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        latitudes = query['latitude'][0].split(',')
+        type(self).requests_seen.append(latitudes)
+
+        if '99.0' in latitudes:
+            time.sleep(2)
+        if '98.0' in latitudes or '99.0' in latitudes:
+            self._send(400, {'error': True, 'reason': 'invalid coordinate'})
+            return
+        if '97.0' in latitudes and not type(self).throttled_once:
+            type(self).throttled_once = True
+            self._send(429, {'error': True, 'reason': 'too many requests'}, retry_after='1')
+            return
+
+        etag = f'"{latitudes[0]}"' if len(latitudes) == 1 else None
+        if etag is not None and self.headers.get('If-None-Match') == etag:
+            type(self).conditional_requests += 1
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        results = [{'hourly': {
+            'time': ['2026-08-12T00:00', '2026-08-12T01:00'],
+            'temperature_2m': [float(lat), 1.0],
+        }} for lat in latitudes]
+        self._send(200, results if len(results) > 1 else results[0], etag)
+
+    def _send(self, status, payload, etag=None, retry_after=None):
+        body = json.dumps(payload).encode('utf-8')
+        try:
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            if etag is not None:
+                self.send_header('ETag', etag)
+            if retry_after is not None:
+                self.send_header('Retry-After', retry_after)
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server(monkeypatch):
+    """Sobe o servidor falso em uma porta local e aponta a Config para ele."""
+    StubOpenMeteoHandler.requests_seen = []
+    StubOpenMeteoHandler.conditional_requests = 0
+    StubOpenMeteoHandler.throttled_once = False
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubOpenMeteoHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    monkeypatch.setattr(Config, 'API_BASE_URL', f'http://127.0.0.1:{server.server_port}/v1/forecast')
+    monkeypatch.setattr(Config, 'API_RATE_LIMIT_CALLS', 1000)
+    yield StubOpenMeteoHandler
+
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,372 @@
+# tests/test_api_client.py
+"""
+Testes unitários para o módulo api_client.py
+"""
+import os
+import threading
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+import requests
+
+from rail_predictor import api_client, instrumentation
+from rail_predictor.api_client import (
+    group_locations_by_coordinate,
+    chunk_points,
+    fetch_batch_with_bisection,
+    fetch_weather_data_parallel,
+    FrameCollector,
+    HourlyColumnBuffer,
+    WeatherCollector,
+)
+from rail_predictor.config import Config
+from rail_predictor.rate_control import AdaptiveRateLimiter, AimdRateController
+
+
+class FakeResponse:
+    def __init__(self, payload, status_code=200):
+        self._payload = payload
+        self.status_code = status_code
+        self.headers = {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} Error", response=self)
+
+    def json(self):
+        return self._payload
+
+
+class FakeSession:
+    """
+    Sessão falsa que registra as chamadas e devolve 2 passos por ponto
+    (horas, ou 15 min se `minutely_15` for pedido), imitando o formato
+    multi-coordenada da Open-Meteo. Latitudes listadas em `bad_latitudes`
+    fazem a requisição inteira falhar com HTTP 400; com `status_code`, toda
+    requisição responde esse status.
+    """
+
+    def __init__(self, bad_latitudes=(), status_code=None):
+        self.calls = []
+        self.bad_latitudes = {str(lat) for lat in bad_latitudes}
+        self.status_code = status_code
+        self._lock = threading.Lock()
+
+    def get(self, url, params=None, **kwargs):
+        with self._lock:
+            self.calls.append(dict(params))
+        if self.status_code is not None:
+            return FakeResponse({'error': True}, status_code=self.status_code)
+        latitudes = str(params['latitude']).split(',')
+        if self.bad_latitudes.intersection(latitudes):
+            return FakeResponse({'error': True}, status_code=400)
+        block, second = ('minutely_15', '00:15') if params.get('minutely_15') else ('hourly', '01:00')
+        results = [{block: {
+            'time': ['2026-08-12T00:00', f'2026-08-12T{second}'],
+            'temperature_2m': [float(lat), 1.0],
+        }} for lat in latitudes]
+        return FakeResponse(results if len(results) > 1 else results[0])
+
+    def close(self):
+        pass
+
+
+def make_locations():
+    return pd.DataFrame({
+        Config.ID_COLUMN: ['LLDP', 'LLDD', 'LLDW'],
+        Config.LAT_COLUMN: [-23.280125, -23.280125, -23.280611],
+        Config.LON_COLUMN: [-51.210917, -51.210917, -51.234028],
+    })
+
+
+def test_group_locations_by_coordinate_merges_identical_points():
+    points = group_locations_by_coordinate(make_locations(), decimals=None)
+
+    assert len(points) == 2
+    assert [m[Config.ID_COLUMN] for m in points[0]['members']] == ['LLDP', 'LLDD']
+
+
+def test_group_locations_by_coordinate_with_rounding():
+    # Com 1 casa decimal (~11 km) os três SBs caem na mesma célula.
+    points = group_locations_by_coordinate(make_locations(), decimals=1)
+
+    assert len(points) == 1
+    assert points[0]['latitude'] == pytest.approx(-23.3)
+    assert len(points[0]['members']) == 3
+
+
+def test_fetch_weather_data_parallel_fetches_each_point_once(monkeypatch):
+    session = FakeSession()
+    monkeypatch.setattr(api_client, 'create_session_with_retries', lambda **kwargs: session)
+    monkeypatch.setattr(Config, 'API_BATCH_SIZE', 1)
+
+    result = fetch_weather_data_parallel(make_locations(), {'hourly': 'temperature_2m'})
+
+    # 3 SBs, mas apenas 2 pontos distintos -> 2 chamadas
+    assert len(session.calls) == 2
+    assert len(result) == 6
+    assert set(result[Config.ID_COLUMN]) == {'LLDP', 'LLDD', 'LLDW'}
+    lldd = result[result[Config.ID_COLUMN] == 'LLDD']
+    assert lldd[Config.LAT_COLUMN].tolist() == [-23.280125, -23.280125]
+    assert lldd['temperature_2m'].tolist() == [-23.280125, 1.0]
+
+
+def test_fetch_weather_data_parallel_reads_minutely_15_block(monkeypatch):
+    session = FakeSession()
+    monkeypatch.setattr(api_client, 'create_session_with_retries', lambda **kwargs: session)
+    api_params = {'minutely_15': 'temperature_2m', 'past_days': 1, 'forecast_days': 1}
+
+    result = fetch_weather_data_parallel(make_locations(), api_params)
+
+    assert session.calls[0]['minutely_15'] == 'temperature_2m'
+    assert len(result) == 6
+    assert pd.to_datetime(result['time']).diff().max() == pd.Timedelta(minutes=15)
+    # 2 dias de passos de 15 min
+    assert api_client.expected_rows_per_location(api_params) == 2 * 96
+
+
+def make_points(n):
+    return [{
+        'latitude': float(i), 'longitude': float(-i),
+        'members': [{Config.ID_COLUMN: f'SB{i}', Config.LAT_COLUMN: float(i), Config.LON_COLUMN: float(-i)}],
+    } for i in range(n)]
+
+
+def test_fetch_weather_data_parallel_batches_points(monkeypatch):
+    session = FakeSession()
+    monkeypatch.setattr(api_client, 'create_session_with_retries', lambda **kwargs: session)
+    monkeypatch.setattr(Config, 'API_BATCH_SIZE', 50)
+
+    result = fetch_weather_data_parallel(make_locations(), {'hourly': 'temperature_2m'})
+
+    # 2 pontos distintos cabem em um único lote -> 1 chamada
+    assert len(session.calls) == 1
+    assert len(result) == 6
+    lldw = result[result[Config.ID_COLUMN] == 'LLDW']
+    assert lldw['temperature_2m'].tolist() == [-23.280611, 1.0]
+
+
+def test_chunk_points():
+    assert [len(b) for b in chunk_points(make_points(7), batch_size=3)] == [3, 3, 1]
+
+
+def test_fetch_batch_with_bisection_isolates_bad_point():
+    session = FakeSession(bad_latitudes=[5.0])
+
+    fetched = fetch_batch_with_bisection(make_points(8), {}, session)
+
+    fetched_ids = [point['members'][0][Config.ID_COLUMN] for point, _ in fetched]
+    assert fetched_ids == ['SB0', 'SB1', 'SB2', 'SB3', 'SB4', 'SB6', 'SB7']
+    # 1 lote de 8 -> 4+4 -> 2+2 (metade ruim) -> 1+1 (ponto ruim): 7 chamadas
+    assert len(session.calls) == 7
+
+
+@pytest.mark.parametrize('status_code', [429, 503])
+def test_fetch_batch_with_bisection_does_not_split_when_api_unavailable(status_code):
+    session = FakeSession(status_code=status_code)
+    report = instrumentation.start_run()
+    try:
+        fetched = fetch_batch_with_bisection(make_points(16), {}, session)
+    finally:
+        instrumentation._current_run = None
+
+    # Limitação/indisponibilidade não é culpa de um ponto: 1 chamada, sem divisão.
+    assert fetched == []
+    assert len(session.calls) == 1
+    assert 'api_batch_splits' not in report.counters
+    assert report.counters['api_unavailable_batches'] == 1
+    assert report.counters['api_failed_points'] == 16
+
+
+def test_adaptive_fetch_does_not_split_after_retries_exhausted():
+    session = FakeSession(status_code=429)
+    limiter = AdaptiveRateLimiter(AimdRateController(initial_rate=100, min_rate=100, max_rate=100))
+    report = instrumentation.start_run()
+    try:
+        fetched = fetch_batch_with_bisection(make_points(16), {}, session, limiter)
+    finally:
+        instrumentation._current_run = None
+
+    # 1 tentativa + 3 repetições do lote inteiro, sem bisseção.
+    assert fetched == []
+    assert len(session.calls) == 4
+    assert report.counters['api_retries'] == 3
+    assert report.counters['api_throttled_batches'] == 1
+    assert report.counters['api_unavailable_batches'] == 1
+    assert 'api_batch_splits' not in report.counters
+    assert limiter.controller.stats['throttled'] == 4
+
+
+def test_fetch_batch_with_bisection_does_not_split_on_connection_error():
+    class DownSession(FakeSession):
+        def get(self, url, params=None, **kwargs):
+            self.calls.append(dict(params))
+            raise requests.exceptions.ConnectionError("connection refused")
+
+    session = DownSession()
+    assert fetch_batch_with_bisection(make_points(16), {}, session) == []
+    assert len(session.calls) == 1
+
+
+def test_fetch_batch_with_bisection_does_not_split_on_non_json_body():
+    class MaintenancePage(FakeResponse):
+        def json(self):
+            raise requests.exceptions.JSONDecodeError("Expecting value", "<html>", 0)
+
+    class MaintenanceSession(FakeSession):
+        def get(self, url, params=None, **kwargs):
+            self.calls.append(dict(params))
+            return MaintenancePage(None)
+
+    session = MaintenanceSession()
+    report = instrumentation.start_run()
+    try:
+        fetched = fetch_batch_with_bisection(make_points(16), {}, session)
+    finally:
+        instrumentation._current_run = None
+
+    # Página de proxy/manutenção com HTTP 200: o lote inteiro falha sem bisseção.
+    assert fetched == []
+    assert len(session.calls) == 1
+    assert 'api_batch_splits' not in report.counters
+    assert report.counters['api_unavailable_batches'] == 1
+
+
+def test_fetch_batch_with_bisection_splits_on_missing_results():
+    class ShortSession(FakeSession):
+        def get(self, url, params=None, **kwargs):
+            response = super().get(url, params, **kwargs)
+            if isinstance(response._payload, list):
+                response._payload = response._payload[:-1]
+            return response
+
+    session = ShortSession()
+    fetched = fetch_batch_with_bisection(make_points(2), {}, session)
+
+    # Um resultado faltando no lote de 2: divide e busca cada ponto sozinho.
+    assert len(fetched) == 2
+    assert len(session.calls) == 3
+
+
+def test_hourly_column_buffer_matches_frame_collector():
+    locations = make_locations()
+    points = group_locations_by_coordinate(locations)
+    hourly = {
+        'time': ['2026-08-12T00:00', '2026-08-12T01:00'],
+        'temperature_2m': [20.0, None],
+    }
+
+    # rows_per_location=1 força o crescimento do buffer pré-alocado
+    buffer = HourlyColumnBuffer(locations, ['temperature_2m', 'precipitation'], rows_per_location=1)
+    frames = FrameCollector()
+    for point in points:
+        buffer.add(point, hourly)
+        frames.add(point, hourly)
+
+    table = buffer.to_arrow()
+    assert pa.types.is_dictionary(table.schema.field(Config.ID_COLUMN).type)
+    assert pa.types.is_dictionary(table.schema.field(Config.LAT_COLUMN).type)
+
+    result = buffer.result()
+    assert isinstance(result[Config.ID_COLUMN].dtype, pd.CategoricalDtype)
+    assert result['precipitation'].isna().all()
+
+    expected = frames.result()
+    sort_keys = [Config.ID_COLUMN, 'time']
+    result = result.astype({Config.ID_COLUMN: str, Config.LAT_COLUMN: float, Config.LON_COLUMN: float})
+    result = result.sort_values(sort_keys).reset_index(drop=True)
+    expected = expected.sort_values(sort_keys).reset_index(drop=True)
+    assert result[Config.ID_COLUMN].tolist() == expected[Config.ID_COLUMN].tolist()
+    assert result[Config.LAT_COLUMN].tolist() == expected[Config.LAT_COLUMN].tolist()
+    assert (result['time'] == pd.to_datetime(expected['time'])).all()
+    pd.testing.assert_series_equal(result['temperature_2m'], expected['temperature_2m'].astype(float))
+
+
+class FailingSession(FakeSession):
+    """Sessão que derruba o processo (simulado) após `fail_after` chamadas."""
+
+    def __init__(self, fail_after):
+        super().__init__()
+        self.fail_after = fail_after
+
+    def get(self, url, params=None, **kwargs):
+        if len(self.calls) >= self.fail_after:
+            raise KeyboardInterrupt("execução interrompida")
+        return super().get(url, params, **kwargs)
+
+
+def test_weather_collector_subclass_must_implement_interface():
+    class IncompleteCollector(WeatherCollector):
+        def add(self, point, hourly):
+            pass
+
+    # Falta reset/result: o erro aparece ao criar o coletor, antes da coleta.
+    with pytest.raises(TypeError):
+        IncompleteCollector()
+
+
+@pytest.mark.parametrize('ingestion', ['arrow', 'frames'])
+def test_checkpoint_resumes_without_refetching_staged_sbs(tmp_path, monkeypatch, ingestion):
+    monkeypatch.setattr(Config, 'FETCH_CHECKPOINT_ENABLED', True)
+    monkeypatch.setattr(Config, 'FETCH_STAGING_DIR', str(tmp_path / 'staging'))
+    monkeypatch.setattr(Config, 'FETCH_CHECKPOINT_EVERY_POINTS', 1)
+    monkeypatch.setattr(Config, 'API_BATCH_SIZE', 1)
+    monkeypatch.setattr(Config, 'MAX_API_WORKERS', 1)
+    monkeypatch.setattr(Config, 'API_INGESTION', ingestion)
+    locations = pd.DataFrame({
+        Config.ID_COLUMN: ['A', 'B', 'C', 'D'],
+        Config.LAT_COLUMN: [1.0, 2.0, 3.0, 4.0],
+        Config.LON_COLUMN: [-51.0] * 4,
+    })
+    params = {'hourly': 'temperature_2m', 'past_days': 0, 'forecast_days': 1}
+
+    # 1ª execução: cai depois de 2 pontos
+    crashing = FailingSession(fail_after=2)
+    monkeypatch.setattr(api_client, 'create_session_with_retries', lambda **kwargs: crashing)
+    with pytest.raises(KeyboardInterrupt):
+        fetch_weather_data_parallel(locations, params)
+
+    # 2ª execução: busca apenas os 2 SBs restantes e devolve os 4
+    session = FakeSession()
+    monkeypatch.setattr(api_client, 'create_session_with_retries', lambda **kwargs: session)
+    result = fetch_weather_data_parallel(locations, params)
+
+    assert [call['latitude'] for call in session.calls] == ['3.0', '4.0']
+    assert sorted(result[Config.ID_COLUMN].astype(str).unique()) == ['A', 'B', 'C', 'D']
+    assert len(result) == 8
+
+    api_client.clear_fetch_checkpoint(params)
+    assert not any(os.scandir(tmp_path / 'staging'))
+
+
+def test_checkpoint_is_not_reused_for_other_locations_or_spatial_mode(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'FETCH_CHECKPOINT_ENABLED', True)
+    monkeypatch.setattr(Config, 'FETCH_STAGING_DIR', str(tmp_path / 'staging'))
+    monkeypatch.setattr(Config, 'FETCH_CHECKPOINT_EVERY_POINTS', 1)
+    monkeypatch.setattr(Config, 'API_BATCH_SIZE', 1)
+    monkeypatch.setattr(Config, 'MAX_API_WORKERS', 1)
+    locations = pd.DataFrame({
+        Config.ID_COLUMN: ['A', 'B', 'C', 'D'],
+        Config.LAT_COLUMN: [1.0, 2.0, 3.0, 4.0],
+        Config.LON_COLUMN: [-51.0] * 4,
+    })
+    params = {'hourly': 'temperature_2m', 'past_days': 0, 'forecast_days': 1}
+
+    crashing = FailingSession(fail_after=2)
+    monkeypatch.setattr(api_client, 'create_session_with_retries', lambda **kwargs: crashing)
+    with pytest.raises(KeyboardInterrupt):
+        fetch_weather_data_parallel(locations, params)
+
+    # coordenadas.json mudou no mesmo dia (B removido): nada vem do staging antigo.
+    session = FakeSession()
+    monkeypatch.setattr(api_client, 'create_session_with_retries', lambda **kwargs: session)
+    result = fetch_weather_data_parallel(locations[locations[Config.ID_COLUMN] != 'B'], params)
+
+    assert [call['latitude'] for call in session.calls] == ['1.0', '3.0', '4.0']
+    assert sorted(result[Config.ID_COLUMN].astype(str).unique()) == ['A', 'C', 'D']
+
+    points_key = api_client.fetch_run_key(params, locations)
+    monkeypatch.setattr(Config, 'API_SPATIAL_MODE', 'grid')
+    assert api_client.fetch_run_key(params, locations) != points_key
+    assert api_client.fetch_run_key(params, locations.iloc[::-1]) == api_client.fetch_run_key(params, locations)
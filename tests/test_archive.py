@@ -0,0 +1,151 @@
+# tests/test_archive.py
+"""
+Testes do arquivo histórico de previsões (archive.py): partições por data
+de emissão, índice de row groups e consultas que só leem o necessário.
+"""
+import os
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from rail_predictor import archive
+from rail_predictor.archive import ArchiveWriter, archive_forecast, load_archive_index, query_archive, select_row_groups
+from rail_predictor.config import Config
+
+
+def make_forecast(start, days=2, sbs=('SB1', 'SB2', 'SB3', 'SB4'), value=1.0):
+    times = pd.date_range(start, periods=days * 24, freq='h')
+    return pd.DataFrame({
+        Config.ID_COLUMN: [sb for sb in sbs for _ in times],
+        'datetime': list(times) * len(sbs),
+        Config.LAT_COLUMN: -23.0,
+        Config.LON_COLUMN: -51.0,
+        'estimated_rail_temp': value,
+        'sky_condition': 'Céu Limpo',
+    })
+
+
+def write_issue(root, issue_date, df, row_group_size=24):
+    writer = ArchiveWriter(root, issue_date, row_group_size=row_group_size)
+    writer.write(df)
+    writer.close()
+
+
+def test_archive_writes_sorted_partition_and_index(tmp_path):
+    root = str(tmp_path / 'archive')
+    # Linhas fora de ordem: o arquivo grava ordenado por SB e hora.
+    df = make_forecast('2026-08-10').sample(frac=1, random_state=0)
+    write_issue(root, '2026-08-10', df)
+
+    index = load_archive_index(root)
+    # 4 SBs x 48 h em grupos de 24 linhas: cada grupo tem um SB e um dia.
+    assert len(index) == 8
+    assert (index['sb_min'] == index['sb_max']).all()
+    assert (pd.to_datetime(index['time_max']) - pd.to_datetime(index['time_min']) == pd.Timedelta(hours=23)).all()
+
+    part = pd.read_parquet(os.path.join(root, index['file'].iloc[0]))
+    assert Config.LAT_COLUMN not in part.columns
+    assert part['estimated_rail_temp'].dtype == 'float32'
+    assert part[Config.ID_COLUMN].is_monotonic_increasing
+
+
+def test_select_row_groups_prunes_by_sb_time_and_issue(tmp_path):
+    root = str(tmp_path / 'archive')
+    write_issue(root, '2026-08-10', make_forecast('2026-08-10'))
+    write_issue(root, '2026-08-11', make_forecast('2026-08-11'))
+    index = load_archive_index(root)
+
+    selected = select_row_groups(index, sbs=['SB2'], start='2026-08-11 06:00', end='2026-08-11 07:00')
+    # O dia 11 aparece nas duas emissões (D+1 da primeira e D da segunda).
+    assert len(selected) == 2
+    assert set(selected['issue_date']) == {'2026-08-10', '2026-08-11'}
+
+    selected = select_row_groups(index, sbs=['SB2', 'SB9'], issue_date='2026-08-11')
+    assert len(selected) == 2 and (selected['sb_min'] == 'SB2').all()
+    assert select_row_groups(index, sbs=['SB0']).empty
+
+
+def test_query_archive_returns_exact_rows(tmp_path, monkeypatch):
+    root = str(tmp_path / 'archive')
+    write_issue(root, '2026-08-10', make_forecast('2026-08-10', value=1.0))
+    write_issue(root, '2026-08-11', make_forecast('2026-08-11', value=2.0))
+
+    read_groups = []
+    original = pq.ParquetFile.read_row_groups
+
+    def spy(self, row_groups, *args, **kwargs):
+        read_groups.extend(row_groups)
+        return original(self, row_groups, *args, **kwargs)
+    monkeypatch.setattr(pq.ParquetFile, 'read_row_groups', spy)
+
+    result = query_archive(['SB3'], '2026-08-11 10:00', '2026-08-11 12:00', root=root)
+
+    assert len(read_groups) == 2
+    assert list(result.columns[:3]) == ['issue_date', Config.ID_COLUMN, 'datetime']
+    assert len(result) == 6 and (result[Config.ID_COLUMN] == 'SB3').all()
+    # Mesma hora prevista nas duas emissões, ordenadas pela emissão.
+    np.testing.assert_array_equal(result['estimated_rail_temp'], [1.0] * 3 + [2.0] * 3)
+
+    only_second = query_archive(['SB3'], '2026-08-11 10:00', '2026-08-11 12:00', issue_date='2026-08-11', root=root)
+    assert len(only_second) == 3 and (only_second['issue_date'] == pd.Timestamp('2026-08-11')).all()
+    assert query_archive(['SB3'], '2027-01-01', root=root).empty
+    assert query_archive(root=str(tmp_path / 'missing')).empty
+
+
+def test_query_archive_accepts_scalar_sb_and_date(tmp_path):
+    root = str(tmp_path / 'archive')
+    write_issue(root, '2026-08-10', make_forecast('2026-08-10', value=1.0))
+    write_issue(root, '2026-08-11', make_forecast('2026-08-11', value=2.0))
+
+    # Um SB em texto não é iterado caractere a caractere.
+    result = query_archive('SB3', issue_date=date(2026, 8, 11), root=root)
+    assert len(result) == 48 and (result[Config.ID_COLUMN] == 'SB3').all()
+    assert (result['issue_date'] == pd.Timestamp('2026-08-11')).all()
+
+    index = load_archive_index(root)
+    assert len(select_row_groups(index, sbs='SB3', issue_date=[date(2026, 8, 10), '2026-08-11'])) == 4
+
+
+def test_query_archive_date_only_end_covers_whole_day(tmp_path):
+    root = str(tmp_path / 'archive')
+    write_issue(root, '2026-08-10', make_forecast('2026-08-10'))
+
+    # Como no README: o último dia entra inteiro, não só a hora 00:00.
+    result = query_archive(['SB3'], '2026-08-10', '2026-08-10', root=root)
+    assert len(result) == 24
+    assert pd.to_datetime(result['datetime']).max() == pd.Timestamp('2026-08-10 23:00')
+    assert len(query_archive(['SB3'], end=date(2026, 8, 10), root=root)) == 24
+    # Um horário continua sendo um limite inclusivo.
+    assert len(query_archive(['SB3'], end='2026-08-10 05:00', root=root)) == 6
+    assert len(query_archive(['SB3'], end=pd.Timestamp('2026-08-11'), root=root)) == 25
+
+
+def test_same_day_rerun_replaces_issue(tmp_path):
+    root = str(tmp_path / 'archive')
+    write_issue(root, '2026-08-10', make_forecast('2026-08-10', value=1.0))
+    write_issue(root, '2026-08-10', make_forecast('2026-08-10', sbs=('SB1',), value=5.0))
+
+    result = query_archive(root=root)
+    assert set(result[Config.ID_COLUMN]) == {'SB1'}
+    assert (result['estimated_rail_temp'] == 5.0).all()
+    assert len(load_archive_index(root)) == 2
+    assert sorted(os.listdir(root)) == ['_index.parquet', 'issue_date=2026-08-10']
+    assert len(os.listdir(os.path.join(root, 'issue_date=2026-08-10'))) == 1
+
+
+def test_archive_failure_leaves_archive_untouched(tmp_path, monkeypatch):
+    root = str(tmp_path / 'archive')
+    write_issue(root, '2026-08-10', make_forecast('2026-08-10', value=1.0))
+    files_before = sorted(os.listdir(os.path.join(root, 'issue_date=2026-08-10')))
+
+    def broken_index(*args, **kwargs):
+        raise OSError("disk full")
+    monkeypatch.setattr(archive, '_save_archive_index', broken_index)
+    # Reexecução do mesmo dia que falha ao trocar o índice.
+    archive_forecast(make_forecast('2026-08-10', value=9.0), root=root, issue_date='2026-08-10')
+
+    assert (query_archive(root=root)['estimated_rail_temp'] == 1.0).all()
+    assert sorted(os.listdir(os.path.join(root, 'issue_date=2026-08-10'))) == files_before
+    assert not [name for name in os.listdir(root) if name.startswith('.staging')]
@@ -0,0 +1,140 @@
+# tests/test_async_client.py
+"""
+Testes do motor de coleta assíncrono (async_client.py), executados contra o
+servidor HTTP local que imita a API Open-Meteo (fixture `stub_server`).
+"""
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from rail_predictor import async_client, instrumentation
+from rail_predictor.api_client import FrameCollector, fetch_weather_data_parallel
+from rail_predictor.async_client import AsyncTokenBucket, fetch_batch_with_bisection_async
+from rail_predictor.config import Config
+from rail_predictor.rate_control import AimdRateController
+
+
+@pytest.fixture(autouse=True)
+def async_engine(monkeypatch):
+    monkeypatch.setattr(Config, 'API_FETCH_ENGINE', 'async')
+
+
+def test_async_engine_matches_threaded_output(stub_server, monkeypatch, make_locations):
+    monkeypatch.setattr(Config, 'API_BATCH_SIZE', 2)
+    locations = make_locations([1.0, 2.0, 3.0, 3.0])
+
+    result = fetch_weather_data_parallel(locations, {'hourly': 'temperature_2m'})
+
+    # 3 pontos distintos em lotes de 2 -> 2 requisições
+    assert len(stub_server.requests_seen) == 2
+    assert len(result) == 8
+    sb3 = result[result[Config.ID_COLUMN] == 'SB3']
+    assert sb3['temperature_2m'].tolist() == [3.0, 1.0]
+
+
+def test_async_engine_bisects_failed_batch(stub_server, monkeypatch, make_locations):
+    monkeypatch.setattr(Config, 'API_BATCH_SIZE', 4)
+    locations = make_locations([1.0, 2.0, 98.0, 4.0])
+
+    result = fetch_weather_data_parallel(locations, {'hourly': 'temperature_2m'})
+
+    assert sorted(result[Config.ID_COLUMN].unique()) == ['SB0', 'SB1', 'SB3']
+
+
+@pytest.mark.parametrize('status_code', [429, 503])
+def test_async_bisection_does_not_split_when_api_unavailable(status_code):
+    requests_seen = []
+
+    def always_failing(request):
+        requests_seen.append(request.url.params['latitude'])
+        return httpx.Response(status_code, json={'error': True})
+
+    async def fetch(points):
+        # Com o controlador AIMD as repetições não esperam o backoff fixo.
+        bucket = AsyncTokenBucket(100, controller=AimdRateController(initial_rate=100, min_rate=100, max_rate=100))
+        async with httpx.AsyncClient(transport=httpx.MockTransport(always_failing)) as client:
+            return await fetch_batch_with_bisection_async(points, {}, client, bucket)
+
+    points = [{'latitude': float(i), 'longitude': -51.0, 'members': [{Config.ID_COLUMN: f'SB{i}'}]} for i in range(16)]
+    report = instrumentation.start_run()
+    try:
+        fetched = asyncio.run(fetch(points))
+    finally:
+        instrumentation._current_run = None
+
+    # 1 tentativa + 3 repetições do lote inteiro de 16 pontos, sem bisseção.
+    assert fetched == []
+    assert len(requests_seen) == 4 and all(lat.count(',') == 15 for lat in requests_seen)
+    assert 'api_batch_splits' not in report.counters
+    assert report.counters['api_unavailable_batches'] == 1
+
+
+def test_async_bisection_does_not_split_on_non_json_body():
+    requests_seen = []
+
+    def maintenance_page(request):
+        requests_seen.append(request.url.params['latitude'])
+        return httpx.Response(200, text='<html>Em manutenção</html>')
+
+    async def fetch(points):
+        async with httpx.AsyncClient(transport=httpx.MockTransport(maintenance_page)) as client:
+            return await fetch_batch_with_bisection_async(points, {}, client, AsyncTokenBucket(100))
+
+    points = [{'latitude': float(i), 'longitude': -51.0, 'members': [{Config.ID_COLUMN: f'SB{i}'}]} for i in range(16)]
+    report = instrumentation.start_run()
+    try:
+        fetched = asyncio.run(fetch(points))
+    finally:
+        instrumentation._current_run = None
+
+    # HTTP 200 sem JSON não é culpa de um ponto: 1 requisição, sem bisseção.
+    assert fetched == []
+    assert len(requests_seen) == 1
+    assert 'api_batch_splits' not in report.counters
+    assert report.counters['api_unavailable_batches'] == 1
+
+
+def test_async_engine_times_out_hung_request(stub_server, monkeypatch, make_locations):
+    monkeypatch.setattr(Config, 'API_BATCH_SIZE', 1)
+    monkeypatch.setattr(Config, 'API_REQUEST_TIMEOUT', 0.2)
+    locations = make_locations([1.0, 99.0])
+
+    started = time.monotonic()
+    result = fetch_weather_data_parallel(locations, {'hourly': 'temperature_2m'})
+
+    assert result[Config.ID_COLUMN].unique().tolist() == ['SB0']
+    # 4 tentativas com timeout de 0.2s + backoff, bem abaixo de 4 x 2s
+    assert time.monotonic() - started < 6
+
+
+def test_async_engine_keeps_bounded_number_of_batches_in_flight(monkeypatch):
+    monkeypatch.setattr(Config, 'MAX_API_WORKERS', 2)
+    tasks_seen = []
+
+    async def fake_fetch(batch, *args):
+        tasks_seen.append(len(asyncio.all_tasks()))
+        await asyncio.sleep(0)
+        return []
+    monkeypatch.setattr(async_client, 'fetch_batch_with_bisection_async', fake_fetch)
+
+    batches = [[{'latitude': float(i), 'longitude': -51.0}] for i in range(100)]
+    asyncio.run(async_client._fetch_all_batches(batches, {}, len(batches), FrameCollector()))
+
+    # Tarefa principal + produtor + 2 workers, e não uma tarefa por lote.
+    assert len(tasks_seen) == 100
+    assert max(tasks_seen) <= 4
+
+
+def test_async_token_bucket_limits_rate():
+    async def acquire_many(bucket, n):
+        for _ in range(n):
+            await bucket.acquire()
+
+    bucket = AsyncTokenBucket(rate=20, capacity=1)
+    started = time.monotonic()
+    asyncio.run(acquire_many(bucket, 11))
+
+    # 1 token inicial + 10 tokens a 20/s -> ~0.5s
+    assert time.monotonic() - started >= 0.45
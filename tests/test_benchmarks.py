@@ -0,0 +1,43 @@
+# tests/test_benchmarks.py
+"""
+Teste de fumaça do benchmark do ETL (benchmarks/run_etl.py) em tamanho
+mínimo, para que o harness não quebre silenciosamente.
+"""
+from benchmarks.run_etl import compare_results, run_benchmarks
+from benchmarks.synthetic import make_locations, make_raw_weather
+
+
+def test_synthetic_weather_matches_fetch_layout():
+    locations = make_locations(3)
+    raw = make_raw_weather(locations, '2026-01-01', days=2)
+
+    assert len(raw) == 3 * 48
+    assert raw['SB'].nunique() == 3
+    assert (raw['shortwave_radiation'] >= 0).all()
+
+
+def test_run_benchmarks_reports_every_stage():
+    report = run_benchmarks(sb_counts=[20], days=2, fetch_sbs=10, repeats=1)
+
+    stages = {row['stage'] for row in report['results']}
+    assert stages == {
+        'equilibrium', 'inertia', 'pipeline', 'pipeline_sharded', 'rolling_window', 'save_output',
+        'load_history', 'fetch_threads', 'fetch_async', 'end_to_end_batch', 'end_to_end_stream',
+        'inertia_15min', 'pipeline_15min', 'save_output_15min', 'end_to_end_batch_15min', 'end_to_end_stream_15min',
+    }
+    fetch = next(row for row in report['results'] if row['stage'] == 'fetch_threads')
+    # Janela D-3..D+0 (past_days=3, forecast_days=1): 4 dias
+    assert fetch['rows'] == 10 * 4 * 24
+    # 15 min: 4x as linhas da mesma janela
+    stream_15min = next(row for row in report['results'] if row['stage'] == 'end_to_end_stream_15min')
+    assert stream_15min['rows'] == 4 * fetch['rows']
+
+
+def test_compare_results_flags_regressions():
+    baseline = [{'stage': 'pipeline', 'n_sbs': 10, 'seconds': 1.0, 'peak_memory_mb': 10.0}]
+    current = [{'stage': 'pipeline', 'n_sbs': 10, 'seconds': 1.5, 'peak_memory_mb': 10.5}]
+
+    regressions = compare_results(current, baseline, tolerance=0.2)
+
+    assert len(regressions) == 1
+    assert 'seconds' in regressions[0]
@@ -0,0 +1,90 @@
+# tests/test_calibration.py
+"""
+Testes unitários para o módulo calibration.py
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from rail_predictor.calibration import calibrate, load_measurements, parameter_grid
+from rail_predictor.config import Config
+from rail_predictor.processing import run_processing_pipeline
+
+
+def make_weather(n_sbs=3, hours=48, seed=0):
+    rng = np.random.default_rng(seed)
+    n = n_sbs * hours
+    return pd.DataFrame({
+        Config.ID_COLUMN: np.repeat([f"SB{i}" for i in range(n_sbs)], hours),
+        'time': np.tile(pd.date_range('2026-08-12', periods=hours, freq='h'), n_sbs),
+        Config.LAT_COLUMN: -23.0,
+        Config.LON_COLUMN: -51.0,
+        'temperature_2m': rng.uniform(10, 35, n),
+        'precipitation': np.where(rng.random(n) < 0.2, rng.uniform(0.1, 5, n), 0.0),
+        'weather_code': 3,
+        'wind_speed_10m': rng.uniform(0, 30, n),
+        'shortwave_radiation': rng.uniform(0, 900, n),
+    })
+
+
+def simulate_measurements(monkeypatch, weather_raw, params):
+    """Temperatura "medida" = o próprio modelo com `params`, em horas salteadas."""
+    with monkeypatch.context() as patch:
+        for name, value in params.items():
+            patch.setattr(Config, name, value)
+        processed = run_processing_pipeline(weather_raw.copy())
+    measured = processed.iloc[::3][[Config.ID_COLUMN, 'datetime', 'estimated_rail_temp']]
+    return processed, measured.rename(columns={'estimated_rail_temp': Config.CALIBRATION_MEASURED_COLUMN})
+
+
+def test_parameter_grid_is_cartesian_product_with_fixed_defaults():
+    grid_df = parameter_grid({'WIND_ADJUSTMENT_FACTOR': (4.0, 8.0, 3), 'THERMAL_RETENTION_FACTOR': (0.5, 0.7, 2)})
+
+    assert len(grid_df) == 6
+    assert sorted(grid_df['WIND_ADJUSTMENT_FACTOR'].unique()) == [4.0, 6.0, 8.0]
+    assert (grid_df['RADIATION_TO_CELSIUS_FACTOR'] == Config.RADIATION_TO_CELSIUS_FACTOR).all()
+    with pytest.raises(ValueError):
+        parameter_grid({'UNKNOWN': (0, 1, 2)})
+
+
+def test_calibrate_recovers_the_generating_parameters(monkeypatch):
+    true_params = {
+        'RADIATION_TO_CELSIUS_FACTOR': 0.03, 'WIND_ADJUSTMENT_FACTOR': 6.0,
+        'RAIN_ADDITION_CELSIUS': 1.0, 'THERMAL_RETENTION_FACTOR': 0.75,
+    }
+    weather_df, measurements_df = simulate_measurements(monkeypatch, make_weather(), true_params)
+    grid_df = parameter_grid({
+        'RADIATION_TO_CELSIUS_FACTOR': (0.02, 0.06, 5), 'WIND_ADJUSTMENT_FACTOR': (4.0, 10.0, 4),
+        'RAIN_ADDITION_CELSIUS': (0.0, 2.0, 5), 'THERMAL_RETENTION_FACTOR': (0.45, 0.9, 4),
+    })
+    # Blocos pequenos: a grade é avaliada em várias partes
+    monkeypatch.setattr(Config, 'CALIBRATION_MAX_CELLS', 3 * 48 * 7)
+
+    surface_df, best_df = calibrate(
+        weather_df, measurements_df, grid_df, group_labels=pd.Series(['a', 'a', 'b'], index=['SB0', 'SB1', 'SB2'])
+    )
+
+    assert len(surface_df) == len(grid_df)
+    best = surface_df.iloc[0]
+    for name, value in true_params.items():
+        assert best[name] == pytest.approx(value)
+    # Só o arredondamento da saída (2 casas) separa o modelo das "medições"
+    assert best['rmse'] < 0.01
+    assert best_df['group'].tolist() == ['a', 'b']
+    assert best_df['n_measurements'].tolist() == [32, 16]
+    assert (best_df['rmse'] < 0.01).all()
+    assert (best_df['current_rmse'] > best_df['rmse']).all()
+
+
+def test_load_measurements_averages_readings_within_the_hour(tmp_path):
+    path = tmp_path / "medicoes.csv"
+    pd.DataFrame({
+        Config.ID_COLUMN: ['SB0', 'SB0', 'SB1'],
+        'datetime': ['2026-08-12 10:05', '2026-08-12 10:45', '2026-08-12 11:00'],
+        Config.CALIBRATION_MEASURED_COLUMN: [40.0, 42.0, 35.0],
+    }).to_csv(path, index=False)
+
+    measurements_df = load_measurements(str(path))
+
+    assert measurements_df[Config.CALIBRATION_MEASURED_COLUMN].tolist() == [41.0, 35.0]
+    assert measurements_df['datetime'].tolist() == [pd.Timestamp('2026-08-12 10:00'), pd.Timestamp('2026-08-12 11:00')]
@@ -0,0 +1,110 @@
+# tests/test_cli.py
+"""
+Testes da interface de linha de comando (python -m rail_predictor).
+"""
+import json
+import logging
+import subprocess
+import sys
+
+import pandas as pd
+
+from rail_predictor.cli import main
+from rail_predictor.config import Config
+
+
+def write_json(path, payload):
+    path.write_text(json.dumps(payload), encoding='utf-8')
+    return str(path)
+
+
+def test_cli_import_does_not_load_heavy_stacks():
+    code = (
+        "import sys, rail_predictor.cli; "
+        "print(sorted(m for m in ('pandas', 'numpy', 'pyarrow', 'requests', 'tqdm') if m in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "[]"
+
+
+def test_validate_reports_problems_and_warnings(tmp_path, capsys):
+    valid = {'SB': 'A', 'Mediana Latitude': -23.0, 'Mediana Longitude': -51.0, 'Km início': 1, 'Km fim': 2}
+    assert main(["validate", "--input", write_json(tmp_path / "ok.json", [valid, dict(valid)])]) == 0
+    assert "repetido 2 vezes" in capsys.readouterr().out
+
+    bad = [
+        {'SB': 'B', 'Mediana Latitude': 123.0, 'Mediana Longitude': -51.0},
+        {'SB': 'C', 'Mediana Longitude': -51.0},
+        {'SB': 'D', 'Mediana Latitude': -23.0, 'Mediana Longitude': -51.0, 'Km início': 5, 'Km fim': 2},
+    ]
+    assert main(["validate", "--input", write_json(tmp_path / "bad.json", bad)]) == 1
+    out = capsys.readouterr().out
+    assert "latitude fora de" in out and "campos ausentes" in out and "maior que 'Km fim'" in out
+    assert "3 problema(s)" in out
+
+
+def test_report_prints_window_stats(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'data').mkdir()
+    today = pd.Timestamp.now().normalize()
+    pd.DataFrame({
+        Config.ID_COLUMN: ['A', 'A', 'B'],
+        'datetime': [today, today + pd.Timedelta(hours=1), today - pd.Timedelta(days=30)],
+        'estimated_rail_temp': [30.0, 31.0, 29.0],
+    }).to_parquet(Config.OUTPUT_FILE, index=False)
+
+    assert main(["report"]) == 0
+
+    out = capsys.readouterr().out
+    assert "3 linhas, 2 SBs" in out
+    assert f"{today.date()}: 2 linhas\n" in out
+    assert "fora da janela" in out
+    assert "Dias da janela sem dados" in out
+
+
+def test_calibrate_command_writes_surface_and_best_fit(tmp_path, capsys):
+    hours = pd.date_range('2026-08-12', periods=24, freq='h')
+    weather_path = tmp_path / "historico.parquet"
+    pd.DataFrame({
+        Config.ID_COLUMN: 'A',
+        'datetime': hours,
+        'temperature_celsius': 20.0,
+        'wind_speed_kmh': 0.0,
+        'precipitation_mm': 0.0,
+        'solar_radiation_wm2': 250.0,
+    }).to_parquet(weather_path, index=False)
+    measurements_path = tmp_path / "medicoes.csv"
+    # Em regime permanente o trilho tende a 20 + 250 * fator (abaixo do teto solar)
+    pd.DataFrame({
+        Config.ID_COLUMN: 'A', 'datetime': hours[-6:], Config.CALIBRATION_MEASURED_COLUMN: 30.0,
+    }).to_csv(measurements_path, index=False)
+
+    exit_code = main([
+        "calibrate", str(measurements_path), "--weather", str(weather_path),
+        "--grid", "RADIATION_TO_CELSIUS_FACTOR=0.02:0.06:5",
+        "--output", str(tmp_path / "superficie.parquet"), "--best-output", str(tmp_path / "melhor.csv"),
+    ])
+
+    assert exit_code == 0
+    surface_df = pd.read_parquet(tmp_path / "superficie.parquet")
+    assert len(surface_df) == 5
+    best_df = pd.read_csv(tmp_path / "melhor.csv")
+    assert best_df.loc[0, 'group'] == 'A'
+    assert best_df.loc[0, 'RADIATION_TO_CELSIUS_FACTOR'] == 0.04
+
+
+def test_process_status_lines_follow_json_log_format(tmp_path, monkeypatch, capsys):
+    package_logger = logging.getLogger('rail_predictor')
+    monkeypatch.setattr(package_logger, 'handlers', package_logger.handlers[:])
+    monkeypatch.setattr(package_logger, 'propagate', package_logger.propagate)
+    monkeypatch.setattr(package_logger, 'level', package_logger.level)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(Config, 'LOG_FORMAT', 'json')
+    monkeypatch.setattr(Config, 'RUN_REPORT_FILE', str(tmp_path / 'report.json'))
+
+    assert main(['process', '--input', str(tmp_path / 'missing.parquet')]) == 1
+
+    lines = capsys.readouterr().out.splitlines()
+    # Com LOG_FORMAT = "json", o stdout tem só linhas JSON.
+    entries = [json.loads(line) for line in lines]
+    assert any('Coleta bruta não encontrada' in entry['message'] for entry in entries)
@@ -0,0 +1,188 @@
+# tests/test_data_io.py
+"""
+Testes unitários para o módulo data_io.py
+"""
+import os
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from rail_predictor.data_io import (
+    save_dataset,
+    load_dataset,
+    list_date_partitions,
+    drop_expired_partitions,
+    load_history,
+    build_history_filters,
+    save_output,
+    split_compact_output,
+    save_daily_summary,
+    load_daily_summary,
+    save_delta,
+    load_delta,
+)
+from rail_predictor.config import Config
+
+
+def make_hourly_data(start, days, sbs=('A', 'B'), value=0.0):
+    times = pd.date_range(start, periods=days * 24, freq='h')
+    return pd.DataFrame({
+        Config.ID_COLUMN: [sb for sb in sbs for _ in times],
+        'datetime': list(times) * len(sbs),
+        'estimated_rail_temp': value,
+    })
+
+
+def test_save_dataset_replaces_only_covered_dates(tmp_path):
+    root = str(tmp_path / 'history')
+
+    # 1ª execução: 11 a 13/08 com valor 1.0
+    save_dataset(make_hourly_data('2026-08-11', 3, value=1.0), root=root)
+    # 2ª execução: 12 a 14/08 com valor 2.0 (12 e 13 são substituídos)
+    save_dataset(make_hourly_data('2026-08-12', 3, value=2.0), root=root)
+
+    assert list_date_partitions(root) == ['2026-08-11', '2026-08-12', '2026-08-13', '2026-08-14']
+
+    result = load_dataset(root)
+    assert len(result) == 4 * 24 * 2
+    per_day = result.groupby(result['datetime'].dt.date)['estimated_rail_temp'].unique()
+    assert per_day.map(list).tolist() == [[1.0], [2.0], [2.0], [2.0]]
+    # Nenhum resto do diretório temporário
+    assert not [name for name in os.listdir(root) if name.startswith('.staging')]
+
+
+def test_save_dataset_partition_by_sub(tmp_path):
+    root = str(tmp_path / 'history')
+    df = make_hourly_data('2026-08-12', 1)
+    df['Sub'] = df[Config.ID_COLUMN].map({'A': '1', 'B': '2'})
+
+    save_dataset(df, root=root, partition_by_sub=True)
+
+    assert sorted(os.listdir(os.path.join(root, 'date=2026-08-12'))) == ['Sub=1', 'Sub=2']
+    result = load_dataset(root)
+    assert len(result) == 48
+    assert set(zip(result[Config.ID_COLUMN], result['Sub'])) == {('A', '1'), ('B', '2')}
+
+
+def test_drop_expired_partitions(tmp_path):
+    root = str(tmp_path / 'history')
+    save_dataset(make_hourly_data('2026-08-07', 10), root=root)
+
+    expired = drop_expired_partitions(root, reference_date=datetime(2026, 8, 12), days_past=3, days_future=3)
+
+    # 07 a 16/08 gravados; a janela é 09 a 15/08
+    assert expired == ['2026-08-07', '2026-08-08', '2026-08-16']
+    assert list_date_partitions(root) == [f'2026-08-{d:02d}' for d in range(9, 16)]
+
+
+def test_load_history_pushes_down_filters_and_columns(tmp_path):
+    filepath = str(tmp_path / 'history.parquet')
+    df = make_hourly_data('2026-08-08', 7, sbs=('A', 'B', 'C'))
+    df['temperature_celsius'] = 20.0
+    df.to_parquet(filepath, index=False, engine='pyarrow', row_group_size=24)
+
+    result = load_history(
+        filepath,
+        new_data_dates=pd.to_datetime(['2026-08-12', '2026-08-13', '2026-08-14']),
+        start_date='2026-08-09',
+        end_date='2026-08-14',
+        sbs=['A', 'C'],
+        columns=[Config.ID_COLUMN, 'estimated_rail_temp'],
+    )
+
+    # Mantém 09 a 11/08 (12 a 14 serão substituídos), só A e C, só as colunas pedidas
+    assert sorted(result['datetime'].dt.strftime('%Y-%m-%d').unique()) == ['2026-08-09', '2026-08-10', '2026-08-11']
+    assert set(result[Config.ID_COLUMN]) == {'A', 'C'}
+    assert list(result.columns) == [Config.ID_COLUMN, 'estimated_rail_temp', 'datetime']
+    assert len(result) == 3 * 24 * 2
+
+
+def test_load_history_non_contiguous_new_dates(tmp_path):
+    filepath = str(tmp_path / 'history.parquet')
+    make_hourly_data('2026-08-11', 4).to_parquet(filepath, index=False)
+
+    # 13/08 fica entre as datas novas, mas não é substituído
+    result = load_history(filepath, new_data_dates=pd.to_datetime(['2026-08-12', '2026-08-14']))
+
+    assert sorted(result['datetime'].dt.day.unique()) == [11, 13]
+    assert build_history_filters(exclude_dates=pd.to_datetime(['2026-08-12', '2026-08-14'])) is None
+
+
+def test_load_history_reads_partitioned_dataset(tmp_path):
+    root = str(tmp_path / 'history')
+    save_dataset(make_hourly_data('2026-08-11', 4), root=root)
+
+    result = load_history(root, start_date='2026-08-12', end_date='2026-08-13')
+
+    assert sorted(result['datetime'].dt.day.unique()) == [12, 13]
+    assert 'date' not in result.columns
+
+
+def make_processed_data():
+    df = make_hourly_data('2026-08-12', 1, sbs=('B', 'A'), value=21.37)
+    df[Config.LAT_COLUMN] = df[Config.ID_COLUMN].map({'A': -23.1, 'B': -23.2})
+    df[Config.LON_COLUMN] = df[Config.ID_COLUMN].map({'A': -51.1, 'B': -51.2})
+    df['sky_condition'] = 'Céu limpo'
+    df['temperature_celsius'] = 18.5
+    return df
+
+
+def test_split_compact_output():
+    fact_df, dimension_df = split_compact_output(make_processed_data())
+
+    assert Config.LAT_COLUMN not in fact_df.columns
+    assert isinstance(fact_df[Config.ID_COLUMN].dtype, pd.CategoricalDtype)
+    assert isinstance(fact_df['sky_condition'].dtype, pd.CategoricalDtype)
+    assert fact_df['estimated_rail_temp'].dtype == 'float32'
+    # Ordenado por (SB, datetime)
+    assert fact_df[Config.ID_COLUMN].astype(str).tolist() == ['A'] * 24 + ['B'] * 24
+    assert dimension_df.to_dict('records') == [
+        {Config.ID_COLUMN: 'A', Config.LAT_COLUMN: -23.1, Config.LON_COLUMN: -51.1},
+        {Config.ID_COLUMN: 'B', Config.LAT_COLUMN: -23.2, Config.LON_COLUMN: -51.2},
+    ]
+
+
+def test_compact_output_round_trip(tmp_path, monkeypatch):
+    filepath = str(tmp_path / 'history.parquet')
+    dimension_filepath = str(tmp_path / 'dimension.parquet')
+    monkeypatch.setattr(Config, 'OUTPUT_DIMENSION_FILE', dimension_filepath)
+
+    save_output(make_processed_data(), filepath, compact=True, dimension_filepath=dimension_filepath)
+    # load_history recoloca lat/lon a partir da dimensão
+    result = load_history(filepath)
+
+    assert len(result) == 48
+    assert result.loc[result[Config.ID_COLUMN] == 'B', Config.LAT_COLUMN].unique().tolist() == [-23.2]
+    assert result['estimated_rail_temp'].iloc[0] == pytest.approx(21.37, abs=1e-5)
+
+
+def test_save_daily_summary_replaces_covered_days_within_window(tmp_path):
+    filepath = str(tmp_path / 'summary.parquet')
+
+    def summary(days, value):
+        return pd.DataFrame({
+            Config.ID_COLUMN: 'A', 'date': pd.to_datetime(days), 'max_rail_temp': value,
+        })
+
+    reference = datetime(2026, 8, 15)
+    save_daily_summary(summary(['2026-08-11', '2026-08-12', '2026-08-13'], 1.0), filepath, reference_date=reference)
+    # 2ª execução: 13/08 substituído; 11/08 mantido; 19/08 fora da janela (D+3)
+    save_daily_summary(summary(['2026-08-13', '2026-08-19'], 2.0), filepath, reference_date=reference)
+
+    result = load_daily_summary(filepath)
+    assert result['date'].dt.day.tolist() == [12, 13]
+    assert result['max_rail_temp'].tolist() == [1.0, 2.0]
+
+
+def test_save_delta_keeps_stats_in_metadata(tmp_path):
+    filepath = str(tmp_path / 'out' / 'delta.parquet')
+    delta_df = make_hourly_data('2026-08-11', 1).assign(change='updated')
+    stats = {'inserted': 0, 'updated': 48, 'expired': 0, 'mean_abs_temp_change': 1.5}
+
+    save_delta(delta_df, stats, filepath)
+
+    loaded = load_delta(filepath)
+    pd.testing.assert_frame_equal(loaded, delta_df, check_dtype=False)
+    assert loaded.attrs['delta_stats'] == stats
+    assert load_delta(str(tmp_path / 'missing.parquet')).empty
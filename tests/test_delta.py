@@ -0,0 +1,78 @@
+# tests/test_delta.py
+"""
+Testes da detecção de mudanças (delta.py): linhas inseridas, alteradas e
+expiradas entre o histórico anterior e a execução atual.
+"""
+import numpy as np
+import pandas as pd
+
+from rail_predictor.config import Config
+from rail_predictor.data_io import split_compact_output
+from rail_predictor.delta import ForecastDelta, row_hashes
+
+
+def make_window(start_offset, days, sbs=('SB1', 'SB2'), temp=30.0):
+    """Linhas horárias a partir de hoje + start_offset dias."""
+    start = pd.Timestamp.now().normalize() + pd.Timedelta(days=start_offset)
+    times = pd.date_range(start, periods=days * 24, freq='h')
+    n = len(times)
+    return pd.DataFrame({
+        Config.ID_COLUMN: np.repeat(list(sbs), n),
+        'datetime': np.tile(times, len(sbs)),
+        Config.LAT_COLUMN: -23.0,
+        Config.LON_COLUMN: -51.0,
+        'estimated_rail_temp': temp,
+        'temperature_celsius': 25.0,
+        'precipitation_mm': 0.0,
+        'wind_speed_kmh': 5.0,
+        'solar_radiation_wm2': 300.0,
+        'sky_condition': 'Céu Limpo',
+    })
+
+
+def test_delta_classifies_inserted_updated_unchanged_and_expired():
+    # Histórico anterior: D-4 (já fora da janela) a D+2.
+    previous = make_window(-4, 7)
+    delta = ForecastDelta(previous)
+
+    # Execução atual: recoleta D-3 a D+3; em D+1 SB2 mudou e SB1 sumiu.
+    current = make_window(-3, 7)
+    tomorrow = current['datetime'].dt.normalize() == pd.Timestamp.now().normalize() + pd.Timedelta(days=1)
+    current.loc[tomorrow & (current[Config.ID_COLUMN] == 'SB2'), 'estimated_rail_temp'] = 32.5
+    current = current[~(tomorrow & (current[Config.ID_COLUMN] == 'SB1'))]
+    delta.compare(current)
+
+    result = delta.result()
+    counts = result['change'].value_counts()
+    assert counts['inserted'] == 2 * 24          # D+3, os dois SBs
+    assert counts['updated'] == 24               # D+1 de SB2
+    assert counts['expired'] == 2 * 24 + 24      # D-4 e D+1 de SB1
+    assert result.loc[result['change'] == 'expired', 'estimated_rail_temp'].isna().all()
+    assert Config.LAT_COLUMN not in result.columns
+
+    stats = delta.stats()
+    assert stats['unchanged'] == len(current) - 3 * 24
+    assert stats['mean_abs_temp_change'] == 2.5 and stats['max_abs_temp_change'] == 2.5
+    assert stats['changed_fraction'] == round(3 * 24 / len(current), 4)
+
+
+def test_delta_compares_chunks_and_handles_empty_history():
+    delta = ForecastDelta(pd.DataFrame())
+    current = make_window(0, 1, sbs=('SB1', 'SB2', 'SB3'))
+    for _, chunk in current.groupby(Config.ID_COLUMN):
+        delta.compare(chunk)
+
+    assert (delta.result()['change'] == 'inserted').all()
+    assert delta.stats()['inserted'] == len(current)
+
+
+def test_row_hashes_ignore_compact_storage():
+    df = make_window(0, 1)
+    df['estimated_rail_temp'] = np.linspace(20, 40, len(df))
+    compact, _ = split_compact_output(df)
+    np.testing.assert_array_equal(row_hashes(df), row_hashes(compact))
+
+    delta = ForecastDelta(compact)
+    delta.compare(df)
+    assert delta.stats()['unchanged'] == len(df)
+    assert delta.result().empty
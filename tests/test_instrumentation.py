@@ -0,0 +1,113 @@
+# tests/test_instrumentation.py
+"""
+Testes da instrumentação (instrumentation.py): etapas, métricas da API,
+logs JSON e o relatório gravado pelo main.py.
+"""
+import json
+import logging
+
+import pandas as pd
+import pytest
+
+import main
+from rail_predictor import instrumentation
+from rail_predictor.api_client import fetch_weather_data_parallel
+from rail_predictor.config import Config
+
+
+@pytest.fixture(autouse=True)
+def no_active_run():
+    package_logger = logging.getLogger('rail_predictor')
+    handlers, level, propagate = package_logger.handlers[:], package_logger.level, package_logger.propagate
+    yield
+    instrumentation._current_run = None
+    # main.main() configura o logger do pacote; devolve o estado original.
+    package_logger.handlers, package_logger.propagate = handlers, propagate
+    package_logger.setLevel(level)
+
+
+def test_stage_records_duration_and_rows(tmp_path):
+    report = instrumentation.start_run()
+    with instrumentation.stage('load_locations') as metrics:
+        metrics['rows_out'] = 3
+
+    assert report.stages[0]['stage'] == 'load_locations'
+    assert report.stages[0]['rows_out'] == 3
+    assert report.stages[0]['seconds'] >= 0
+
+    instrumentation.finish_run(str(tmp_path / 'report.json'))
+    written = json.loads((tmp_path / 'report.json').read_text(encoding='utf-8'))
+    assert written['status'] == 'success'
+    assert written['stages'][0]['stage'] == 'load_locations'
+
+
+def test_stage_without_active_run_is_a_noop():
+    with instrumentation.stage('solta') as metrics:
+        metrics['rows_out'] = 1
+    instrumentation.record_request(0.1, 200)
+    assert instrumentation.current_run() is None
+
+
+def test_api_summary_percentiles():
+    report = instrumentation.RunReport()
+    for latency in [0.1] * 98 + [1.0, 2.0]:
+        report.record_request(latency, 200)
+    report.record_request(0.5, 429, retries=2)
+    report.record_request(0.0, 200, cached=True)
+
+    summary = report.api_summary()
+    assert summary['requests'] == 102
+    assert summary['status_codes'] == {'200': 101, '429': 1}
+    assert summary['latency_seconds']['p50'] == pytest.approx(0.1)
+    assert summary['latency_seconds']['max'] == 2.0
+    assert report.counters == {'api_retries': 2, 'api_cache_hits': 1}
+
+
+def test_json_log_formatter_includes_event_data():
+    record = logging.LogRecord('rail_predictor', logging.INFO, __file__, 1, "\n✅ ok", None, None)
+    record.event = 'stage'
+    record.data = {'stage': 'x', 'seconds': 1.5}
+
+    entry = json.loads(instrumentation.JsonLogFormatter().format(record))
+
+    assert entry['message'] == '✅ ok'
+    assert entry['event'] == 'stage'
+    assert entry['data'] == {'stage': 'x', 'seconds': 1.5}
+
+
+def test_fetch_records_requests_and_splits(stub_server, monkeypatch):
+    monkeypatch.setattr(Config, 'API_BATCH_SIZE', 2)
+    locations = pd.DataFrame({
+        Config.ID_COLUMN: ['SB0', 'SB1', 'SB2'],
+        Config.LAT_COLUMN: [1.0, 98.0, 3.0],
+        Config.LON_COLUMN: [-51.0] * 3,
+    })
+
+    report = instrumentation.start_run()
+    fetch_weather_data_parallel(locations, {'hourly': 'temperature_2m'})
+
+    # [1, 98] falha, é dividido em [1] e [98] (falha de novo); [3] passa.
+    summary = report.api_summary()
+    assert summary['requests'] == 4
+    assert summary['status_codes'] == {'200': 2, '400': 2}
+    assert report.counters['api_batch_splits'] == 1
+    assert report.counters['api_failed_points'] == 1
+
+
+def test_main_writes_run_report(stub_server, monkeypatch, tmp_path):
+    # Os caminhos da Config são relativos: a execução fica isolada em tmp_path.
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'data').mkdir()
+    (tmp_path / 'data' / 'coordenadas.json').write_text(json.dumps([
+        {'SB': 'SB0', 'Mediana Latitude': 1.0, 'Mediana Longitude': -51.0},
+        {'SB': 'SB1', 'Mediana Latitude': 2.0, 'Mediana Longitude': -51.0},
+    ]), encoding='utf-8')
+
+    main.main()
+
+    report = json.loads((tmp_path / Config.RUN_REPORT_FILE).read_text(encoding='utf-8'))
+    assert report['status'] == 'success'
+    stages = [s['stage'] for s in report['stages']]
+    assert stages[:3] == ['load_locations', 'fetch_weather_data_parallel', 'run_processing_pipeline']
+    assert report['stages'][1]['rows_out'] == 4
+    assert report['api']['requests'] == 1
@@ -0,0 +1,80 @@
+import json
+
+import pandas as pd
+
+from rail_predictor import location_registry
+from rail_predictor.api_client import group_locations_by_coordinate
+from rail_predictor.config import Config
+from rail_predictor.location_registry import (
+    POINT_ID_COLUMN, SB_ID_COLUMN, compile_location_registry, load_location_registry
+)
+
+
+def write_locations(path, records):
+    path.write_text(json.dumps(records), encoding='utf-8')
+    return str(path)
+
+
+def make_records():
+    return [
+        {"Sub": "1", "SB": " LLDP ", "Mediana Longitude": -51.2109, "Mediana Latitude": -23.2801,
+         "Km início": 216418, "Km fim": 217708},
+        {"Sub": "1", "SB": "LLDD", "Mediana Longitude": -51.2109, "Mediana Latitude": -23.2801,
+         "Km início": 216418, "Km fim": 217708},
+        {"Sub": "2", "SB": "ALX", "Mediana Longitude": -51.2340, "Mediana Latitude": -23.2806,
+         "Km início": 217708, "Km fim": 220813},
+        {"Sub": "2", "SB": "LLDD", "Mediana Longitude": -50.0, "Mediana Latitude": -22.0,
+         "Km início": 0, "Km fim": 1},
+    ]
+
+
+def test_compile_location_registry_keeps_km_and_ids(tmp_path):
+    registry_df = compile_location_registry(write_locations(tmp_path / "locais.json", make_records()), decimals=None)
+
+    assert registry_df[Config.ID_COLUMN].tolist() == ["LLDP", "LLDD", "ALX"]
+    assert registry_df['km_start'].tolist() == [216418, 216418, 217708]
+    assert registry_df['km_end'].tolist() == [217708, 217708, 220813]
+    assert registry_df['Sub'].tolist() == ["1", "1", "2"]
+    # sb_id segue a ordem alfabética dos códigos
+    assert registry_df[SB_ID_COLUMN].tolist() == [2, 1, 0]
+    # LLDP e LLDD compartilham a coordenada
+    assert registry_df[POINT_ID_COLUMN].tolist() == [0, 0, 1]
+
+
+def test_load_location_registry_reuses_until_json_changes(tmp_path, monkeypatch):
+    json_path = write_locations(tmp_path / "locais.json", make_records())
+    registry_path = str(tmp_path / "cache" / "registry.parquet")
+    compiled = []
+    original_compile = location_registry.compile_location_registry
+
+    def counting_compile(*args, **kwargs):
+        compiled.append(args)
+        return original_compile(*args, **kwargs)
+
+    monkeypatch.setattr(location_registry, 'compile_location_registry', counting_compile)
+
+    first = load_location_registry(json_path, registry_path, None)
+    second = load_location_registry(json_path, registry_path, None)
+    assert len(compiled) == 1
+    pd.testing.assert_frame_equal(first, second, check_dtype=False)
+
+    # Outro arredondamento muda o agrupamento em pontos: recompila
+    load_location_registry(json_path, registry_path, 1)
+    assert len(compiled) == 2
+
+    write_locations(tmp_path / "locais.json", make_records()[:1])
+    changed = load_location_registry(json_path, registry_path, 1)
+    assert len(compiled) == 3
+    assert changed[Config.ID_COLUMN].tolist() == ["LLDP"]
+
+
+def test_group_locations_uses_registry_points(tmp_path):
+    registry_df = compile_location_registry(write_locations(tmp_path / "locais.json", make_records()), decimals=None)
+
+    def summarize(points):
+        return [(p['latitude'], p['longitude'], [m[Config.ID_COLUMN] for m in p['members']]) for p in points]
+
+    from_registry = group_locations_by_coordinate(registry_df, decimals=None)
+    recomputed = group_locations_by_coordinate(registry_df.drop(columns=POINT_ID_COLUMN), decimals=None)
+    assert summarize(from_registry) == summarize(recomputed)
+    assert summarize(from_registry) == [(-23.2801, -51.2109, ["LLDP", "LLDD"]), (-23.2806, -51.234, ["ALX"])]
@@ -11,9 +11,17 @@ import pytest # Importa o pytest
 # Importa as funções que queremos testar do nosso pacote
 from rail_predictor.processing import (
     translate_weather_code,
+    translate_weather_codes_vectorized,
     calculate_equilibrium_temperature_vectorized,
     apply_thermal_inertia_fast,
-    apply_rolling_window
+    apply_thermal_inertia_vectorized,
+    thermal_inertia_recurrence,
+    extract_thermal_state,
+    lookup_initial_temps,
+    apply_rolling_window,
+    build_daily_summary,
+    exceedance_column,
+    run_processing_pipeline
 )
 # Precisamos da classe Config para testar com as constantes corretas
 from rail_predictor.config import Config
@@ -31,6 +39,24 @@ def test_translate_weather_code():
     assert translate_weather_code(9999) == "Não classificado"
 
 
+def test_translate_weather_code_full_wmo_set():
+    """Testa códigos WMO que antes caíam em 'Não classificado' (garoa, neve)."""
+    assert translate_weather_code(53) == "Garoa moderada"
+    assert translate_weather_code(73) == "Neve moderada"
+    assert translate_weather_code(99) == "Trovoada com granizo forte"
+
+
+def test_translate_weather_codes_vectorized_matches_scalar():
+    """Testa se a tradução vetorizada bate com a escalar, inclusive nos casos inválidos."""
+    codes = pd.Series(list(range(100)) + [9999, -1, np.nan, 61.5], dtype=float)
+
+    result = translate_weather_codes_vectorized(codes)
+
+    assert isinstance(result.dtype, pd.CategoricalDtype)
+    expected = [translate_weather_code(code) for code in range(100)] + ["Não classificado"] * 4
+    assert result.astype(str).tolist() == expected
+
+
 def test_calculate_equilibrium_temperature_vectorized():
     """
     Testa o cálculo da temperatura de equilíbrio vetorizada,
@@ -139,6 +165,120 @@ def test_apply_thermal_inertia_fast():
     assert_series_equal(result_series, expected_series, check_names=False)
 
 
+def test_apply_thermal_inertia_vectorized_matches_per_group_loop():
+    """
+    Testa se a versão vetorizada (todos os SBs de uma vez) produz exatamente
+    o mesmo resultado do groupby().apply() com o laço escalar, inclusive com
+    grupos de tamanhos diferentes.
+    """
+    # 1. ARRANGE: 3 SBs com 5, 1 e 168 horas
+    rng = np.random.default_rng(42)
+    sizes = {'A': 5, 'B': 1, 'C': 168}
+    test_data = pd.DataFrame({
+        'SB': np.repeat(list(sizes), list(sizes.values())),
+        'temperature_celsius': rng.uniform(5, 35, sum(sizes.values())),
+        'equilibrium_temp': rng.uniform(0, 60, sum(sizes.values())),
+    })
+
+    # 2. ACT
+    result_series = apply_thermal_inertia_vectorized(test_data)
+    expected_series = test_data.groupby('SB', group_keys=False).apply(apply_thermal_inertia_fast)
+
+    # 3. ASSERT
+    assert_series_equal(result_series, expected_series, check_names=False)
+
+
+def test_thermal_inertia_recurrence_uses_initial_state():
+    """Testa a recorrência em array 2-D usando o mesmo exemplo do teste escalar."""
+    result = thermal_inertia_recurrence(
+        np.array([[20.0, 30.0, 10.0], [10.0, 10.0, 10.0]]),
+        initial_temps=np.array([10.0, 10.0])
+    )
+
+    np.testing.assert_allclose(result[0], [14.0, 20.4, 16.24])
+    np.testing.assert_allclose(result[1], [10.0, 10.0, 10.0])
+
+
+def test_thermal_state_carry_over_matches_continuous_run():
+    """
+    Testa se retomar a inércia a partir do estado salvo produz o mesmo
+    resultado que processar a série inteira de uma só vez.
+    """
+    # 1. ARRANGE: 2 dias de dados horários para um SB
+    rng = np.random.default_rng(7)
+    times = pd.date_range('2026-08-11', periods=48, freq='h')
+    full_data = pd.DataFrame({
+        'SB': 'A',
+        'datetime': times,
+        'temperature_celsius': rng.uniform(5, 35, 48),
+        'equilibrium_temp': rng.uniform(0, 60, 48),
+    })
+    continuous = apply_thermal_inertia_vectorized(full_data)
+
+    # 2. ACT: "execução de ontem" processa o 1º dia e salva o estado;
+    # "execução de hoje" processa só o 2º dia, retomando desse estado.
+    first_day = full_data.iloc[:24].copy()
+    first_day['estimated_rail_temp'] = apply_thermal_inertia_vectorized(first_day)
+    state = extract_thermal_state(first_day)
+
+    second_day = full_data.iloc[24:].reset_index(drop=True)
+    initial_temps = lookup_initial_temps(second_day, state)
+    resumed = apply_thermal_inertia_vectorized(second_day, initial_temps)
+
+    # 3. ASSERT: o estado tem 1 linha (23h do 1º dia) e a continuação bate
+    # com a série contínua (a menos do arredondamento do estado em 2 casas).
+    assert len(state) == 1
+    assert state['datetime'].iloc[0] == pd.Timestamp('2026-08-11 23:00')
+    np.testing.assert_allclose(resumed.to_numpy(), continuous.iloc[24:].to_numpy(), atol=0.01)
+
+
+def test_retention_is_rescaled_to_15_minute_steps():
+    """
+    Testa se, com passos de 15 min, a resposta a um degrau de equilíbrio
+    após 1 hora (4 passos) é a mesma do modelo horário após 1 passo.
+    """
+    hourly = pd.DataFrame({'SB': 'A', 'temperature_celsius': 20.0, 'equilibrium_temp': [40.0] * 3})
+    quarter = pd.DataFrame({'SB': 'A', 'temperature_celsius': 20.0, 'equilibrium_temp': [40.0] * 12})
+
+    hourly_result = apply_thermal_inertia_vectorized(hourly)
+    quarter_result = apply_thermal_inertia_vectorized(quarter, step=pd.Timedelta(minutes=15))
+
+    np.testing.assert_allclose(quarter_result.iloc[3::4].to_numpy(), hourly_result.to_numpy(), atol=0.01)
+    assert_series_equal(
+        apply_thermal_inertia_fast(quarter, step=pd.Timedelta(minutes=15)), quarter_result, check_names=False
+    )
+
+
+def test_processing_pipeline_15_minutes_resumes_state_one_step_back():
+    """Testa se, em 15 min, o estado térmico é buscado às 23:45 do dia anterior."""
+    times = pd.date_range('2026-08-12', periods=8, freq='15min')
+    raw = pd.DataFrame({
+        'time': times, 'SB': 'A', 'temperature_2m': 20.0, 'precipitation': 0.0,
+        'weather_code': 0.0, 'wind_speed_10m': 0.0, 'shortwave_radiation': 0.0,
+    })
+    state = pd.DataFrame({
+        'SB': ['A'], 'datetime': [pd.Timestamp('2026-08-11 23:45')], 'estimated_rail_temp': [40.0],
+    })
+
+    result = run_processing_pipeline(raw, thermal_state=state, step=pd.Timedelta(minutes=15))
+
+    # 1 hora depois, o trilho decaiu de 40 °C em direção aos 20 °C como no modelo horário
+    expected = 20.0 + 20.0 * Config.THERMAL_RETENTION_FACTOR
+    assert result['estimated_rail_temp'].iloc[3] == pytest.approx(expected, abs=0.01)
+
+
+def test_lookup_initial_temps_ignores_non_contiguous_state():
+    """Testa se um estado que não termina logo antes da janela é ignorado (partida a frio)."""
+    state = pd.DataFrame({
+        'SB': ['A'],
+        'datetime': [pd.Timestamp('2026-08-09 23:00')],
+        'estimated_rail_temp': [30.0],
+    })
+    window = pd.DataFrame({'SB': ['A'], 'datetime': [pd.Timestamp('2026-08-11 00:00')]})
+
+    assert lookup_initial_temps(window, state).empty
+
+
 def test_apply_rolling_window_filters_correctly():
     """
     Testa se a janela móvel mantém apenas D-3 a D+3 e descarta o resto,
@@ -184,6 +324,25 @@ def test_apply_rolling_window_filters_correctly():
     assert result_dates == expected_dates
 
 
+def test_apply_rolling_window_filters_sbs_and_columns():
+    """Testa os filtros opcionais de SB e de colunas da janela móvel."""
+    reference_date = datetime(2026, 8, 12)
+    test_data = pd.DataFrame({
+        'SB': ['A', 'B', 'A', 'B'],
+        'datetime': [reference_date, reference_date, reference_date - timedelta(days=5), reference_date],
+        'estimated_rail_temp': [1.0, 2.0, 3.0, 4.0],
+        'sky_condition': ['x'] * 4,
+    })
+
+    result_df = apply_rolling_window(
+        test_data, reference_date=reference_date, sbs=['A'],
+        columns=['SB', 'datetime', 'estimated_rail_temp']
+    )
+
+    assert result_df['estimated_rail_temp'].tolist() == [1.0]
+    assert list(result_df.columns) == ['SB', 'datetime', 'estimated_rail_temp']
+
+
 def test_apply_rolling_window_empty_dataframe():
     """Testa se um DataFrame vazio é tratado sem erros."""
     empty_df = pd.DataFrame(columns=['SB', 'datetime'])
@@ -206,4 +365,43 @@ def test_apply_rolling_window_default_reference_is_today():
 
     result_df = apply_rolling_window(test_data)
 
-    assert len(result_df) == 1
\ No newline at end of file
+    assert len(result_df) == 1
+
+
+def test_build_daily_summary_aggregates_per_sb_and_day():
+    """Testa mín/máx/média, hora do pico e horas acima dos limiares por SB e dia."""
+    times = pd.date_range('2026-08-11', periods=48, freq='h')
+    temps_a = np.r_[np.arange(24.0) * 2, np.full(24, 30.0)]   # pico de 46 °C às 23h do 1º dia
+    test_data = pd.DataFrame({
+        'SB': ['A'] * 48 + ['B'] * 48,
+        'datetime': list(times) * 2,
+        'estimated_rail_temp': np.r_[temps_a, np.full(48, 51.0)],
+    })
+
+    summary = build_daily_summary(test_data, thresholds=[45.0, 50.0])
+
+    assert list(summary.columns) == [
+        'SB', 'date', 'min_rail_temp', 'max_rail_temp', 'mean_rail_temp', 'peak_hour',
+        'hours_with_data', 'hours_above_45c', 'hours_above_50c'
+    ]
+    first = summary.iloc[0]
+    assert (first['SB'], first['date']) == ('A', pd.Timestamp('2026-08-11'))
+    assert (first['min_rail_temp'], first['max_rail_temp'], first['mean_rail_temp']) == (0.0, 46.0, 23.0)
+    assert (first['peak_hour'], first['hours_above_45c'], first['hours_above_50c']) == (23, 1, 0)
+    assert summary['hours_with_data'].tolist() == [24, 24, 24, 24]
+    assert summary.loc[summary['SB'] == 'B', 'hours_above_50c'].tolist() == [24, 24]
+    assert exceedance_column(47.5) == 'hours_above_47_5c'
+
+
+def test_build_daily_summary_counts_hours_for_15_minute_steps():
+    """Testa se, em 15 min, as contagens viram horas (múltiplos de 0.25)."""
+    times = pd.date_range('2026-08-11', periods=96, freq='15min')
+    test_data = pd.DataFrame({
+        'SB': 'A', 'datetime': times,
+        'estimated_rail_temp': np.where(np.arange(96) < 7, 50.0, 30.0),
+    })
+
+    summary = build_daily_summary(test_data, thresholds=[45.0], step=pd.Timedelta(minutes=15))
+
+    assert summary['hours_with_data'].tolist() == [24.0]
+    assert summary['hours_above_45c'].tolist() == [1.75]
@@ -0,0 +1,81 @@
+# tests/test_rate_control.py
+"""
+Testes do controle adaptativo de taxa (rate_control.py) e da sua integração
+com os dois motores de coleta.
+"""
+import time
+
+import pandas as pd
+import pytest
+
+from rail_predictor.api_client import fetch_weather_data_parallel
+from rail_predictor.config import Config
+from rail_predictor.rate_control import AimdRateController, AdaptiveRateLimiter, parse_retry_after
+
+
+def test_parse_retry_after():
+    assert parse_retry_after('3') == 3.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('not a date') is None
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0.0
+
+
+def test_aimd_increases_on_healthy_responses():
+    controller = AimdRateController(initial_rate=10, max_rate=12, increase=10)
+    for _ in range(10):
+        controller.on_response(200, latency=0.1)
+    assert controller.rate == 12
+
+
+def test_aimd_does_not_increase_when_latency_is_high():
+    controller = AimdRateController(initial_rate=10, latency_target=1.0)
+    controller.on_response(200, latency=5.0)
+    assert controller.rate == 10
+
+
+def test_aimd_decreases_once_per_cooldown():
+    controller = AimdRateController(initial_rate=16, min_rate=1, decrease_factor=0.5, cooldown=60)
+    controller.on_response(429, latency=0.1)
+    controller.on_response(503, latency=0.1)
+    controller.on_error()
+    # Só o primeiro sinal dentro do cooldown corta a taxa
+    assert controller.rate == 8
+    assert controller.stats['throttled'] == 2
+    assert controller.stats['errors'] == 1
+
+
+def test_aimd_respects_min_rate_and_retry_after():
+    controller = AimdRateController(initial_rate=2, min_rate=1.5, cooldown=0)
+    controller.on_response(429, latency=0.1, retry_after=0.5)
+    assert controller.rate == 1.5
+    assert 0.3 < controller.wait_time() <= 0.5
+
+
+def test_adaptive_limiter_paces_requests():
+    limiter = AdaptiveRateLimiter(AimdRateController(initial_rate=20, max_rate=20))
+    started = time.monotonic()
+    for _ in range(11):
+        limiter.acquire()
+    # 10 intervalos de 1/20s
+    assert time.monotonic() - started >= 0.45
+
+
+@pytest.mark.parametrize('engine', ['threads', 'async'])
+def test_adaptive_fetch_backs_off_on_429(stub_server, monkeypatch, engine, caplog):
+    monkeypatch.setattr(Config, 'API_FETCH_ENGINE', engine)
+    monkeypatch.setattr(Config, 'API_RATE_CONTROL', 'adaptive')
+    monkeypatch.setattr(Config, 'API_RATE_LIMIT_CALLS', 20)
+    monkeypatch.setattr(Config, 'API_BATCH_SIZE', 1)
+    locations = pd.DataFrame({
+        Config.ID_COLUMN: ['SB0', 'SB1', 'SB2'],
+        Config.LAT_COLUMN: [1.0, 97.0, 3.0],
+        Config.LON_COLUMN: [-51.0] * 3,
+    })
+
+    with caplog.at_level('INFO', logger='rail_predictor'):
+        result = fetch_weather_data_parallel(locations, {'hourly': 'temperature_2m'})
+
+    # O 429 é repetido após o Retry-After e nenhum SB fica de fora
+    assert sorted(result[Config.ID_COLUMN].unique()) == ['SB0', 'SB1', 'SB2']
+    assert stub_server.throttled_once
+    assert '1 respostas 429/5xx' in caplog.text
@@ -0,0 +1,78 @@
+# tests/test_response_cache.py
+"""
+Testes do cache de respostas (response_cache.py), executados contra o
+servidor HTTP local que imita a API Open-Meteo (fixture `stub_server`).
+"""
+import pandas as pd
+import pytest
+
+from rail_predictor.api_client import fetch_weather_data_parallel, create_session_with_retries
+from rail_predictor.config import Config
+from rail_predictor.response_cache import ResponseCache
+
+
+@pytest.fixture
+def cache_file(tmp_path, monkeypatch):
+    path = str(tmp_path / 'cache.sqlite')
+    monkeypatch.setattr(Config, 'API_CACHE_ENABLED', True)
+    monkeypatch.setattr(Config, 'API_CACHE_FILE', path)
+    monkeypatch.setattr(Config, 'API_BATCH_SIZE', 10)
+    return path
+
+
+@pytest.mark.parametrize('engine', ['threads', 'async'])
+def test_rerun_within_ttl_makes_no_network_calls(stub_server, cache_file, monkeypatch, engine, make_locations):
+    monkeypatch.setattr(Config, 'API_FETCH_ENGINE', engine)
+    locations = make_locations([1.0, 2.0, 3.0])
+
+    first = fetch_weather_data_parallel(locations, {'hourly': 'temperature_2m'})
+    calls_after_first_run = len(stub_server.requests_seen)
+    second = fetch_weather_data_parallel(locations, {'hourly': 'temperature_2m'})
+
+    assert calls_after_first_run == 1
+    assert len(stub_server.requests_seen) == 1
+    pd.testing.assert_frame_equal(
+        first.sort_values([Config.ID_COLUMN, 'time']).reset_index(drop=True),
+        second.sort_values([Config.ID_COLUMN, 'time']).reset_index(drop=True),
+    )
+
+
+def test_partial_rerun_fetches_only_misses(stub_server, cache_file, make_locations):
+    fetch_weather_data_parallel(make_locations([1.0, 2.0]), {'hourly': 'temperature_2m'})
+
+    result = fetch_weather_data_parallel(make_locations([1.0, 2.0, 3.0]), {'hourly': 'temperature_2m'})
+
+    # O lote [1, 2, 3] é reescrito para pedir apenas o ponto 3
+    assert stub_server.requests_seen == [['1.0', '2.0'], ['3.0']]
+    sb2 = result[result[Config.ID_COLUMN] == 'SB2']
+    assert sb2['temperature_2m'].tolist() == [3.0, 1.0]
+
+
+def test_stale_entry_is_revalidated_with_etag(stub_server, tmp_path):
+    cache = ResponseCache(str(tmp_path / 'cache.sqlite'), ttl_seconds=-1)
+    session = create_session_with_retries(cache=cache)
+    params = {'latitude': 1.0, 'longitude': -51.0, 'hourly': 'temperature_2m'}
+
+    first = session.get(Config.API_BASE_URL, params=params).json()
+    # TTL negativo: a entrada já nasce vencida e é revalidada (HTTP 304)
+    second = session.get(Config.API_BASE_URL, params=params)
+
+    assert second.status_code == 200
+    assert second.json() == first
+    assert stub_server.conditional_requests == 1
+    assert cache.stats['revalidated'] == 1
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = ResponseCache(str(tmp_path / 'cache.sqlite'), max_bytes=250)
+    payload = {'hourly': {'time': ['2026-08-12T00:00'] * 5}}
+
+    cache.store('a', payload)
+    cache.store('b', payload)
+    cache.lookup('a')  # 'a' passa a ser o mais recente
+    cache.store('c', payload)
+
+    assert cache.lookup('a') is not None
+    assert cache.lookup('b') is None
+    assert cache.lookup('c') is not None
+    assert cache.stats['evicted'] == 1
@@ -0,0 +1,79 @@
+# tests/test_sharding.py
+"""
+Testes do processamento particionado (sharding.py): o resultado em vários
+processos deve ser idêntico ao do pipeline em um único processo.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from rail_predictor.config import Config
+from rail_predictor.processing import run_processing_pipeline
+from rail_predictor.sharding import assign_shards, run_processing_pipeline_sharded
+
+
+def make_raw_weather(n_sbs=12, hours=30):
+    rng = np.random.default_rng(1)
+    times = pd.date_range('2026-08-12', periods=hours, freq='h')
+    sbs = [f'SB{i:02d}' for i in range(n_sbs)]
+    return pd.DataFrame({
+        'time': np.tile(times.to_numpy(), n_sbs),
+        'temperature_2m': rng.normal(25, 4, n_sbs * hours),
+        'precipitation': np.where(rng.random(n_sbs * hours) < 0.1, 1.0, 0.0),
+        'weather_code': rng.choice([0, 3, 61], n_sbs * hours).astype(float),
+        'wind_speed_10m': rng.gamma(2.0, 5.0, n_sbs * hours),
+        'shortwave_radiation': rng.uniform(0, 900, n_sbs * hours),
+        Config.ID_COLUMN: pd.Categorical(np.repeat(sbs, hours)),
+        Config.LAT_COLUMN: np.repeat(np.linspace(-23, -22, n_sbs), hours),
+        Config.LON_COLUMN: -51.0,
+    })
+
+
+def make_locations(n_sbs=12):
+    return pd.DataFrame({
+        Config.ID_COLUMN: [f'SB{i:02d}' for i in range(n_sbs)],
+        'Sub': [str(i // 4) for i in range(n_sbs)],
+    })
+
+
+def test_assign_shards_by_hash_is_stable_per_sb():
+    raw = make_raw_weather()
+    shards = assign_shards(raw, 3, 'sb_hash')
+
+    per_sb = pd.Series(shards).groupby(raw[Config.ID_COLUMN].astype(str).to_numpy()).nunique()
+    assert (per_sb == 1).all()
+    np.testing.assert_array_equal(shards, assign_shards(raw, 3, 'sb_hash'))
+
+
+def test_assign_shards_by_sub_keeps_subs_together_and_balanced():
+    raw = make_raw_weather()
+    shards = assign_shards(raw, 3, 'sub', make_locations())
+
+    sub_of_row = raw[Config.ID_COLUMN].astype(str).map(make_locations().set_index(Config.ID_COLUMN)['Sub'])
+    assert (pd.Series(shards).groupby(sub_of_row.to_numpy()).nunique() == 1).all()
+    # 3 Subs do mesmo tamanho em 3 shards: uma Sub por shard
+    assert sorted(np.bincount(shards)) == [120, 120, 120]
+
+
+def test_assign_shards_by_sub_requires_locations():
+    with pytest.raises(ValueError):
+        assign_shards(make_raw_weather(), 2, 'sub')
+
+
+@pytest.mark.parametrize('shard_by', ['sb_hash', 'sub'])
+def test_sharded_pipeline_matches_single_process(shard_by):
+    raw = make_raw_weather()
+    state = pd.DataFrame({
+        Config.ID_COLUMN: ['SB03'],
+        'datetime': [pd.Timestamp('2026-08-11 23:00')],
+        'estimated_rail_temp': [40.0],
+    })
+
+    expected = run_processing_pipeline(raw.copy(), thermal_state=state)
+    result = run_processing_pipeline_sharded(raw.copy(), state, make_locations(), workers=2, shard_by=shard_by)
+
+    pd.testing.assert_frame_equal(
+        result.astype({Config.ID_COLUMN: str}),
+        expected.reset_index(drop=True).astype({Config.ID_COLUMN: str}),
+        check_categorical=False,
+    )
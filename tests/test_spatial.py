@@ -0,0 +1,71 @@
+# tests/test_spatial.py
+"""
+Testes unitários para o módulo spatial.py
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from rail_predictor.api_client import fetch_weather_data_parallel
+from rail_predictor.config import Config
+from rail_predictor.spatial import build_grid_interpolation
+
+
+def make_track():
+    """SBs a poucas centenas de metros um do outro, em duas células de 0.1°."""
+    return pd.DataFrame({
+        Config.ID_COLUMN: ['A', 'B', 'C', 'D', 'E'],
+        Config.LAT_COLUMN: [-23.2801, -23.2812, -23.2820, -23.3100, -23.4900],
+        Config.LON_COLUMN: [-51.2109, -51.2140, -51.2166, -51.2300, -51.3100],
+    })
+
+
+@pytest.mark.parametrize("method", ["idw", "nearest", "bilinear"])
+def test_build_grid_interpolation_weights(method):
+    interpolation = build_grid_interpolation(make_track(), resolution=0.1, method=method, neighbors=4, power=2.0)
+
+    np.testing.assert_allclose(interpolation.weights.sum(axis=1), 1.0)
+    assert interpolation.node_index.max() < len(interpolation.nodes_df)
+    rows, cols, values = interpolation.to_coo()
+    assert (values > 0).all() and len(rows) == len(cols)
+    if method != "bilinear":
+        # Os 5 SBs caem perto de apenas 2 nós
+        assert len(interpolation.nodes_df) == 2
+        assert interpolation.nodes_df[Config.LAT_COLUMN].tolist() == [-23.5, -23.3]
+
+
+def test_interpolate_ignores_missing_nodes_and_keeps_codes_discrete():
+    interpolation = build_grid_interpolation(make_track(), resolution=0.1, method="idw", neighbors=4, power=2.0)
+    node_values = np.array([[10.0, np.nan], [20.0, 30.0]])
+
+    continuous = interpolation.interpolate(node_values)
+    assert ((continuous[:, 0] >= 10.0) & (continuous[:, 0] <= 20.0)).all()
+    # Sem o nó -23.5 na 2ª hora, os SBs perto de -23.3 usam só esse nó; o
+    # SB E não tem -23.3 entre os vizinhos (2 células adiante) e fica sem valor
+    np.testing.assert_allclose(continuous[:4, 1], 30.0)
+    assert np.isnan(continuous[4, 1])
+
+    codes = interpolation.interpolate(np.array([[3.0, 3.0], [61.0, 61.0]]), discrete=True)
+    assert set(np.unique(codes)) <= {3.0, 61.0}
+
+
+def test_grid_mode_fetches_only_grid_nodes(stub_server, monkeypatch):
+    monkeypatch.setattr(Config, 'API_SPATIAL_MODE', "grid")
+    monkeypatch.setattr(Config, 'SPATIAL_INTERPOLATION', "bilinear")
+    monkeypatch.setattr(Config, 'SPATIAL_GRID_RESOLUTION', 0.5)
+    monkeypatch.setattr(Config, 'API_BATCH_SIZE', 1)
+    locations_df = make_track()
+
+    raw_df = fetch_weather_data_parallel(locations_df, {'hourly': 'temperature_2m', 'past_days': 0, 'forecast_days': 1})
+
+    # Uma célula de 0.5°: 4 nós buscados para 5 SBs
+    assert len(stub_server.requests_seen) == 4
+    assert sorted(raw_df[Config.ID_COLUMN].astype(str).unique()) == ['A', 'B', 'C', 'D', 'E']
+    # O stub devolve a latitude do nó como temperatura da 1ª hora: a
+    # interpolação bilinear reproduz a latitude de cada SB.
+    first_hour = raw_df[raw_df['time'] == raw_df['time'].min()].set_index(Config.ID_COLUMN)
+    expected = locations_df.set_index(Config.ID_COLUMN)[Config.LAT_COLUMN]
+    np.testing.assert_allclose(first_hour.loc[expected.index, 'temperature_2m'].astype(float), expected, atol=1e-9)
+    np.testing.assert_allclose(
+        first_hour.loc[expected.index, Config.LAT_COLUMN].astype(float), expected
+    )
@@ -0,0 +1,198 @@
+# tests/test_streaming.py
+"""
+Testes do pipeline em streaming (streaming.py): a saída gravada em row
+groups deve ter as mesmas linhas do modo em lote (cada row group ordenado,
+sem ordem global).
+"""
+import asyncio
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from rail_predictor import streaming
+from rail_predictor.config import Config
+from rail_predictor.processing import apply_rolling_window, build_daily_summary, run_processing_pipeline
+
+VARIABLES = ['temperature_2m', 'precipitation', 'weather_code', 'wind_speed_10m', 'shortwave_radiation']
+API_PARAMS = {'hourly': ','.join(VARIABLES), 'past_days': 1, 'forecast_days': 2}
+
+
+def make_points(n_points=7):
+    """Pontos com 3 dias de dados horários a partir de ontem (dentro da janela)."""
+    rng = np.random.default_rng(0)
+    times = pd.date_range(pd.Timestamp.now().normalize() - pd.Timedelta(days=1), periods=72, freq='h')
+    points = []
+    for i in range(n_points):
+        members = [{Config.ID_COLUMN: f'SB{i}{suffix}', Config.LAT_COLUMN: -23.0 + i, Config.LON_COLUMN: -51.0}
+                   for suffix in ('a', 'b')]
+        hourly = {'time': times.strftime('%Y-%m-%dT%H:%M').tolist()}
+        for var in VARIABLES:
+            hourly[var] = rng.uniform(0, 30, len(times)).round(1).tolist()
+        points.append(({'latitude': -23.0 + i, 'longitude': -51.0, 'members': members}, hourly))
+    return points
+
+
+def fake_fetch(points):
+    def fetch(locations_df, api_params, collector=None):
+        for point, hourly in points:
+            collector.add(point, hourly)
+        return collector.result()
+    return fetch
+
+
+def batch_reference(points):
+    frames = []
+    for point, hourly in points:
+        for member in point['members']:
+            frame = pd.DataFrame(hourly)
+            for key, value in member.items():
+                frame[key] = value
+            frames.append(frame)
+    raw = pd.concat(frames, ignore_index=True)
+    raw['time'] = pd.to_datetime(raw['time'])
+    return apply_rolling_window(run_processing_pipeline(raw))
+
+
+def normalize(df):
+    df = df.astype({Config.ID_COLUMN: str, 'sky_condition': str, Config.LAT_COLUMN: float, Config.LON_COLUMN: float})
+    df['datetime'] = pd.to_datetime(df['datetime']).astype('datetime64[s]')
+    return df.sort_values([Config.ID_COLUMN, 'datetime']).reset_index(drop=True)
+
+
+@pytest.fixture
+def stream_config(monkeypatch):
+    monkeypatch.setattr(Config, 'STREAM_CHUNK_POINTS', 3)
+    monkeypatch.setattr(Config, 'STREAM_QUEUE_DEPTH', 1)
+
+
+def test_streaming_output_matches_batch(tmp_path, monkeypatch, stream_config):
+    points = make_points()
+    monkeypatch.setattr(streaming, 'fetch_weather_data_parallel', fake_fetch(points))
+    output = str(tmp_path / 'history.parquet')
+
+    summary = streaming.run_streaming_pipeline(
+        pd.DataFrame(), API_PARAMS, output_filepath=output, compact=False, summary_thresholds=[20.0]
+    )
+
+    # 7 pontos em blocos de 3 -> 3 blocos, cada um um row group
+    assert summary['chunks'] == 3
+    parquet_file = pq.ParquetFile(output)
+    assert parquet_file.num_row_groups == 3
+    # Mesmas linhas do lote (normalize reordena): a ordem global não é garantida,
+    # só a ordem dentro de cada row group.
+    pd.testing.assert_frame_equal(normalize(pd.read_parquet(output)), normalize(batch_reference(points)))
+    for i in range(parquet_file.num_row_groups):
+        row_group = parquet_file.read_row_group(i, columns=[Config.ID_COLUMN, 'datetime']).to_pandas()
+        pd.testing.assert_frame_equal(row_group, row_group.sort_values([Config.ID_COLUMN, 'datetime']).reset_index(drop=True))
+    assert set(summary['thermal_state'][Config.ID_COLUMN]) == {f'SB{i}{s}' for i in range(7) for s in 'ab'}
+    # Resumos por bloco, concatenados, equivalem ao resumo do arquivo inteiro
+    pd.testing.assert_frame_equal(
+        summary['daily_summary'].sort_values([Config.ID_COLUMN, 'date']).reset_index(drop=True),
+        build_daily_summary(pd.read_parquet(output), [20.0]), check_dtype=False
+    )
+
+
+def test_streaming_keeps_history_of_dates_not_refetched(tmp_path, monkeypatch, stream_config):
+    output = str(tmp_path / 'history.parquet')
+    old_day = pd.Timestamp.now().normalize() - pd.Timedelta(days=Config.ROLLING_WINDOW_DAYS_PAST)
+    history = normalize(batch_reference(make_points(2))).head(1).assign(datetime=old_day)
+    history.to_parquet(output, index=False)
+    monkeypatch.setattr(streaming, 'fetch_weather_data_parallel', fake_fetch(make_points(2)))
+
+    summary = streaming.run_streaming_pipeline(pd.DataFrame(), API_PARAMS, output_filepath=output, compact=False)
+
+    result = pd.read_parquet(output)
+    assert (pd.to_datetime(result['datetime']) == old_day).sum() == 1
+    assert summary['rows_written'] == len(result)
+
+
+def test_streaming_failure_keeps_previous_output(tmp_path, monkeypatch, stream_config):
+    output = tmp_path / 'history.parquet'
+    output.write_bytes(b'previous')
+    monkeypatch.setattr(streaming, 'fetch_weather_data_parallel', fake_fetch(make_points()))
+
+    def broken_pipeline(df, thermal_state=None):
+        raise ValueError("boom")
+    monkeypatch.setattr(streaming, 'run_processing_pipeline', broken_pipeline)
+
+    with pytest.raises(RuntimeError):
+        streaming.run_streaming_pipeline(pd.DataFrame(), API_PARAMS, output_filepath=str(output), compact=False)
+
+    assert output.read_bytes() == b'previous'
+    assert os.listdir(tmp_path) == ['history.parquet']
+
+
+def test_streaming_archives_each_chunk(tmp_path, monkeypatch, stream_config):
+    from rail_predictor.archive import load_archive_index, query_archive
+    points = make_points()
+    monkeypatch.setattr(streaming, 'fetch_weather_data_parallel', fake_fetch(points))
+    archive_dir = str(tmp_path / 'archive')
+
+    streaming.run_streaming_pipeline(
+        pd.DataFrame(), API_PARAMS, output_filepath=str(tmp_path / 'history.parquet'), compact=False,
+        archive_dir=archive_dir
+    )
+
+    # Uma parte por bloco processado, todas na emissão de hoje.
+    assert load_archive_index(archive_dir)['file'].nunique() == 3
+    archived = query_archive(root=archive_dir).drop(columns='issue_date')
+    archived['datetime'] = archived['datetime'].astype('datetime64[s]')
+    expected = normalize(batch_reference(points))[archived.columns]
+    # Medidas gravadas em float32 no arquivo.
+    pd.testing.assert_frame_equal(archived, expected, check_dtype=False)
+
+
+def test_streaming_delta_of_identical_rerun_is_empty(tmp_path, monkeypatch, stream_config):
+    from rail_predictor.data_io import load_history
+    from rail_predictor.delta import ForecastDelta
+    points = make_points()
+    monkeypatch.setattr(streaming, 'fetch_weather_data_parallel', fake_fetch(points))
+    output = str(tmp_path / 'history.parquet')
+    options = dict(output_filepath=output, compact=True, dimension_filepath=str(tmp_path / 'dimension.parquet'))
+
+    first = ForecastDelta(pd.DataFrame())
+    streaming.run_streaming_pipeline(pd.DataFrame(), API_PARAMS, delta=first, **options)
+    assert first.stats()['inserted'] == len(pd.read_parquet(output))
+
+    second = ForecastDelta(load_history(output))
+    streaming.run_streaming_pipeline(pd.DataFrame(), API_PARAMS, delta=second, **options)
+    assert second.result().empty
+    assert second.stats()['unchanged'] == len(pd.read_parquet(output))
+
+
+def test_async_engine_streams_without_blocking_event_loop(tmp_path, monkeypatch, stub_server, make_locations):
+    monkeypatch.setattr(Config, 'API_FETCH_ENGINE', 'async')
+    monkeypatch.setattr(Config, 'API_BATCH_SIZE', 1)
+    monkeypatch.setattr(Config, 'STREAM_CHUNK_POINTS', 1)
+    monkeypatch.setattr(Config, 'STREAM_QUEUE_DEPTH', 1)
+
+    # Processamento lento: a fila de 1 bloco enche e `add` bloqueia.
+    def slow_process(self, raw_df):
+        threading.Event().wait(0.05)
+        self.rows_fetched += len(raw_df)
+        self.chunks += 1
+    monkeypatch.setattr(streaming.StreamingCollector, '_process', slow_process)
+
+    add_threads = []
+    original_add = streaming.StreamingCollector.add
+    def add(self, point, hourly):
+        try:
+            asyncio.get_running_loop()
+            add_threads.append('event loop')
+        except RuntimeError:
+            add_threads.append(threading.current_thread().name)
+        original_add(self, point, hourly)
+    monkeypatch.setattr(streaming.StreamingCollector, 'add', add)
+
+    summary = streaming.run_streaming_pipeline(
+        make_locations([float(i) for i in range(1, 9)]), {'hourly': 'temperature_2m'},
+        output_filepath=str(tmp_path / 'history.parquet'), compact=False
+    )
+
+    # Todos os pontos entregues, nenhum deles no event loop.
+    assert summary['rows_fetched'] == 8 * 2 and summary['chunks'] == 8
+    assert len(add_threads) == 8 and 'event loop' not in add_threads